@@ -1,15 +1,134 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
-from .models import Project, Publication
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import jobs
+from .background import run_in_thread
+from .models import Project, ProjectCollaborator, Publication, OutboxEmail, AudioMatch, StorageUsage, TimelineJob
 
 User = get_user_model()
 
+# Background actions run on an in-process thread, which a restart stops
+RERUN_HINT = "If the server restarts before the log shows it finished, run the action again; it is safe to repeat."
+
+# Below this many rows (by the planner's estimate) changelists show an exact count
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the row count of large changelists from the query planner
+    instead of running COUNT(*) over the whole table on every page view. The last page
+    numbers are approximate; small or non-PostgreSQL tables are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        if connection.vendor == "postgresql":
+            sql, params = self.object_list.order_by().query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+            if estimate >= EXACT_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class UserAutocompleteFilter(admin.SimpleListFilter):
+    """Filter by owner through the admin's user autocomplete, instead of listing every user."""
+    title = "user"
+    parameter_name = "user__id__exact"
+    template = "admin/accounts/autocomplete_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        self.field = model._meta.get_field("user")
+        self.admin_site = model_admin.admin_site
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(user_id=int(value))
+        return queryset
+
+    def choices(self, changelist):
+        widget = AutocompleteSelect(self.field, self.admin_site, attrs={
+            "data-filter-parameter": self.parameter_name,
+            "style": "width: 100%",
+        })
+        field = forms.ModelChoiceField(queryset=User.objects.all(), widget=widget, required=False)
+        yield {
+            "selected": self.value() is not None,
+            "widget": field.widget.render(f"{self.parameter_name}_autocomplete", self.value()),
+            "clear_query_string": changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+
+class LargeCatalogAdminMixin:
+    """Changelist settings for tables that grow with the catalogue (one row per user upload)."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ("user",)
+    list_filter = (UserAutocompleteFilter,)
+
+    @property
+    def media(self):
+        autocomplete = AutocompleteSelect(self.model._meta.get_field("user"), self.admin_site)
+        return super().media + autocomplete.media + forms.Media(js=["accounts/admin/autocomplete_filter.js"])
+
+
+@admin.action(description="Regenerate image derivatives (in the background)")
+def regenerate_image_derivatives(modeladmin, request, queryset):
+    if queryset.model is Publication:
+        queryset = queryset.filter(cover_image__gt="")
+    else:
+        queryset = queryset.filter(Q(profile_picture__gt="") | Q(header_image__gt=""))
+    run_in_thread(jobs.regenerate_image_derivatives, queryset.order_by("pk"))
+    modeladmin.message_user(request, "Regenerating image derivatives in the background; results go to the log. " + RERUN_HINT)
+
+
+@admin.action(description="Purge orphaned fingerprints, matches, index entries and sample files (whole catalogue)")
+def purge_orphans(modeladmin, request, queryset):
+    run_in_thread(jobs.purge_orphans)
+    modeladmin.message_user(request, "Purging orphans in the background; counts go to the log. " + RERUN_HINT)
+
+
+@admin.action(description="Rebuild storage usage of every user from recorded file sizes (whole catalogue)")
+def reconcile_storage(modeladmin, request, queryset):
+    run_in_thread(jobs.reconcile_storage_usage)
+    modeladmin.message_user(request, "Reconciling storage usage in the background. " + RERUN_HINT)
+
+
+class StorageUsageInline(admin.StackedInline):
+    model = StorageUsage
+    can_delete = False
+    fields = ("bytes_used", "quota")
+    readonly_fields = ("bytes_used",)
+
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     list_display = ("username", "email", "is_listener", "is_creator", "role", "is_staff")
     list_filter = ("is_listener", "is_creator", "is_staff", "is_active")
+    # icontains on these columns is served by trigram indexes (migration 0016)
+    search_fields = ("username", "email")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = (regenerate_image_derivatives, reconcile_storage)
+    inlines = (StorageUsageInline,)
     fieldsets = BaseUserAdmin.fieldsets + (
         ("Roles", {"fields": ("is_listener", "is_creator")}),
         ("Profile", {"fields": ("bio", "header_image", "profile_picture")}),
@@ -18,16 +137,62 @@ class UserAdmin(BaseUserAdmin):
         ("Roles", {"fields": ("is_listener", "is_creator")}),
     )
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not StorageUsage:
+            return super().save_formset(request, form, formset, change)
+        # Write only the quota: a full save would overwrite bytes_used moved by uploads meanwhile
+        for usage in formset.save(commit=False):
+            StorageUsage.objects.update_or_create(user=form.instance, defaults={"quota": usage.quota})
+
+
+class ProjectCollaboratorInline(admin.TabularInline):
+    model = ProjectCollaborator
+    raw_id_fields = ("user",)
+    readonly_fields = ("added_at",)
+    extra = 0
+
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
-    list_display = ("name", "user", "created_at", "updated_at")
-    list_filter = ("user",)
+class ProjectAdmin(LargeCatalogAdminMixin, admin.ModelAdmin):
+    list_display = ("name", "user", "is_template", "created_at", "updated_at")
+    list_filter = ("is_template", UserAutocompleteFilter)
+    # The owner's username is matched through the trigram index on accounts_user (migration 0016)
     search_fields = ("name", "user__username")
+    actions = ("recompute_summaries",)
+    inlines = (ProjectCollaboratorInline,)
+
+    @admin.action(description="Recompute summary columns (in the background)")
+    def recompute_summaries(self, request, queryset):
+        run_in_thread(jobs.recompute_project_summaries, queryset.order_by("pk"))
+        self.message_user(request, "Recomputing project summaries in the background; results go to the log. " + RERUN_HINT)
 
 
 @admin.register(Publication)
-class PublicationAdmin(admin.ModelAdmin):
+class PublicationAdmin(LargeCatalogAdminMixin, admin.ModelAdmin):
     list_display = ("title", "user", "is_public", "play_count", "published_at")
-    list_filter = ("is_public", "user")
-    search_fields = ("title", "user__username")
\ No newline at end of file
+    list_filter = ("is_public", UserAutocompleteFilter)
+    search_fields = ("title", "user__username")
+    # purge_orphans covers the whole catalogue whatever is selected, like reconcile_storage on users
+    actions = (regenerate_image_derivatives, purge_orphans)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "to", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
+
+
+@admin.register(TimelineJob)
+class TimelineJobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "args", "status", "attempts", "next_attempt_at", "created_at")
+    list_filter = ("status", "kind")
+    readonly_fields = ("created_at", "last_error")
+
+
+@admin.register(AudioMatch)
+class AudioMatchAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "score", "coverage", "offset_seconds", "created_at")
+    list_filter = ("source_kind", "matched_kind")
+    readonly_fields = ("created_at",)
@@ -0,0 +1,357 @@
+"""
+Upload-time audio analysis: duration, format, EBU R128 loudness, true peak, tempo, key,
+landmark fingerprints and (for publications) a similarity embedding.
+
+Everything here is plain NumPy/SciPy with no Django imports, so it can run in a
+process-pool worker. Audio comes as encoded bytes or as the path of a local file (uploads
+are spooled to disk rather than passed through memory). WAV is decoded directly; every
+other format needs ffmpeg and ffprobe on the PATH, a deployment requirement that the
+accounts.W001 system check reports. SciPy is imported inside the functions that use it:
+accounts.models imports this module, and only the analysis processes need SciPy.
+"""
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from math import gcd
+
+import numpy as np
+
+ANALYSIS_SAMPLE_RATE = 11025  # tempo/key work on a mono downsample
+STFT_SIZE = 2048
+STFT_HOP = 512
+
+PITCH_CLASSES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+# Krumhansl–Kessler key profiles
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+MEL_BANDS = 40
+MFCC_COUNT = 19  # coefficients 1..19; c0 is overall level, which says nothing about similarity
+# mean+std of MFCCs and chroma, then log tempo and onset rate
+EMBEDDING_DIM = 2 * MFCC_COUNT + 2 * 12 + 2
+
+# Landmark fingerprints: spectrogram peaks paired with the next few peaks after them
+FINGERPRINT_FFT = 1024
+FINGERPRINT_HOP = 256  # ~23 ms frames at 11025 Hz
+PEAK_NEIGHBOURHOOD = (21, 11)  # frequency bins x frames a peak must dominate
+PEAK_MIN_ABOVE_MEDIAN = 3.0  # natural-log magnitude, ~26 dB
+PEAKS_PER_SECOND = 15
+FINGERPRINT_FANOUT = 5
+MAX_PAIR_FRAMES = 63  # dt must fit in 6 bits
+
+
+class UnsupportedAudio(Exception):
+    pass
+
+
+# ─── Decoding ───
+
+def _normalize_pcm(samples):
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / 128
+    if np.issubdtype(samples.dtype, np.integer):
+        return samples.astype(np.float32) / np.iinfo(samples.dtype).max
+    return samples.astype(np.float32)
+
+
+def ffmpeg_available():
+    return bool(shutil.which('ffmpeg') and shutil.which('ffprobe'))
+
+
+@contextmanager
+def local_path(source):
+    """A path to the encoded audio: the source itself, or a temporary copy of source bytes."""
+    if isinstance(source, str):
+        yield source
+        return
+    with tempfile.NamedTemporaryFile() as copy:
+        copy.write(source)
+        copy.flush()
+        yield copy.name
+
+
+def is_wav(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            header = f.read(12)
+    else:
+        header = bytes(source[:12])
+    return header[:4] == b'RIFF' and header[8:12] == b'WAVE'
+
+
+def _decode_with_ffmpeg(source):
+    if not ffmpeg_available():
+        raise UnsupportedAudio('ffmpeg is required to decode non-WAV audio')
+    with local_path(source) as path:
+        probe = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+             '-show_entries', 'stream=sample_rate,channels', '-of', 'json', path],
+            capture_output=True, check=True,
+        )
+        streams = json.loads(probe.stdout).get('streams') or []
+        if not streams:
+            raise UnsupportedAudio('No audio stream found')
+        sample_rate = int(streams[0]['sample_rate'])
+        channels = int(streams[0]['channels'])
+        decoded = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-i', path, '-map', 'a:0',
+             '-f', 'f32le', '-acodec', 'pcm_f32le', 'pipe:1'],
+            capture_output=True, check=True,
+        )
+    samples = np.frombuffer(decoded.stdout, dtype='<f4').reshape(-1, channels)
+    return samples, sample_rate
+
+
+def decode_audio(source):
+    """Return (samples[n, channels] float32 in -1..1, sample_rate) from encoded bytes or a file path."""
+    from scipy.io import wavfile
+    if is_wav(source):
+        sample_rate, samples = wavfile.read(source if isinstance(source, str) else io.BytesIO(source))
+        samples = _normalize_pcm(samples)
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        return samples, sample_rate
+    return _decode_with_ffmpeg(source)
+
+
+# ─── Loudness (ITU-R BS.1770-4 / EBU R128) ───
+
+def _biquad(kind, gain_db, q, fc, rate):
+    a_gain = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * fc / rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    if kind == 'high_shelf':
+        sqrt_a = 2 * np.sqrt(a_gain) * alpha
+        b = [a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 + sqrt_a),
+             -2 * a_gain * ((a_gain - 1) + (a_gain + 1) * cos_w0),
+             a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 - sqrt_a)]
+        a = [(a_gain + 1) - (a_gain - 1) * cos_w0 + sqrt_a,
+             2 * ((a_gain - 1) - (a_gain + 1) * cos_w0),
+             (a_gain + 1) - (a_gain - 1) * cos_w0 - sqrt_a]
+    else:  # high_pass
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    return np.array(b) / a[0], np.array(a) / a[0]
+
+
+def integrated_loudness(samples, rate):
+    """Gated integrated loudness in LUFS, or None for silence / clips shorter than one block."""
+    from scipy import signal
+    block = int(round(0.4 * rate))
+    step = int(round(0.1 * rate))
+    if len(samples) < block:
+        return None
+
+    # K-weighting: +4 dB high shelf then 38 Hz high-pass
+    filtered = samples
+    for kind, gain, q, fc in (('high_shelf', 4.0, 1 / np.sqrt(2), 1500.0), ('high_pass', 0.0, 0.5, 38.0)):
+        b, a = _biquad(kind, gain, q, fc, rate)
+        filtered = signal.lfilter(b, a, filtered, axis=0)
+
+    # Mean square of every 400 ms block (75% overlap) per channel, via a cumulative sum
+    energy = np.concatenate([np.zeros((1, filtered.shape[1])), np.cumsum(filtered ** 2, axis=0)])
+    starts = np.arange(0, len(filtered) - block + 1, step)
+    mean_square = (energy[starts + block] - energy[starts]) / block
+
+    # Surround channels weigh +1.5 dB; in 5.1 (L R C LFE Ls Rs) the LFE is excluded
+    weights = np.ones(filtered.shape[1])
+    if filtered.shape[1] == 5:
+        weights[3:5] = 1.41
+    elif filtered.shape[1] >= 6:
+        weights[3] = 0.0
+        weights[4:6] = 1.41
+    power = mean_square @ weights
+
+    with np.errstate(divide='ignore'):
+        block_loudness = -0.691 + 10 * np.log10(power)
+    gated = power[block_loudness > -70]
+    if not len(gated):
+        return None
+    relative_gate = -0.691 + 10 * np.log10(gated.mean()) - 10
+    gated = power[(block_loudness > -70) & (block_loudness > relative_gate)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def true_peak(samples, rate):
+    """Inter-sample peak in dBTP from 4x oversampling (2x above 96 kHz)."""
+    from scipy import signal
+    factor = 2 if rate >= 96000 else 4
+    peak = np.max(np.abs(signal.resample_poly(samples, factor, 1, axis=0))) if len(samples) else 0
+    return float(20 * np.log10(peak)) if peak > 0 else None
+
+
+# ─── Tempo and key ───
+
+def _downsample_mono(samples, rate):
+    from scipy import signal
+    mono = samples.mean(axis=1)
+    divisor = gcd(ANALYSIS_SAMPLE_RATE, rate)
+    return signal.resample_poly(mono, ANALYSIS_SAMPLE_RATE // divisor, rate // divisor).astype(np.float32)
+
+
+def _spectrogram(mono):
+    from scipy import signal
+    _, _, spectrum = signal.stft(mono, nperseg=STFT_SIZE, noverlap=STFT_SIZE - STFT_HOP, boundary=None, padded=False)
+    return np.abs(spectrum).astype(np.float32)
+
+
+def estimate_tempo(magnitude, min_bpm=60, max_bpm=200):
+    """Tempo from the autocorrelation of a spectral-flux onset envelope, weighted toward 120 BPM."""
+    from scipy import signal
+    flux = np.maximum(np.diff(np.log1p(magnitude * 100), axis=1), 0).sum(axis=0)
+    if len(flux) < 8 or not flux.any():
+        return None
+    flux = flux - flux.mean()
+    correlation = signal.correlate(flux, flux, mode='full', method='fft')[len(flux) - 1:]
+
+    frames_per_second = ANALYSIS_SAMPLE_RATE / STFT_HOP
+    min_lag = int(frames_per_second * 60 / max_bpm)
+    max_lag = min(int(frames_per_second * 60 / min_bpm) + 1, len(correlation) - 1)
+    if max_lag <= min_lag + 1:
+        return None
+    lags = np.arange(min_lag, max_lag)
+    bpms = 60 * frames_per_second / lags
+    prior = np.exp(-0.5 * (np.log2(bpms / 120) / 0.9) ** 2)
+    best = int(lags[np.argmax(correlation[lags] * prior)])
+
+    # Parabolic interpolation around the peak for a fractional lag
+    left, centre, right = correlation[best - 1:best + 2]
+    denominator = left - 2 * centre + right
+    offset = 0.5 * (left - right) / denominator if denominator else 0.0
+    return float(60 * frames_per_second / (best + offset))
+
+
+def _pitch_classes():
+    frequencies = np.fft.rfftfreq(STFT_SIZE, 1 / ANALYSIS_SAMPLE_RATE)
+    usable = (frequencies >= 55) & (frequencies <= 5000)
+    return usable, np.round(12 * np.log2(frequencies[usable] / 440) + 69).astype(int) % 12
+
+
+def estimate_key(magnitude):
+    """Best-matching major/minor key for a chroma vector, e.g. 'A minor'."""
+    usable, pitch_class = _pitch_classes()
+    chroma = np.bincount(pitch_class, weights=(magnitude[usable] ** 2).sum(axis=1), minlength=12)
+    if not chroma.any():
+        return None
+
+    best_score, best_key = -np.inf, None
+    for tonic in range(12):
+        for profile, mode in ((MAJOR_PROFILE, 'major'), (MINOR_PROFILE, 'minor')):
+            score = np.corrcoef(chroma, np.roll(profile, tonic))[0, 1]
+            if score > best_score:
+                best_score, best_key = score, f'{PITCH_CLASSES[tonic]} {mode}'
+    return best_key
+
+
+# ─── Similarity embedding ───
+
+def _mel_filterbank():
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    frequencies = np.fft.rfftfreq(STFT_SIZE, 1 / ANALYSIS_SAMPLE_RATE)
+    edges = 700 * (10 ** (np.linspace(to_mel(30), to_mel(ANALYSIS_SAMPLE_RATE / 2), MEL_BANDS + 2) / 2595) - 1)
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (frequencies - lower) / (centre - lower)
+    falling = (upper - frequencies) / (upper - centre)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def audio_embedding(magnitude, bpm):
+    """
+    Fixed-length float32 vector describing timbre, harmony and rhythm: mean and std of
+    MFCCs and of the per-frame chroma, log2(bpm / 120) and the onset rate. Vectors are
+    compared after corpus-wide standardization (see accounts/similarity.py).
+    """
+    from scipy import signal
+    from scipy.fft import dct
+    power = magnitude ** 2
+    mfcc = dct(np.log(_mel_filterbank() @ power + 1e-10), type=2, norm='ortho', axis=0)[1:MFCC_COUNT + 1]
+
+    usable, pitch_class = _pitch_classes()
+    chroma = np.zeros((12, power.shape[1]), dtype=np.float32)
+    np.add.at(chroma, pitch_class, power[usable])
+    chroma /= chroma.sum(axis=0, keepdims=True) + 1e-10
+
+    flux = np.maximum(np.diff(np.log1p(magnitude * 100), axis=1), 0).sum(axis=0)
+    onsets = signal.find_peaks(flux, height=flux.mean() + flux.std())[0] if len(flux) else []
+    duration = magnitude.shape[1] * STFT_HOP / ANALYSIS_SAMPLE_RATE
+
+    return np.concatenate([
+        mfcc.mean(axis=1), mfcc.std(axis=1),
+        chroma.mean(axis=1), chroma.std(axis=1),
+        [np.log2(bpm / 120) if bpm else 0.0, len(onsets) / duration],
+    ]).astype(np.float32)
+
+
+# ─── Landmark fingerprints ───
+
+def landmark_hashes(mono):
+    """
+    int32[n, 2] of (hash, anchor frame). Each hash packs the frequency bins of two
+    spectrogram peaks and the frames between them (9 + 9 + 6 bits), which survives
+    re-encoding, gain changes and trimming far better than hashing the file bytes.
+    """
+    from scipy import ndimage, signal
+    _, _, spectrum = signal.stft(
+        mono, nperseg=FINGERPRINT_FFT, noverlap=FINGERPRINT_FFT - FINGERPRINT_HOP, boundary=None, padded=False,
+    )
+    magnitude = np.log(np.abs(spectrum[:FINGERPRINT_FFT // 2]) + 1e-6)
+    if magnitude.shape[1] < 2:
+        return np.empty((0, 2), dtype=np.int32)
+
+    # Local maxima well above the median level; keep the strongest few in each second so
+    # quiet passages still get landmarks and loud ones don't crowd them out
+    peaks = (ndimage.maximum_filter(magnitude, size=PEAK_NEIGHBOURHOOD) == magnitude) \
+        & (magnitude > np.median(magnitude) + PEAK_MIN_ABOVE_MEDIAN)
+    bins, frames = np.nonzero(peaks)
+    seconds = frames // int(ANALYSIS_SAMPLE_RATE / FINGERPRINT_HOP)
+    order = np.lexsort((-magnitude[bins, frames], seconds))
+    bins, frames, seconds = bins[order], frames[order], seconds[order]
+    first_in_second = np.searchsorted(seconds, seconds)
+    keep = np.arange(len(seconds)) - first_in_second < PEAKS_PER_SECOND
+    bins, frames = bins[keep], frames[keep]
+    order = np.lexsort((bins, frames))
+    bins, frames = bins[order], frames[order]
+
+    hashes, anchors = [], []
+    for step in range(1, FINGERPRINT_FANOUT + 1):
+        dt = frames[step:] - frames[:-step]
+        valid = dt <= MAX_PAIR_FRAMES
+        hashes.append((bins[:-step][valid] << 15) | (bins[step:][valid] << 6) | dt[valid])
+        anchors.append(frames[:-step][valid])
+    if not hashes:
+        return np.empty((0, 2), dtype=np.int32)
+    return np.stack([np.concatenate(hashes), np.concatenate(anchors)], axis=1).astype(np.int32)
+
+
+def analyze_audio(source, embedding=False):
+    """
+    Analyze encoded audio (bytes or a file path) and return values for the AudioAnalysis model fields,
+    plus 'embedding' (float32 bytes, or None for very short clips) when asked and
+    'fingerprints' (see landmark_hashes), which the caller stores separately.
+    """
+    samples, rate = decode_audio(source)
+    result = {
+        'duration_seconds': len(samples) / rate,
+        'sample_rate': int(rate),
+        'channels': int(samples.shape[1]),
+        'loudness_lufs': integrated_loudness(samples, rate),
+        'true_peak_dbtp': true_peak(samples, rate),
+        'bpm': None,
+        'musical_key': '',
+    }
+    mono = _downsample_mono(samples, rate)
+    result['fingerprints'] = landmark_hashes(mono)
+    magnitude = _spectrogram(mono)
+    if magnitude.shape[1] > 1:
+        result['bpm'] = estimate_tempo(magnitude)
+        result['musical_key'] = estimate_key(magnitude) or ''
+    if embedding:
+        result['embedding'] = audio_embedding(magnitude, result['bpm']).tobytes() if magnitude.shape[1] > 1 else None
+    return result
+
@@ -0,0 +1,200 @@
+"""
+Write-behind buffer for project autosaves.
+
+Autosave PATCH/PUTs (?autosave=1) are validated, recorded in PendingAutosave and
+acknowledged at once. The table is shared by every worker, so a read on any worker sees
+the latest autosave, and an acknowledged autosave survives its worker being killed.
+Later autosaves of the same project replace the pending row. The project itself, with
+its summary columns and the updated_at that incremental sync follows, is then written
+once per flush rather than once per autosave.
+
+The row doesn't hold the autosaved data, only its difference from the saved project
+(diff_project_data): the top-level values that changed and the tracks that changed,
+with unchanged tracks referenced by id. An edit to one track upserts that track, not
+the whole project.
+
+Each web worker runs a flush thread, started when gunicorn boots it (gunicorn.conf.py).
+Every AUTOSAVE_FLUSH_INTERVAL seconds it claims the rows that have waited that long,
+with select_for_update(skip_locked) like the email outbox, and writes them to their
+projects, stamped with the time of the flush. A commit save or a duplicate of the
+project first applies its pending row, waiting for a flush that holds it; deleting the
+project cascades to the row. Writes are conditional on updated_at, so a pending autosave
+never overwrites a newer save.
+"""
+import atexit
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .project_summary import summarize_project_data
+
+logger = logging.getLogger(__name__)
+
+
+def _tracks_by_id(tracks):
+    """Tracks of saved data that can be referenced by their id (ids that are unique scalars)."""
+    by_id, seen = {}, set()
+    for track in tracks if isinstance(tracks, list) else ():
+        track_id = track.get('id') if isinstance(track, dict) else None
+        if isinstance(track_id, bool) or not isinstance(track_id, (str, int)):
+            continue
+        if track_id in seen:
+            by_id.pop(track_id, None)
+        else:
+            by_id[track_id] = track
+        seen.add(track_id)
+    return by_id
+
+
+def diff_project_data(base, data):
+    """The changes that turn saved project data `base` into `data`; see apply_data_diff."""
+    if not isinstance(base, dict) or not isinstance(data, dict):
+        return {'replace': data}
+    diff = {
+        'set': {key: value for key, value in data.items()
+                if key != 'tracks' and (key not in base or base[key] != value)},
+        'removed': [key for key in base if key not in data],
+    }
+    if isinstance(data.get('tracks'), list):
+        saved = _tracks_by_id(base.get('tracks'))
+        diff['tracks'] = [
+            {'saved': track['id']} if isinstance(track, dict) and saved.get(track.get('id')) == track
+            else {'new': track}
+            for track in data['tracks']
+        ]
+    elif 'tracks' in data and base.get('tracks') != data['tracks']:
+        diff['set']['tracks'] = data['tracks']
+    return diff
+
+
+def apply_data_diff(base, diff):
+    """Project data from saved data and a diff_project_data() result."""
+    if 'replace' in diff:
+        return diff['replace']
+    base = base if isinstance(base, dict) else {}
+    data = {key: value for key, value in base.items() if key not in diff['removed']}
+    data.update(diff['set'])
+    if 'tracks' in diff:
+        saved = _tracks_by_id(base.get('tracks'))
+        # A referenced track gone from the saved data was removed by a newer save
+        data['tracks'] = [item['new'] if 'new' in item else saved[item['saved']]
+                          for item in diff['tracks'] if 'new' in item or item['saved'] in saved]
+    return data
+
+
+class WriteBehindBuffer:
+    def __init__(self, interval, batch_size=100):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        # This worker's share, logged on shutdown
+        self.received = 0
+        self.written = 0
+
+    def put(self, project, fields):
+        """Buffer validated field values (name and/or data) for a project as loaded from the database."""
+        from .models import PendingAutosave
+        values = {'queued_at': timezone.now()}
+        if 'name' in fields:
+            values['name'] = fields['name']
+        if 'data' in fields:
+            values['data_diff'] = diff_project_data(project.data, fields['data'])
+        PendingAutosave.objects.update_or_create(project_id=project.pk, defaults=values)
+        with self._lock:
+            self.received += 1
+        self.start()
+
+    def pending(self, project):
+        """Buffered field values not yet written, for a project fetched with select_related('pending_autosave')."""
+        from .models import PendingAutosave
+        try:
+            row = project.pending_autosave
+        except PendingAutosave.DoesNotExist:
+            return {}
+        fields = {}
+        if row.name is not None:
+            fields['name'] = row.name
+        if row.data_diff is not None:
+            fields['data'] = apply_data_diff(project.data, row.data_diff)
+        return fields
+
+    def flush(self, project_id=None):
+        """Write one project's pending autosave, or every due one; returns the number of rows written."""
+        from .models import PendingAutosave
+        written = 0
+        with transaction.atomic():
+            if project_id is None:
+                due = timezone.now() - timedelta(seconds=self.interval)
+                rows = PendingAutosave.objects.select_for_update(skip_locked=True) \
+                    .filter(created_at__lte=due).order_by('created_at')[:self.batch_size]
+            else:
+                # Wait for a flush that already claimed it, so a commit save lands on top
+                rows = PendingAutosave.objects.select_for_update().filter(project_id=project_id)
+            for row in rows:
+                try:
+                    with transaction.atomic():
+                        written += self._write(row)
+                        row.delete()
+                except Exception:
+                    logger.exception('Autosave of project %s failed; will retry', row.project_id)
+        with self._lock:
+            self.written += written
+        return written
+
+    def _write(self, row):
+        from .models import Project
+        # Skip if the project was saved after this autosave was queued
+        current = Project.objects.filter(pk=row.project_id, updated_at__lt=row.queued_at) \
+            .values('updated_at', *(['data'] if row.data_diff is not None else [])).first()
+        if current is None:
+            return 0
+        # Stamped now, not when queued, so incremental sync sees it within SYNC_OVERLAP
+        values = {'updated_at': timezone.now()}
+        if row.name is not None:
+            values['name'] = row.name
+        if row.data_diff is not None:
+            values['data'] = apply_data_diff(current['data'], row.data_diff)
+            values.update(summarize_project_data(values['data']))
+        return Project.objects.filter(pk=row.project_id, updated_at=current['updated_at']).update(**values)
+
+    def start(self):
+        """Start this process's flush thread (once); gunicorn calls it as each worker boots."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='autosave-flush', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Autosave flush failed')
+            finally:
+                connection.close()
+
+    def shutdown(self):
+        """Stop the flush thread; rows still pending are flushed by the other workers, or after the restart."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.received:
+            logger.info('Autosave: %d saves received, %d rows written by this worker', self.received, self.written)
+
+
+buffer = WriteBehindBuffer(settings.AUTOSAVE_FLUSH_INTERVAL)
+
+
+def wants_autosave(request):
+    """Clients opt in per request with ?autosave=1."""
+    return request.query_params.get('autosave') == '1'
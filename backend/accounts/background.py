@@ -0,0 +1,117 @@
+import atexit
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_process_pool = None
+_callback_pool = None
+_job_pool = None
+
+
+def get_process_pool():
+    """One lazily created process pool per worker process, for CPU-bound jobs like audio analysis."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.BACKGROUND_PROCESS_WORKERS)
+        atexit.register(_process_pool.shutdown, wait=False, cancel_futures=True)
+    return _process_pool
+
+
+def _get_callback_pool():
+    global _callback_pool
+    if _callback_pool is None:
+        _callback_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='background-callback')
+    return _callback_pool
+
+
+def run_in_process(fn, *args, on_success=None, on_error=None):
+    """
+    Run fn(*args) in the process pool once the current transaction commits, so the request
+    returns immediately. The callbacks run on a background thread of this process and may use
+    the ORM: on_success(result) after the job returns, on_error(exc) if it raises.
+    """
+    name = getattr(fn, '__name__', repr(fn))
+
+    def finish(future):
+        close_old_connections()
+        try:
+            try:
+                result = future.result()
+            except Exception as exc:
+                logger.exception('Background job %s failed', name)
+                if on_error is not None:
+                    on_error(exc)
+            else:
+                if on_success is not None:
+                    on_success(result)
+        except Exception:
+            logger.exception('Callback for background job %s failed', name)
+        finally:
+            # Nothing else closes connections opened outside the request cycle
+            connection.close()
+
+    def submit():
+        future = get_process_pool().submit(fn, *args)
+        future.add_done_callback(lambda f: _get_callback_pool().submit(finish, f))
+
+    transaction.on_commit(submit)
+
+
+def run_in_thread(fn, *args):
+    """
+    Run fn(*args) on this process's job thread once the current transaction commits, for
+    work started from a request (admin actions, image derivatives). Jobs run one at a time so
+    a burst of clicks can't crowd out the requests; they don't survive a worker restart.
+    """
+    global _job_pool
+    if _job_pool is None:
+        _job_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='background-job')
+    name = getattr(fn, '__name__', repr(fn))
+
+    def job():
+        close_old_connections()
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception('Background job %s failed', name)
+        finally:
+            connection.close()
+
+    transaction.on_commit(lambda: _job_pool.submit(job))
+
+
+def _call_and_remove(fn, path, *args):
+    try:
+        return fn(path, *args)
+    finally:
+        os.remove(path)
+
+
+def run_on_spooled_file(field_file, fn, *args, on_success=None, on_error=None):
+    """
+    run_in_process(fn, path, *args, ...) where path is a local copy of field_file. The copy is
+    written chunk by chunk once the current transaction commits, so a large upload is never
+    held in memory or pickled to the pool, and fn's process removes it when fn returns.
+    """
+    def spool():
+        handle, path = tempfile.mkstemp(prefix='spool-', suffix=os.path.splitext(field_file.name)[1])
+        try:
+            with os.fdopen(handle, 'wb') as spooled:
+                field_file.open('rb')
+                for chunk in field_file.chunks():
+                    spooled.write(chunk)
+        except Exception:
+            os.remove(path)
+            logger.exception('Spooling %s for %s failed', field_file.name, getattr(fn, '__name__', repr(fn)))
+            if on_error is not None:
+                on_error(None)
+            return
+        run_in_process(_call_and_remove, fn, path, *args, on_success=on_success, on_error=on_error)
+
+    transaction.on_commit(spool)
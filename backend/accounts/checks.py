@@ -0,0 +1,16 @@
+from django.core.checks import Warning, register
+
+from .audio_analysis import ffmpeg_available
+
+
+@register()
+def ffmpeg_installed(app_configs, **kwargs):
+    """Only WAV can be decoded without ffmpeg; every other upload's analysis and renditions fail."""
+    if ffmpeg_available():
+        return []
+    return [Warning(
+        'ffmpeg and ffprobe are not on the PATH.',
+        hint='Install ffmpeg on every web and worker host. Without it only WAV uploads are analyzed and '
+             'get a preview; MP3, AAC, OGG, FLAC and other uploads are marked as failed analysis.',
+        id='accounts.W001',
+    )]
@@ -0,0 +1,328 @@
+"""
+Real-time collaborative project editing over WebSockets.
+
+Each project with connected editors has a Room in this process holding the authoritative
+copy of Project.data. Editors send small ops; the room applies them, acks the sender and
+fans them out to the other editors, and writes the data back on a debounced schedule.
+The owner and the collaborators they invited (ProjectCollaborator) may join a room.
+
+Rooms live in memory, so every editor of a project must reach the same process. The
+WebSockets are therefore served by a single ASGI process next to the WSGI web workers
+(see start.sh), and the proxy sends /ws/ to it.
+
+Writes are conditional on the updated_at the room loaded or last saved. When the
+project changed underneath the room, through REST or an autosave, the room reloads it and replays its unsaved ops on top. Ops that no longer
+apply are dropped. Every editor then gets a fresh snapshot, and the write is retried.
+
+Protocol (JSON text frames on /ws/projects/<id>/?token=<access token>):
+  server → client  {"type": "snapshot", "version", "data"} once after connecting
+  client → server  {"type": "op", "clientSeq", "op": {"op": "note.add", ...}}
+  server → sender  {"type": "ack", "clientSeq", "version"} or {"type": "error", "clientSeq", "error"}
+  server → others  {"type": "op", "version", "op"}
+  server → all     {"type": "snapshot", "version", "data"} again after a reload
+"""
+import asyncio
+import copy
+import itertools
+import json
+import logging
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+PATH_RE = re.compile(r'^/ws/projects/(\d+)/$')
+NOTE_FIELDS = ('pitch', 'startBeat', 'duration', 'velocity')
+MIXER_FIELDS = {'volume': (int, float), 'pan': (int, float), 'muted': bool, 'solo': bool}
+
+
+class OpError(Exception):
+    pass
+
+
+class StaleProject(Exception):
+    """The project was saved by someone else since the room loaded or last saved it."""
+
+
+# ─── Ops ───
+
+def _find(items, item_id, kind):
+    for item in items:
+        if isinstance(item, dict) and item.get('id') == item_id:
+            return item
+    raise OpError(f'{kind} {item_id} not found')
+
+
+def _number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise OpError(f'{name} must be a number')
+    return value
+
+
+def apply_op(data, op):
+    """Apply one op to project data in place. Raises OpError for malformed or stale ops."""
+    if not isinstance(op, dict):
+        raise OpError('op must be an object')
+    kind = op.get('op')
+    track = _find(data.setdefault('tracks', []), op.get('trackId'), 'track')
+
+    if kind == 'mixer.set':
+        field, value = op.get('field'), op.get('value')
+        if field not in MIXER_FIELDS or isinstance(value, bool) != (MIXER_FIELDS[field] is bool) \
+                or not isinstance(value, MIXER_FIELDS[field]):
+            raise OpError('invalid mixer change')
+        track[field] = value
+        return
+
+    clip = _find(track.setdefault('clips', []), op.get('clipId'), 'clip')
+    if kind == 'clip.move':
+        start = _number(op.get('startBeat'), 'startBeat')
+        to_track_id = op.get('toTrackId', track.get('id'))
+        if to_track_id != track.get('id'):
+            target = _find(data['tracks'], to_track_id, 'track')
+            track['clips'].remove(clip)
+            target.setdefault('clips', []).append(clip)
+        clip['startBeat'] = start
+    elif kind == 'note.add':
+        note = op.get('note')
+        if not isinstance(note, dict) or 'id' not in note:
+            raise OpError('note must be an object with an id')
+        clip.setdefault('notes', []).append(
+            {'id': note['id'], **{field: _number(note.get(field), field) for field in NOTE_FIELDS}}
+        )
+    elif kind == 'note.update':
+        note = _find(clip.setdefault('notes', []), op.get('noteId'), 'note')
+        changes = op.get('changes')
+        if not isinstance(changes, dict) or not set(changes) <= set(NOTE_FIELDS):
+            raise OpError(f'changes may only contain {", ".join(NOTE_FIELDS)}')
+        note.update({field: _number(value, field) for field, value in changes.items()})
+    elif kind == 'note.remove':
+        clip['notes'].remove(_find(clip.get('notes', []), op.get('noteId'), 'note'))
+    else:
+        raise OpError(f'unknown op {kind!r}')
+
+
+# ─── Rooms ───
+
+class Connection:
+    """One editor. Outgoing frames go through a bounded queue so a slow client never blocks fan-out."""
+    _ids = itertools.count(1)
+
+    def __init__(self, max_queue):
+        self.id = next(self._ids)
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def push(self, text):
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Room:
+    def __init__(self, project_id, data, base):
+        self.project_id = project_id
+        self.data = data
+        self.base = base  # updated_at of the row that data was loaded from or saved as
+        self.pending_ops = []  # applied since the last successful save
+        self.version = 0
+        self.connections = set()
+        self.dirty_since = None
+        self.flush_handle = None
+
+
+class CollabHub:
+    def __init__(self, load, save, debounce=None, max_delay=None):
+        self.load = load  # async (project_id) -> (data, base)
+        self.save = save  # async (project_id, data, base) -> new base; raises StaleProject
+        self.debounce = settings.COLLAB_SAVE_DEBOUNCE if debounce is None else debounce
+        self.max_delay = settings.COLLAB_SAVE_MAX_DELAY if max_delay is None else max_delay
+        self.rooms = {}
+        self.saved_writes = 0
+        self._loading = {}
+
+    async def join(self, project_id, connection):
+        room = self.rooms.get(project_id)
+        if room is None:
+            # Several editors may connect at once; load the project only once
+            if project_id not in self._loading:
+                self._loading[project_id] = asyncio.ensure_future(self.load(project_id))
+            try:
+                data, base = await self._loading[project_id]
+            finally:
+                self._loading.pop(project_id, None)
+            room = self.rooms.setdefault(project_id, Room(project_id, data, base))
+        room.connections.add(connection)
+        return room
+
+    async def leave(self, room, connection):
+        room.connections.discard(connection)
+        if not room.connections:
+            await self.flush(room)
+            if not room.connections:
+                self.rooms.pop(room.project_id, None)
+
+    def handle(self, room, connection, message):
+        """Apply an op message from connection; returns the reply for the sender."""
+        client_seq = message.get('clientSeq') if isinstance(message, dict) else None
+        if not isinstance(message, dict) or message.get('type') != 'op':
+            return {'type': 'error', 'clientSeq': client_seq, 'error': 'expected an op message'}
+        try:
+            apply_op(room.data, message.get('op'))
+        except OpError as exc:
+            return {'type': 'error', 'clientSeq': client_seq, 'error': str(exc)}
+
+        room.pending_ops.append(message['op'])
+        room.version += 1
+        frame = json.dumps({'type': 'op', 'version': room.version, 'op': message['op']})
+        for other in room.connections:
+            if other is not connection:
+                other.push(frame)
+        self._schedule_flush(room)
+        return {'type': 'ack', 'clientSeq': client_seq, 'version': room.version}
+
+    def _schedule_flush(self, room):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if room.dirty_since is None:
+            room.dirty_since = now
+        if room.flush_handle is not None:
+            room.flush_handle.cancel()
+        # Debounce, but never hold unsaved edits longer than max_delay
+        delay = max(0.0, min(self.debounce, room.dirty_since + self.max_delay - now))
+        room.flush_handle = loop.call_later(delay, lambda: asyncio.ensure_future(self.flush(room)))
+
+    async def flush(self, room):
+        if room.flush_handle is not None:
+            room.flush_handle.cancel()
+            room.flush_handle = None
+        if room.dirty_since is None:
+            return
+        room.dirty_since = None
+        # Snapshot on the event loop so later ops can't mutate the data mid-save
+        snapshot = copy.deepcopy(room.data)
+        saved_ops = len(room.pending_ops)
+        try:
+            room.base = await self.save(room.project_id, snapshot, room.base)
+            del room.pending_ops[:saved_ops]
+            self.saved_writes += 1
+        except StaleProject:
+            await self.rebase(room)
+            room.dirty_since = asyncio.get_running_loop().time()
+            self._schedule_flush(room)
+        except Exception:
+            logger.exception('Saving collaborative edits to project %s failed', room.project_id)
+            room.dirty_since = asyncio.get_running_loop().time()
+            self._schedule_flush(room)
+
+    async def rebase(self, room):
+        """Reload the project and replay the room's unsaved ops on it, then resend the snapshot."""
+        data, base = await self.load(room.project_id)
+        # Ops that arrived while loading are in pending_ops too, so nothing is lost
+        for op in room.pending_ops:
+            try:
+                apply_op(data, op)
+            except OpError:
+                pass  # conflicts with the change made outside the room
+        room.data, room.base = data, base
+        room.version += 1
+        frame = json.dumps({'type': 'snapshot', 'version': room.version, 'data': room.data})
+        for connection in room.connections:
+            connection.push(frame)
+
+    async def flush_all(self):
+        await asyncio.gather(*(self.flush(room) for room in list(self.rooms.values())))
+
+
+# ─── Persistence and auth (ORM) ───
+
+@sync_to_async
+def _load_project_data(project_id):
+    from .autosave import buffer as autosave_buffer
+    from .models import Project
+    # Start from the latest autosave, if one is still pending
+    autosave_buffer.flush(project_id)
+    return Project.objects.values_list('data', 'updated_at').get(pk=project_id)
+
+
+@sync_to_async
+def _save_project_data(project_id, data, base):
+    from .models import Project
+    with transaction.atomic():
+        project = Project.objects.select_for_update().filter(pk=project_id).first()
+        if project is None:  # deleted while editors were connected
+            return base
+        if project.updated_at != base:
+            raise StaleProject(project_id)
+        project.data = data
+        project.save(update_fields=['data', 'updated_at'])
+    return project.updated_at
+
+
+@sync_to_async
+def _authorize(token, project_id):
+    """User id for a valid access token of the project's owner or one of its collaborators, else None."""
+    from django.db.models import Q
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    from .models import Project
+    try:
+        user_id = AccessToken(token)[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    editors = Q(user_id=user_id) | Q(collaborators__user_id=user_id)
+    return user_id if Project.objects.filter(editors, pk=project_id).exists() else None
+
+
+hub = CollabHub(_load_project_data, _save_project_data)
+
+
+def _origin_allowed(scope):
+    origin = dict(scope.get('headers') or []).get(b'origin')
+    return origin is None or origin.decode('latin-1') in settings.CORS_ALLOWED_ORIGINS
+
+
+async def websocket_application(scope, receive, send):
+    match = PATH_RE.match(scope['path'])
+    if await receive() != {'type': 'websocket.connect'} or not match or not _origin_allowed(scope):
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    project_id = int(match.group(1))
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+    if await _authorize(token, project_id) is None:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    await send({'type': 'websocket.accept'})
+    connection = Connection(settings.COLLAB_MAX_QUEUE)
+    room = await hub.join(project_id, connection)
+    connection.push(json.dumps({'type': 'snapshot', 'version': room.version, 'data': room.data}))
+
+    async def writer():
+        while True:
+            text = await connection.queue.get()
+            await send({'type': 'websocket.send', 'text': text})
+
+    writer_task = asyncio.ensure_future(writer())
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            try:
+                message = json.loads(event.get('text') or event.get('bytes') or b'')
+            except ValueError:
+                message = None
+            connection.push(json.dumps(hub.handle(room, connection, message)))
+            if connection.overflowed:
+                await send({'type': 'websocket.close', 'code': 4408})
+                break
+    finally:
+        writer_task.cancel()
+        await hub.leave(room, connection)
@@ -0,0 +1,115 @@
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+class ResendEmailBackend(BaseEmailBackend):
+    """Django email backend that delivers through the Resend API."""
+
+    def open(self):
+        import resend
+        resend.api_key = settings.RESEND_API_KEY
+        return False
+
+    def send_messages(self, email_messages):
+        import resend
+        self.open()
+        sent = 0
+        for message in email_messages:
+            try:
+                resend.Emails.send({
+                    "from": message.from_email,
+                    "to": message.to,
+                    "subject": message.subject,
+                    "html": message.body,
+                })
+                sent += 1
+            except Exception:
+                if not self.fail_silently:
+                    raise
+        return sent
+
+
+@lru_cache(maxsize=None)
+def _template(name):
+    """Compile each email template once per process."""
+    return get_template(name)
+
+
+def queue_email(to, subject, template_name, context):
+    """Render an email and write it to the outbox. Delivery happens in send_outbox_emails."""
+    html = _template(template_name).render(context)
+    return OutboxEmail.objects.create(to=to, subject=subject, html=html)
+
+
+def queue_password_reset_email(user, reset_link):
+    expires_at = timezone.now() + timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT)
+    return queue_email(
+        user.email,
+        'Reset your Sonara password',
+        'accounts/emails/password_reset.html',
+        {'reset_link': reset_link, 'expires_at': expires_at},
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base, ... capped at one hour."""
+    return timedelta(seconds=min(settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 3600))
+
+
+def deliver_due_emails(batch_size=None, max_attempts=None):
+    """
+    Claim one batch of due outbox emails and send them over a single backend connection.
+    Returns (sent, failed) counts for the batch.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    sent = failed = 0
+
+    with transaction.atomic():
+        # skip_locked lets several workers drain the outbox without sending twice
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        try:
+            for email in batch:
+                message = EmailMessage(email.subject, email.html, settings.DEFAULT_FROM_EMAIL, [email.to])
+                message.content_subtype = 'html'
+                email.attempts += 1
+                try:
+                    connection.send_messages([message])
+                except Exception as exc:
+                    email.last_error = str(exc)
+                    if email.attempts >= max_attempts:
+                        email.status = OutboxEmail.STATUS_FAILED
+                    else:
+                        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                    failed += 1
+                else:
+                    email.status = OutboxEmail.STATUS_SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+
+        OutboxEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+
+    return sent, failed
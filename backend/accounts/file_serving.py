@@ -0,0 +1,168 @@
+import gzip
+import mimetypes
+import os
+import re
+import tempfile
+
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz variants are written without it
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+# Precompressed siblings written next to the original, in order of preference
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+# Keep a precompressed variant only when it is clearly smaller (WAV yes, MP3/OGG no)
+VARIANT_MAX_RATIO = 0.9
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _write_atomic(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.chmod(temp_path, 0o644)  # mkstemp creates it owner-only
+    os.replace(temp_path, path)
+
+
+def write_precompressed(path):
+    """Write the .gz (and, with brotli installed, .br) siblings serve_file looks for, where they pay off."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    compressors = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda d: brotli.compress(d, quality=11)))
+    written = set()
+    for suffix, compress in compressors:
+        compressed = compress(data)
+        if len(compressed) <= len(data) * VARIANT_MAX_RATIO:
+            _write_atomic(path + suffix, compressed)
+            written.add(suffix)
+    # A variant left over from an earlier version of the file would be served in its place
+    for _, suffix in PRECOMPRESSED:
+        if suffix not in written and os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single-range header, None to ignore it; ValueError if unsatisfiable."""
+    match = _RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:  # suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise ValueError('unsatisfiable range')
+    return start, end
+
+
+def encoding_qualities(header):
+    """{content coding: q} from an Accept-Encoding header; a malformed q counts as 0."""
+    qualities = {}
+    for token in header.split(','):
+        coding, *params = token.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def select_encoding(request, path):
+    """(coding, suffix) of the precompressed sibling to send, or (None, '') for the file itself."""
+    if request.headers.get('Range'):
+        return None, ''  # ranges are served from the identity representation
+    qualities = encoding_qualities(request.headers.get('Accept-Encoding', ''))
+    best, best_quality = (None, ''), 0.0
+    # Highest q wins; ties go to the order of PRECOMPRESSED. q=0 (or an unlisted coding without *) refuses it
+    for encoding, suffix in PRECOMPRESSED:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality and os.path.exists(path + suffix):
+            best, best_quality = (encoding, suffix), quality
+    return best
+
+
+def none_match(header, etag):
+    """Whether If-None-Match lists etag (or *), by the weak comparison RFC 9110 prescribes for it."""
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return etags == ['*'] or etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, content_type=None, cache_control=IMMUTABLE, etag=None):
+    """
+    Serve a file from disk with conditional GET, single byte ranges and precompressed
+    .br/.gz siblings. Whole-file responses go through FileResponse, so the WSGI server
+    can use sendfile().
+    Each encoding is its own representation, so it gets its own ETag (etag-br, etag-gzip).
+    """
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    encoding, suffix = select_encoding(request, path)
+    if etag:
+        etag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+    if etag and none_match(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+    elif encoding:
+        response = FileResponse(open(path + suffix, 'rb'), content_type=content_type)
+        response['Content-Encoding'] = encoding
+    else:
+        response = _file_response(request, path, content_type)
+    response['Cache-Control'] = cache_control
+    if etag:
+        response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _file_response(request, path, content_type):
+    """The file itself: a single byte range if one was asked for, else all of it."""
+    size = os.path.getsize(path)
+    range_header = request.headers.get('Range')
+
+    if range_header:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+            return response
+    return FileResponse(open(path, 'rb'), content_type=content_type)
@@ -0,0 +1,143 @@
+"""
+Duplicate-upload detection from landmark fingerprints (accounts/audio_analysis.py).
+
+Each upload's (hash, frame) pairs go into the AudioFingerprint table. A new upload looks
+up a sample of its hashes; two recordings of the same audio share many hashes at one
+constant frame offset, while unrelated audio only collides at scattered offsets. Matches
+against the uploader's own tracks/publications or anyone's public publications are saved
+as AudioMatch rows.
+"""
+from collections import Counter
+
+import numpy as np
+from django.db.models import Q
+
+from .audio_analysis import ANALYSIS_SAMPLE_RATE, FINGERPRINT_HOP
+from .models import AudioFingerprint, AudioMatch, Publication, Track
+
+QUERY_HASHES = 1000  # evenly spaced sample looked up per upload; bounds lookup cost
+LOOKUP_CHUNK = 500
+INSERT_BATCH = 5000
+MIN_SCORE = 20
+MIN_COVERAGE = 0.05
+MAX_CANDIDATES = 20
+
+MODELS = {AudioFingerprint.KIND_TRACK: Track, AudioFingerprint.KIND_PUBLICATION: Publication}
+KINDS = {model: kind for kind, model in MODELS.items()}
+KIND_LABELS = {AudioFingerprint.KIND_TRACK: 'track', AudioFingerprint.KIND_PUBLICATION: 'publication'}
+
+
+def store_fingerprints(kind, object_id, fingerprints):
+    AudioFingerprint.objects.filter(kind=kind, object_id=object_id).delete()
+    AudioFingerprint.objects.bulk_create(
+        (AudioFingerprint(hash=int(h), kind=kind, object_id=object_id, offset=int(offset)) for h, offset in fingerprints),
+        batch_size=INSERT_BATCH,
+    )
+
+
+def find_matches(fingerprints, exclude=None):
+    """[(kind, object_id, score, coverage, offset_frames)] of stored items aligned with fingerprints, best first."""
+    if not len(fingerprints):
+        return []
+    fingerprints = fingerprints[np.argsort(fingerprints[:, 1], kind='stable')]
+    if len(fingerprints) > QUERY_HASHES:
+        fingerprints = fingerprints[np.linspace(0, len(fingerprints) - 1, QUERY_HASHES).astype(int)]
+    query_offsets = {}
+    for h, offset in fingerprints.tolist():
+        query_offsets.setdefault(h, []).append(offset)
+
+    votes = Counter()
+    hashes = list(query_offsets)
+    for start in range(0, len(hashes), LOOKUP_CHUNK):
+        rows = AudioFingerprint.objects.filter(hash__in=hashes[start:start + LOOKUP_CHUNK])
+        if exclude is not None:
+            rows = rows.exclude(kind=exclude[0], object_id=exclude[1])
+        for h, kind, object_id, offset in rows.values_list('hash', 'kind', 'object_id', 'offset').iterator(chunk_size=5000):
+            for query_offset in query_offsets[h]:
+                votes[kind, object_id, offset - query_offset] += 1
+
+    best = {}
+    for (kind, object_id, delta), count in votes.items():
+        if count > best.get((kind, object_id), (0, 0))[0]:
+            best[kind, object_id] = (count, delta)
+    return sorted(
+        (
+            (kind, object_id, score, score / len(fingerprints), delta)
+            for (kind, object_id), (score, delta) in best.items()
+            if score >= MIN_SCORE and score / len(fingerprints) >= MIN_COVERAGE
+        ),
+        key=lambda match: -match[2],
+    )[:MAX_CANDIDATES]
+
+
+def _visible_ids(user_id, kind, ids):
+    """The subset of ids (of one kind) a user may see matched: their own uploads or public publications."""
+    if kind == AudioFingerprint.KIND_TRACK:
+        queryset = Track.objects.filter(pk__in=ids, user_id=user_id)
+    else:
+        queryset = Publication.objects.filter(Q(user_id=user_id) | Q(is_public=True), pk__in=ids)
+    return set(queryset.values_list('pk', flat=True))
+
+
+def index_upload(instance, fingerprints):
+    """Match a freshly analyzed upload against the index, record duplicates, then add it to the index."""
+    kind = KINDS[type(instance)]
+    candidates = find_matches(fingerprints, exclude=(kind, instance.pk))
+    visible = {
+        match_kind: _visible_ids(instance.user_id, match_kind, [c[1] for c in candidates if c[0] == match_kind])
+        for match_kind in MODELS
+    }
+    AudioMatch.objects.bulk_create([
+        AudioMatch(
+            source_kind=kind, source_id=instance.pk, matched_kind=match_kind, matched_id=object_id,
+            score=score, coverage=coverage, offset_seconds=delta * FINGERPRINT_HOP / ANALYSIS_SAMPLE_RATE,
+        )
+        for match_kind, object_id, score, coverage, delta in candidates
+        if object_id in visible[match_kind]
+    ], ignore_conflicts=True)
+    store_fingerprints(kind, instance.pk, fingerprints)
+
+
+def delete_fingerprints(instance):
+    kind = KINDS[type(instance)]
+    AudioFingerprint.objects.filter(kind=kind, object_id=instance.pk).delete()
+    AudioMatch.objects.filter(
+        Q(source_kind=kind, source_id=instance.pk) | Q(matched_kind=kind, matched_id=instance.pk)
+    ).delete()
+
+
+def matches_for(instance, user):
+    """Likely duplicates of instance in either direction that user may see, best first."""
+    kind = KINDS[type(instance)]
+    rows = AudioMatch.objects.filter(
+        Q(source_kind=kind, source_id=instance.pk) | Q(matched_kind=kind, matched_id=instance.pk)
+    )
+    others = []
+    for match in rows:
+        if (match.source_kind, match.source_id) == (kind, instance.pk):
+            others.append((match.matched_kind, match.matched_id, match, match.offset_seconds))
+        else:
+            others.append((match.source_kind, match.source_id, match, -match.offset_seconds))
+
+    objects = {}
+    for other_kind, model in MODELS.items():
+        ids = _visible_ids(user.pk, other_kind, [o[1] for o in others if o[0] == other_kind])
+        for obj in model.objects.filter(pk__in=ids).select_related('user'):
+            objects[other_kind, obj.pk] = obj
+
+    results = []
+    for other_kind, object_id, match, offset_seconds in others:
+        obj = objects.get((other_kind, object_id))
+        if obj is None:
+            continue
+        results.append({
+            'kind': KIND_LABELS[other_kind],
+            'id': obj.pk,
+            'title': obj.title,
+            'username': obj.user.username,
+            'score': match.score,
+            'coverage': round(match.coverage, 3),
+            'offset_seconds': round(offset_seconds, 2),
+            'detected_at': match.created_at,
+        })
+    return sorted(results, key=lambda result: -result['score'])
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+# Fields whose writes don't change a cached card (play counts are overlaid from the row instead)
+VOLATILE_FIELDS = {
+    'Publication': {'play_count'},
+    'User': {'last_login'},
+}
+
+
+def fragment_key(instance):
+    """Cache key for one serialized card: model, primary key and the row's cache_version."""
+    return f'card:{instance._meta.label_lower}:{instance.pk}:{instance.cache_version}'
+
+
+def version_bump(model):
+    """
+    Merge into queryset.update() calls that change cached fields: .update(bpm=…, **version_bump(Model)).
+    Also stamps modified_at, which update() skips, so incremental sync (accounts/sync.py) sees the change.
+    """
+    names = {field.name for field in model._meta.concrete_fields}
+    bump = {}
+    if 'cache_version' in names:
+        bump['cache_version'] = F('cache_version') + 1
+    if 'modified_at' in names:
+        bump['modified_at'] = timezone.now()
+    return bump
+
+
+def cached_fragments(entries):
+    """
+    entries is a list of (key, render) pairs. Returns the fragment for each entry, reading
+    all of them with one get_many and calling render() and storing only for the misses.
+    """
+    cache = caches['fragments']
+    found = cache.get_many({key for key, _ in entries})
+    missing = {}
+    for key, render in entries:
+        if key not in found:
+            found[key] = missing[key] = dict(render())
+    if missing:
+        cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+    return [found[key] for key, _ in entries]
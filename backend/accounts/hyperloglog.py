@@ -0,0 +1,103 @@
+"""
+HyperLogLog sketches for counting distinct listeners without storing who they are.
+
+A sketch is 2**PRECISION one-byte registers (4 KB). Each key is hashed to 64 bits; the
+first PRECISION bits pick a register, which keeps the highest "position of the first
+1 bit" seen in the rest. Sketches of the same precision merge by taking the register
+maxima, so daily sketches combine into weekly or all-time counts with no double
+counting of listeners who came back.
+
+Counts use Ertl's improved estimator ("New cardinality estimation algorithms for
+HyperLogLog sketches", 2017), which needs no bias tables and stays unbiased from a
+handful of keys up to billions. The relative standard error is 1.04 / sqrt(2**PRECISION),
+1.6% at precision 12; `manage.py bench_hyperloglog` measures it.
+"""
+import hashlib
+import math
+
+import numpy as np
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+HASH_BITS = 64
+RANK_BITS = HASH_BITS - PRECISION
+STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+
+def _sigma(x):
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x):
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    def __init__(self, registers=None):
+        if registers is not None and len(registers) != REGISTERS:
+            raise ValueError(f'Expected a {REGISTERS}-byte sketch, got {len(registers)} bytes')
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+
+    @staticmethod
+    def _position(key):
+        if isinstance(key, str):
+            key = key.encode()
+        value = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+        index = value >> RANK_BITS
+        rest = value & ((1 << RANK_BITS) - 1)
+        return index, RANK_BITS - rest.bit_length() + 1
+
+    def add(self, key):
+        """Count key (str or bytes); returns whether the sketch changed."""
+        index, rank = self._position(key)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def would_change(self, key):
+        index, rank = self._position(key)
+        return rank > self.registers[index]
+
+    def merge(self, other):
+        """Fold another sketch into this one (union of the counted keys)."""
+        merged = np.maximum(np.frombuffer(self.registers, np.uint8), np.frombuffer(other.registers, np.uint8))
+        self.registers = bytearray(merged.tobytes())
+        return self
+
+    def count(self):
+        histogram = np.bincount(np.frombuffer(self.registers, np.uint8), minlength=RANK_BITS + 2)
+        m = REGISTERS
+        denominator = m * _tau(1 - histogram[RANK_BITS + 1] / m)
+        for k in range(RANK_BITS, 0, -1):
+            denominator = 0.5 * (denominator + histogram[k])
+        denominator += m * _sigma(histogram[0] / m)
+        return round(m * m / (2 * math.log(2)) / denominator)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def union(cls, sketches):
+        result = cls()
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
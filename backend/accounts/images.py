@@ -0,0 +1,153 @@
+import io
+import os
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .storage_io import delete_files, save_files
+
+# Longest edge of each derivative, and the formats written for every size
+DERIVATIVE_SIZES = (64, 256, 1024)
+DERIVATIVE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+# (model field, derivatives JSON field) pairs that the pipeline maintains
+IMAGE_FIELDS = {
+    'User': (('profile_picture', 'profile_picture_derivatives'), ('header_image', 'header_image_derivatives')),
+    'Publication': (('cover_image', 'cover_image_derivatives'),),
+}
+
+
+def open_image(file):
+    """
+    Open an uploaded image with decompression-bomb guards: the pixel count is checked from
+    the header before any decoding, and Pillow's own bomb warning is promoted to an error.
+    """
+    max_pixels = settings.IMAGE_MAX_PIXELS
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(file)
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ValidationError('Image dimensions are too large.')
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ValidationError(
+            f'Image is {width}×{height} pixels; the limit is {max_pixels // 1_000_000} megapixels.'
+        )
+    return image
+
+
+def validate_image_pixels(file):
+    """Reject images whose decoded size would exceed IMAGE_MAX_PIXELS."""
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    open_image(file)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+
+
+def _encode(image, fmt):
+    options = dict(DERIVATIVE_FORMATS[fmt])
+    pil_format = options.pop('format')
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha — flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    # Re-encoding from pixel data only drops EXIF/ICC/XMP metadata
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_derivatives(file):
+    """Return {size: {fmt: bytes}} for one source image."""
+    image = open_image(file)
+    # Let the JPEG decoder downscale by a power of two when the source is much larger
+    image.draft('RGB', (max(DERIVATIVE_SIZES), max(DERIVATIVE_SIZES)))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    rendered = {}
+    # Largest first so each smaller size resamples from the previous one
+    for size in sorted(DERIVATIVE_SIZES, reverse=True):
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        rendered[str(size)] = {fmt: _encode(image, fmt) for fmt in DERIVATIVE_FORMATS}
+    return rendered
+
+
+def derivative_files(derivatives):
+    """(storage, name) of every file in a derivatives JSON, for storage_io.delete_files."""
+    return [(default_storage, name)
+            for formats in (derivatives or {}).get('files', {}).values() for name in formats.values()]
+
+
+def delete_derivatives(derivatives):
+    delete_files(derivative_files(derivatives))
+
+
+def build_derivatives(field_file):
+    """Generate and store every derivative of field_file, returning the JSON to persist."""
+    stem, _ = os.path.splitext(field_file.name)
+    directory, base = os.path.split(stem)
+    field_file.open('rb')
+    try:
+        rendered = render_derivatives(field_file)
+    finally:
+        field_file.seek(0)
+
+    keys = [(size, fmt) for size, formats in rendered.items() for fmt in formats]
+    stored = save_files(
+        (default_storage, f'{directory}/derivatives/{base}_{size}.{fmt}', ContentFile(rendered[size][fmt]))
+        for size, fmt in keys
+    )
+    files = {}
+    for (size, fmt), name in zip(keys, stored):
+        files.setdefault(size, {})[fmt] = name
+    return {'source': field_file.name, 'files': files}
+
+
+def sync_derivatives(instance, force=False):
+    """
+    Bring the derivatives JSON of every image field on instance in line with its current file.
+    Returns the names of the JSON fields that changed.
+    """
+    changed = []
+    for image_field, json_field in IMAGE_FIELDS[type(instance).__name__]:
+        field_file = getattr(instance, image_field)
+        current = getattr(instance, json_field) or {}
+        source = field_file.name if field_file else None
+        if current.get('source') == source and not force:
+            continue
+        delete_derivatives(current)
+        setattr(instance, json_field, build_derivatives(field_file) if source else {})
+        changed.append(json_field)
+    return changed
+
+
+def srcset_map(derivatives, field_file):
+    """
+    {fmt: 'url 64w, url 256w, …'} for use directly as <source srcset>; None without derivatives
+    of field_file's current image (none yet, or still being generated after an upload).
+    """
+    derivatives = derivatives or {}
+    files = derivatives.get('files')
+    if not files or derivatives.get('source') != (field_file.name if field_file else None):
+        return None
+    return {
+        fmt: ', '.join(
+            f'{default_storage.url(files[size][fmt])} {size}w'
+            for size in sorted(files, key=int)
+        )
+        for fmt in DERIVATIVE_FORMATS
+    }
@@ -0,0 +1,159 @@
+"""
+Bulk maintenance jobs, run from admin actions (on a background thread, see
+background.run_in_thread) or from management commands. Each walks its queryset in
+chunks and returns counts, which are also logged.
+"""
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .images import sync_derivatives
+from .models import (
+    STORED_FILE_SIZES, AudioFingerprint, AudioMatch, Project, Publication, Sample, StorageUsage, Tombstone, Track,
+    save_derivatives,
+)
+from .project_summary import summarize_project_data
+from .sample_packs import FILE_NAME_RE
+from .similarity import index as similarity_index
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+
+def recompute_project_summaries(queryset):
+    """Recompute the summary columns (counts, duration, size, hash) of projects from their data."""
+    batch, updated = [], 0
+    for project in queryset.select_related(None).only('pk', 'data').iterator(chunk_size=CHUNK_SIZE):
+        for field, value in summarize_project_data(project.data).items():
+            setattr(project, field, value)
+        batch.append(project)
+        if len(batch) >= CHUNK_SIZE:
+            updated += Project.objects.bulk_update(batch, Project.SUMMARY_FIELDS)
+            batch.clear()
+    updated += Project.objects.bulk_update(batch, Project.SUMMARY_FIELDS)
+    logger.info('Recomputed summaries of %d projects', updated)
+    return updated
+
+
+def regenerate_image_derivatives(queryset, force=True):
+    """Rebuild image derivatives of users or publications; returns (updated, failed)."""
+    model = queryset.model
+    updated = failed = superseded = 0
+    for instance in queryset.iterator(chunk_size=CHUNK_SIZE):
+        try:
+            changed = sync_derivatives(instance, force=force)
+        except (ValidationError, OSError) as exc:
+            failed += 1
+            logger.warning('Image derivatives for %s %s failed: %s', model.__name__, instance.pk, exc)
+            continue
+        if not changed:
+            continue
+        # An upload since this chunk was read has its own job; don't overwrite its derivatives
+        if save_derivatives(instance, changed):
+            updated += 1
+        else:
+            superseded += 1
+    logger.info('Regenerated image derivatives: %d %s updated, %d failed, %d replaced meanwhile',
+                updated, model.__name__, failed, superseded)
+    return updated, failed
+
+
+def purge_orphans():
+    """
+    Remove data left behind by deleted or hidden rows: fingerprints and matches of deleted
+    tracks/publications, similarity-index entries of non-public publications, stored
+    sample files no Sample refers to and sync tombstones past SYNC_TOMBSTONE_DAYS.
+    Returns a dict of counts.
+    """
+    counts = {}
+    for kind, model in ((AudioFingerprint.KIND_TRACK, Track), (AudioFingerprint.KIND_PUBLICATION, Publication)):
+        existing = model.objects.values('pk')
+        counts[f'{model.__name__.lower()}_fingerprints'] = AudioFingerprint.objects.filter(kind=kind) \
+            .exclude(object_id__in=existing).delete()[0]
+        counts[f'{model.__name__.lower()}_matches'] = AudioMatch.objects.filter(
+            Q(source_kind=kind) & ~Q(source_id__in=existing) | Q(matched_kind=kind) & ~Q(matched_id__in=existing)
+        ).delete()[0]
+
+    state = similarity_index.state()
+    indexed = set(state['ids'][state['ids'] >= 0].tolist()) if state is not None else set()
+    public, indexed_ids = set(), sorted(indexed)
+    for start in range(0, len(indexed_ids), CHUNK_SIZE * 10):
+        chunk = indexed_ids[start:start + CHUNK_SIZE * 10]
+        public.update(Publication.objects.filter(pk__in=chunk, is_public=True, embedding__isnull=False)
+                      .values_list('pk', flat=True))
+    for pk in indexed - public:
+        similarity_index.remove(pk)
+    counts['similarity_entries'] = len(indexed - public)
+
+    referenced = set(Sample.objects.values_list('file_name', flat=True))
+    removed = 0
+    for directory, _, files in os.walk(settings.SAMPLE_PACKS_ROOT):
+        for name in files:
+            base = name.removesuffix('.br').removesuffix('.gz')
+            if FILE_NAME_RE.match(base) and base not in referenced:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+    counts['sample_files'] = removed
+
+    expired = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    counts['tombstones'] = Tombstone.objects.filter(deleted_at__lt=expired).delete()[0]
+
+    logger.info('Purged orphans: %s', ', '.join(f'{count} {name}' for name, count in counts.items()))
+    return counts
+
+
+def fill_missing_file_sizes():
+    """
+    Ask storage for the size of files stored before sizes were recorded (one API call
+    each on Cloudinary, so run it once). Returns the number of rows filled.
+    """
+    filled = 0
+    for model, sizes in STORED_FILE_SIZES.items():
+        for file_field, size_field in sizes.items():
+            queryset = model.objects.exclude(**{file_field: ''}).exclude(**{f'{file_field}__isnull': True}) \
+                .filter(**{size_field: 0}).only('pk', file_field)
+            for instance in queryset.iterator(chunk_size=CHUNK_SIZE):
+                file = getattr(instance, file_field)
+                try:
+                    size = file.storage.size(file.name)
+                except Exception as exc:
+                    logger.warning('Size of %s %s %s unavailable: %s', model.__name__, instance.pk, file_field, exc)
+                    continue
+                filled += model.objects.filter(pk=instance.pk).update(**{size_field: size})
+    logger.info('Filled %d missing file sizes', filled)
+    return filled
+
+
+def reconcile_storage_usage():
+    """
+    Rebuild every StorageUsage row from the recorded file sizes: one INSERT for users
+    without a row and one UPDATE with per-user sums. Returns the number of ledger rows.
+    """
+    User = StorageUsage._meta.get_field('user').related_model
+    missing = User.objects.filter(storage_usage__isnull=True).values_list('pk', flat=True)
+    StorageUsage.objects.bulk_create(
+        [StorageUsage(user_id=pk) for pk in missing.iterator(chunk_size=CHUNK_SIZE)],
+        batch_size=CHUNK_SIZE, ignore_conflicts=True,
+    )
+
+    def row_total(model):
+        return sum((F(size) for size in STORED_FILE_SIZES[model].values()), Value(0))
+
+    def uploaded(model):
+        totals = model.objects.filter(user=OuterRef('user')).order_by().values('user') \
+            .annotate(total=Sum(row_total(model))).values('total')
+        return Coalesce(Subquery(totals), Value(0))
+
+    own_images = User.objects.filter(pk=OuterRef('user')).annotate(total=row_total(User)).values('total')
+    rows = StorageUsage.objects.update(
+        bytes_used=uploaded(Track) + uploaded(Publication) + Coalesce(Subquery(own_images), Value(0))
+    )
+    logger.info('Reconciled storage usage of %d users', rows)
+    return rows
@@ -0,0 +1,77 @@
+"""
+Unique-listener counts per publication, from HyperLogLog sketches (accounts/hyperloglog.py).
+
+Every play adds a listener key (the user id, or the client IP plus user agent for
+anonymous plays) to two sketches: that day's and the all-time one. Weekly and monthly
+counts merge the daily sketches. Listener keys themselves are never stored.
+
+Most plays, and all repeat plays, leave a sketch unchanged, so a play only writes when
+one of its registers actually grows; that write locks the row so concurrent plays
+can't lose each other's updates.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from .hyperloglog import STANDARD_ERROR, HyperLogLog
+from .models import ListenerSketch
+
+STATS_DAYS = 30
+
+
+def listener_key(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    # Same client identification as the play throttle (honours NUM_PROXIES)
+    ident = BaseThrottle().get_ident(request)
+    return f"anon:{ident}|{request.META.get('HTTP_USER_AGENT', '')}"
+
+
+def _add(publication_id, day, key):
+    stored = ListenerSketch.objects.filter(publication_id=publication_id, day=day) \
+        .values_list('sketch', flat=True).first()
+    if stored is not None and not HyperLogLog(stored).would_change(key):
+        return
+    with transaction.atomic():
+        row, _ = ListenerSketch.objects.select_for_update().get_or_create(
+            publication_id=publication_id, day=day, defaults={'sketch': HyperLogLog().to_bytes()},
+        )
+        sketch = HyperLogLog(row.sketch)
+        if sketch.add(key):
+            row.sketch = sketch.to_bytes()
+            row.save(update_fields=['sketch'])
+
+
+def record_listener(publication_id, request):
+    key = listener_key(request)
+    _add(publication_id, timezone.localdate(), key)
+    _add(publication_id, None, key)
+
+
+def unique_listeners(publication_id):
+    """Estimated distinct listeners today, over the last 7 and 30 days, and over all time."""
+    today = timezone.localdate()
+    daily, all_time = {}, HyperLogLog()
+    rows = ListenerSketch.objects.filter(
+        Q(day__isnull=True) | Q(day__gt=today - timedelta(days=STATS_DAYS)), publication_id=publication_id,
+    )
+    for day, stored in rows.values_list('day', 'sketch'):
+        if day is None:
+            all_time = HyperLogLog(stored)
+        else:
+            daily[day] = HyperLogLog(stored)
+
+    def since(days):
+        start = today - timedelta(days=days - 1)
+        return HyperLogLog.union(sketch for day, sketch in daily.items() if day >= start).count()
+
+    return {
+        'today': since(1),
+        'last_7_days': since(7),
+        'last_30_days': since(STATS_DAYS),
+        'all_time': all_time.count(),
+        'relative_error': round(STANDARD_ERROR, 4),
+    }
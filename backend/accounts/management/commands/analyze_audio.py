@@ -0,0 +1,65 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.audio_analysis import analyze_audio
+from accounts.fragment_cache import version_bump
+from accounts.models import AudioAnalysis, Track, Publication, index_fingerprints, update_similarity_index
+
+
+class Command(BaseCommand):
+    help = 'Re-run audio analysis (duration, loudness, tempo, key, fingerprints, similarity embedding) for tracks and publications in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['track', 'publication'], help='Only process one model.')
+        parser.add_argument('--all', action='store_true', help='Re-analyze rows that already have results.')
+        parser.add_argument('--workers', type=int, default=settings.BACKGROUND_PROCESS_WORKERS)
+
+    def handle(self, *args, **options):
+        models = {'track': Track, 'publication': Publication}
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for label, model in models.items():
+                if options['model'] and options['model'] != label:
+                    continue
+                queryset = model.objects.exclude(audio_file='').only('pk', 'user_id', 'audio_file')
+                if not options['all']:
+                    queryset = queryset.exclude(analysis_status=AudioAnalysis.ANALYSIS_DONE)
+                done, failed = self.analyze(pool, model, queryset, options['workers'] * 2)
+                self.stdout.write(f'{label}: {done} analyzed, {failed} failed')
+
+    def analyze(self, pool, model, queryset, max_in_flight):
+        done = failed = 0
+        pending = {}
+
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                instance = pending.pop(future)
+                pk = instance.pk
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} {pk}: {exc}')
+                    model.objects.filter(pk=pk).update(analysis_status=AudioAnalysis.ANALYSIS_FAILED, **version_bump(model))
+                else:
+                    done += 1
+                    fingerprints = result.pop('fingerprints')
+                    model.objects.filter(pk=pk).update(
+                        analysis_status=AudioAnalysis.ANALYSIS_DONE, **result, **version_bump(model)
+                    )
+                    index_fingerprints(instance, fingerprints)
+                    if model is Publication:
+                        update_similarity_index(pk, force=True)
+
+        for instance in queryset.iterator(chunk_size=100):
+            # Bound the number of decoded files held in memory at once
+            if len(pending) >= max_in_flight:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            with instance.audio_file.open('rb') as f:
+                data = f.read()
+            pending[pool.submit(analyze_audio, data, model is Publication)] = instance
+        collect(wait(pending).done)
+        return done, failed
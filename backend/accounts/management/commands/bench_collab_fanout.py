@@ -0,0 +1,100 @@
+import asyncio
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.collab import CollabHub, Connection
+
+
+def _project(tracks, clips):
+    return {'bpm': 120, 'tracks': [
+        {'id': f't{t}', 'volume': 0.8, 'clips': [
+            {'id': f't{t}c{c}', 'startBeat': c * 4, 'notes': []} for c in range(clips)
+        ]}
+        for t in range(tracks)
+    ]}
+
+
+def _random_op(data, sent):
+    track = random.choice(data['tracks'])
+    clip = random.choice(track['clips'])
+    kind = random.choice(('note.add', 'clip.move', 'mixer.set'))
+    if kind == 'note.add':
+        note = {'id': f'n{sent}', 'pitch': random.randint(36, 84), 'startBeat': random.random() * 4,
+                'duration': 0.25, 'velocity': 100}
+        return {'op': kind, 'trackId': track['id'], 'clipId': clip['id'], 'note': note}
+    if kind == 'clip.move':
+        return {'op': kind, 'trackId': track['id'], 'clipId': clip['id'], 'startBeat': random.randint(0, 64)}
+    return {'op': kind, 'trackId': track['id'], 'field': 'volume', 'value': random.random()}
+
+
+class Command(BaseCommand):
+    help = 'Measure op fan-out latency of collaborative editing rooms with many editors and projects in one process.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--editors', type=int, default=8, help='Editors per project.')
+        parser.add_argument('--ops', type=int, default=50, help='Ops sent by each editor.')
+        parser.add_argument('--interval', type=float, default=0.05, help='Seconds between ops from one editor.')
+
+    def handle(self, *args, **options):
+        latencies, saved, elapsed = asyncio.run(self.run(options))
+        latencies.sort()
+        sent = options['projects'] * options['editors'] * options['ops']
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f'{options["projects"]} projects x {options["editors"]} editors, {sent} ops, '
+            f'{len(latencies)} deliveries in {elapsed:.2f} s ({len(latencies) / elapsed:,.0f} deliveries/s)'
+        )
+        self.stdout.write(
+            f'fan-out latency: p50 {percentile(0.5):.2f} ms, p95 {percentile(0.95):.2f} ms, '
+            f'p99 {percentile(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms'
+        )
+        self.stdout.write(f'project writes: {saved} (instead of {sent} full saves)')
+
+    async def run(self, options):
+        stored = {}
+
+        async def load(project_id):
+            return _project(tracks=8, clips=4), 0
+
+        async def save(project_id, data, base):
+            stored[project_id] = data
+            return base + 1
+
+        hub = CollabHub(load, save, debounce=0.5, max_delay=2)
+        latencies, sent_at = [], {}
+
+        async def reader(connection):
+            while True:
+                frame = json.loads(await connection.queue.get())
+                if frame['type'] == 'op':
+                    latencies.append(time.perf_counter() - sent_at[frame['op']['seq']])
+
+        async def editor(project_id, index):
+            connection = Connection(max_queue=100_000)
+            room = await hub.join(project_id, connection)
+            read_task = asyncio.ensure_future(reader(connection))
+            await asyncio.sleep(random.random() * options['interval'])
+            for n in range(options['ops']):
+                op = _random_op(room.data, n)
+                op['seq'] = seq = f'{project_id}:{index}:{n}'
+                sent_at[seq] = time.perf_counter()
+                hub.handle(room, connection, {'type': 'op', 'clientSeq': n, 'op': op})
+                await asyncio.sleep(options['interval'])
+            await asyncio.sleep(options['interval'])  # let peers drain
+            read_task.cancel()
+            await hub.leave(room, connection)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            editor(project_id, index)
+            for project_id in range(options['projects'])
+            for index in range(options['editors'])
+        ))
+        return latencies, hub.saved_writes, time.perf_counter() - start
@@ -0,0 +1,65 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.fragment_cache import fragment_key
+from accounts.models import Publication
+from accounts.serializers import PublicationSerializer
+
+
+class Command(BaseCommand):
+    help = 'Time serialization of a feed page with a cold and a warm fragment cache (rows are rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        page_size, repeat = options['page_size'], options['repeat']
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'bench-user-{i}', profile_picture=f'profiles/avatars/bench-{i}.png')
+                for i in range(options['users'])
+            ])
+            Publication.objects.bulk_create([
+                Publication(
+                    user=users[i % len(users)],
+                    title=f'Bench song {i}',
+                    audio_file=f'publications/bench-{i}.mp3',
+                    cover_image=f'publications/covers/bench-{i}.png',
+                )
+                for i in range(page_size)
+            ])
+            queryset = Publication.objects.filter(title__startswith='Bench song').select_related('user')
+
+            # Only this page's cards: the fragment cache may be the Redis that holds the rate limits
+            cards = [fragment_key(item) for item in queryset] + [fragment_key(user) for user in users]
+
+            def serialize():
+                return PublicationSerializer(list(queryset), many=True).data
+
+            def median_time(clear):
+                timings = []
+                for _ in range(repeat):
+                    if clear:
+                        caches['fragments'].delete_many(cards)
+                    start = time.perf_counter()
+                    serialize()
+                    timings.append(time.perf_counter() - start)
+                return sorted(timings)[len(timings) // 2]
+
+            cold = median_time(clear=True)
+            serialize()
+            warm = median_time(clear=False)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'page of {page_size} publications, median of {repeat} runs')
+        self.stdout.write(f'cold cache: {cold * 1000:.2f} ms ({cold / page_size * 1e6:.0f} µs/row)')
+        self.stdout.write(f'warm cache: {warm * 1000:.2f} ms ({warm / page_size * 1e6:.0f} µs/row)')
+        self.stdout.write(f'speed-up:   {cold / warm:.1f}x')
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.fingerprints import find_matches
+from accounts.models import AudioFingerprint
+
+
+class Command(BaseCommand):
+    help = 'Time duplicate lookups against a synthetic fingerprint index of the given size (rows are rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fingerprints', type=int, default=1_000_000)
+        parser.add_argument('--per-song', type=int, default=4000, help='Hashes per song (~3 minutes of audio).')
+        parser.add_argument('--queries', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        per_song = options['per_song']
+        songs = max(1, options['fingerprints'] // per_song)
+
+        def song(seed):
+            song_rng = np.random.default_rng(seed)
+            return np.stack([song_rng.integers(0, 1 << 24, per_song), np.sort(song_rng.integers(0, 8000, per_song))], axis=1)
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            rows = (
+                AudioFingerprint(hash=int(h), kind=AudioFingerprint.KIND_TRACK, object_id=n + 1, offset=int(offset))
+                for n in range(songs) for h, offset in song(n)
+            )
+            AudioFingerprint.objects.bulk_create(rows, batch_size=5000)
+            insert_time = time.perf_counter() - start
+            self.stdout.write(f'{songs * per_song} fingerprints ({songs} songs) inserted in {insert_time:.1f} s')
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_size_pretty(pg_total_relation_size('accounts_audiofingerprint'))")
+                    self.stdout.write(f'table + indexes: {cursor.fetchone()[0]}')
+
+            timings, found = [], 0
+            for _ in range(options['queries']):
+                target = int(rng.integers(songs))
+                # A re-encode: 30% of landmarks survive, shifted by a trim, plus new noise landmarks
+                original = song(target)
+                kept = original[rng.random(per_song) < 0.3] - [0, 200]
+                kept = kept[kept[:, 1] >= 0]
+                noise = np.stack([rng.integers(0, 1 << 24, per_song // 2), rng.integers(0, 8000, per_song // 2)], axis=1)
+                query = np.concatenate([kept, noise])
+                start = time.perf_counter()
+                matches = find_matches(query)
+                timings.append(time.perf_counter() - start)
+                found += bool(matches) and matches[0][1] == target + 1
+            transaction.set_rollback(True)
+
+        timings = np.array(timings) * 1000
+        self.stdout.write(
+            f'lookup: p50 {np.percentile(timings, 50):.1f} ms, max {timings.max():.1f} ms; '
+            f'duplicate found in {found}/{options["queries"]} queries'
+        )
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.management.commands.bench_project_encoding import best_of
+from accounts.models import Follow, Publication, TimelineEntry
+from accounts.timelines import fan_out, home_timeline
+
+
+class Command(BaseCommand):
+    help = ("Compare a home-feed page computed with WHERE user_id IN (followed users) against the "
+            "precomputed timeline, as follow counts grow, and time one fan-out (rows are rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follows', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--songs', type=int, default=20, help='Publications per followed creator.')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--fan-out-followers', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        page_size, repeat, songs = options['page_size'], options['repeat'], options['songs']
+        now = timezone.now()
+
+        with transaction.atomic():
+            creators = User.objects.bulk_create([
+                User(username=f'bench-creator-{i}') for i in range(max(options['follows']))
+            ])
+            publications = Publication.objects.bulk_create([
+                Publication(user=creator, title=f'Bench song {i}', audio_file=f'publications/bench-{i}.mp3')
+                for creator in creators for i in range(songs)
+            ])
+            # bulk_create ignores auto_now_add overrides, so spread published_at afterwards
+            for n, publication in enumerate(publications):
+                publication.published_at = now - timedelta(minutes=n)
+            Publication.objects.bulk_update(publications, ['published_at'], batch_size=1000)
+
+            self.stdout.write(f"{'follows':>8} {'IN (follows) ms':>16} {'timeline ms':>12}")
+            for follows in options['follows']:
+                reader = User.objects.create(username=f'bench-reader-{follows}')
+                followed = creators[:follows]
+                Follow.objects.bulk_create([Follow(follower=reader, followed=creator) for creator in followed])
+                followed_ids = {creator.pk for creator in followed}
+                TimelineEntry.objects.bulk_create([
+                    TimelineEntry(user=reader, publication=publication, published_at=publication.published_at)
+                    for publication in publications if publication.user_id in followed_ids
+                ], batch_size=1000)
+
+                def naive():
+                    following = Follow.objects.filter(follower=reader).values('followed_id')
+                    return list(Publication.objects.filter(user__in=following, is_public=True)
+                                .order_by('-published_at', '-pk').values_list('pk', flat=True)[:page_size])
+
+                def timeline():
+                    return home_timeline(reader.pk, None, page_size)[0]
+
+                assert naive() == timeline()
+                self.stdout.write(
+                    f'{follows:>8} {best_of(naive, repeat) * 1000:>16.2f} {best_of(timeline, repeat) * 1000:>12.2f}'
+                )
+
+            fans = User.objects.bulk_create([
+                User(username=f'bench-fan-{i}') for i in range(options['fan_out_followers'])
+            ])
+            Follow.objects.bulk_create([Follow(follower=fan, followed=creators[0]) for fan in fans], batch_size=1000)
+            song = Publication.objects.create(user=creators[0], title='Bench fan-out', audio_file='')
+            written = 0
+
+            def publish():
+                nonlocal written
+                TimelineEntry.objects.filter(publication=song).delete()
+                written = fan_out(song.pk)
+
+            elapsed = best_of(publish, repeat)
+            self.stdout.write(f'fan-out of one publication to {written} followers: {elapsed * 1000:.1f} ms '
+                              f'(including deleting the previous run\'s rows)')
+            transaction.set_rollback(True)
@@ -0,0 +1,44 @@
+import io
+import json
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from accounts.fast_json import FastJSONParser, FastJSONRenderer, orjson
+from accounts.management.commands.bench_project_encoding import best_of, synthetic_project
+
+SIZES = {'100KB': 100_000, '1MB': 1_000_000, '10MB': 10_000_000}
+
+
+def project_of_size(target):
+    """A synthetic project whose JSON is about target bytes, scaled by track count."""
+    unit = len(json.dumps(synthetic_project(4, 8, 100, 500)))
+    return synthetic_project(max(1, round(4 * target / unit)), 8, 100, 500)
+
+
+class Command(BaseCommand):
+    help = 'Compare encode/decode time of Project.data API payloads with the stdlib and orjson JSON renderer/parser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed; FastJSONRenderer/FastJSONParser use the stdlib here.')
+        repeat = options['repeat']
+        codecs = (('stdlib', JSONRenderer(), JSONParser()), ('orjson', FastJSONRenderer(), FastJSONParser()))
+        self.stdout.write(f"{'payload':<8} {'bytes':>12} {'codec':<8} {'encode ms':>10} {'decode ms':>10}")
+        for label, target in SIZES.items():
+            payload = {'id': 1, 'name': 'Benchmark', 'updated_at': timezone.now(), 'data': project_of_size(target)}
+            baseline = None
+            for name, renderer, parser in codecs:
+                body = renderer.render(payload)
+                encode = best_of(lambda: renderer.render(payload), repeat)
+                decode = best_of(lambda: parser.parse(io.BytesIO(body), 'application/json', {}), repeat)
+                speedup = '' if baseline is None else f'  ({baseline[0] / encode:.1f}x / {baseline[1] / decode:.1f}x)'
+                baseline = baseline or (encode, decode)
+                self.stdout.write(
+                    f'{label:<8} {len(body):>12,} {name:<8} {encode * 1000:>10.2f} {decode * 1000:>10.2f}{speedup}'
+                )
@@ -0,0 +1,77 @@
+import gzip
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.project_codec import encode_project_data, decode_project_data
+
+
+def synthetic_project(tracks, clips, notes, peaks):
+    """A dense project shaped like the workstation's saved state."""
+    rng = random.Random(42)
+    data = {'bpm': 120, 'tracks': []}
+    for t in range(tracks):
+        audio = t % 4 == 0
+        track = {'id': t, 'name': f'Track {t}', 'type': 'audio' if audio else 'instrument', 'clips': []}
+        for c in range(clips):
+            clip = {'id': t * 1000 + c, 'name': f'Clip {c}', 'startBeat': c * 16, 'duration': 16, 'notes': []}
+            if audio:
+                clip['audioFileUrl'] = f'https://example.com/audio/{t}-{c}.wav'
+                clip['waveformPeaks'] = [round(rng.random(), 4) for _ in range(peaks)]
+            else:
+                clip['notes'] = [
+                    {
+                        'id': 1_700_000_000_000 + rng.random() * 10_000,
+                        'pitch': rng.randint(36, 96),
+                        'startBeat': rng.randint(0, 63) / 4,
+                        'duration': rng.choice([0.25, 0.5, 1, 2]),
+                        'velocity': rng.randint(40, 127),
+                    }
+                    for _ in range(notes)
+                ]
+            track['clips'].append(clip)
+        data['tracks'].append(track)
+    return data
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = 'Compare payload size and parse time of canonical vs columnar Project.data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tracks', type=int, default=16)
+        parser.add_argument('--clips', type=int, default=8)
+        parser.add_argument('--notes', type=int, default=400, help='Notes per instrument clip.')
+        parser.add_argument('--peaks', type=int, default=2000, help='Peaks per audio clip.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        data = synthetic_project(options['tracks'], options['clips'], options['notes'], options['peaks'])
+        canonical = json.dumps(data, separators=(',', ':'))
+        columnar = json.dumps(encode_project_data(data), separators=(',', ':'))
+        repeat = options['repeat']
+
+        rows = [
+            ('canonical', canonical, best_of(lambda: json.loads(canonical), repeat)),
+            ('columnar', columnar, best_of(lambda: json.loads(columnar), repeat)),
+        ]
+        decode_time = best_of(lambda: decode_project_data(json.loads(columnar)), repeat)
+        encode_time = best_of(lambda: encode_project_data(data), repeat)
+
+        self.stdout.write(f"{'encoding':<10} {'bytes':>12} {'gzip bytes':>12} {'json.loads ms':>14}")
+        for name, payload, parse in rows:
+            self.stdout.write(
+                f'{name:<10} {len(payload):>12,} {len(gzip.compress(payload.encode())):>12,} {parse * 1000:>14.2f}'
+            )
+        self.stdout.write(f'columnar encode: {encode_time * 1000:.2f} ms, parse + decode: {decode_time * 1000:.2f} ms')
+        self.stdout.write(f'size ratio: {len(columnar) / len(canonical):.2%}')
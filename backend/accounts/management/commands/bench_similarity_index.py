@@ -0,0 +1,60 @@
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from accounts.similarity import SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = 'Benchmark build time, query latency and recall of the "similar songs" index on synthetic embeddings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--nprobe', type=int, default=8)
+        parser.add_argument('--adds', type=int, default=200, help='Incremental adds to time after the build.')
+
+    def handle(self, *args, **options):
+        size, k = options['size'], options['k']
+        rng = np.random.default_rng(0)
+        # Clustered data, like genres/styles in real catalogues
+        centres = rng.normal(size=(max(1, size // 500), 64)) * 3
+        embeddings = (centres[rng.integers(len(centres), size=size)] + rng.normal(size=(size, 64))).astype(np.float32)
+        ids = np.arange(1, size + 1)
+
+        with tempfile.TemporaryDirectory() as path:
+            index = SimilarityIndex(path, dim=64, nprobe=options['nprobe'])
+            start = time.perf_counter()
+            nlist = index.build(ids, embeddings)
+            build_time = time.perf_counter() - start
+
+            state = index.state()
+            vectors = np.array(state['vectors'][:size])
+            query_ids = rng.choice(ids, options['queries'], replace=False)
+            timings, recall = [], []
+            for pk in query_ids:
+                start = time.perf_counter()
+                found = index.similar_to(int(pk), k)
+                timings.append(time.perf_counter() - start)
+                # Exact answer by brute force
+                scores = vectors @ vectors[pk - 1]
+                scores[pk - 1] = -np.inf
+                exact = set(ids[np.argpartition(-scores, k)[:k]].tolist())
+                recall.append(len(exact & {found_pk for found_pk, _ in found}) / k)
+
+            start = time.perf_counter()
+            for n in range(options['adds']):
+                index.add(size + n + 1, embeddings[n])
+            add_time = (time.perf_counter() - start) / max(options['adds'], 1)
+
+        timings = np.array(timings) * 1000
+        self.stdout.write(f'{size} vectors, {nlist} lists, nprobe {options["nprobe"]}')
+        self.stdout.write(f'build:  {build_time:.2f} s')
+        self.stdout.write(
+            f'query:  p50 {np.percentile(timings, 50):.2f} ms, p99 {np.percentile(timings, 99):.2f} ms '
+            f'(k={k}, recall@{k} {np.mean(recall):.3f} vs brute force)'
+        )
+        self.stdout.write(f'add:    {add_time * 1000:.2f} ms per publication')
@@ -0,0 +1,97 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a worker imports before it can serve: settings, apps, models and the URLconf
+WARM_UP = 'import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns'
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ('Profile what the app imports at startup (python -X importtime) and time gunicorn '
+            'from process spawn to the first served request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--path', default='/admin/login/', help='Request to wait for.')
+        parser.add_argument('--top', type=int, default=12, help='Packages to list in the import profile.')
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        self.import_profile(options['top'])
+        self.cold_start(options)
+
+    def import_profile(self, top):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WARM_UP],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        by_package, total = Counter(), 0
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME_RE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            by_package[name.split('.')[0]] += int(self_us)
+            if not indent:
+                total += int(cumulative_us)
+        self.stdout.write(f'imports up to a loaded URLconf: {total / 1000:.0f} ms')
+        for package, micros in by_package.most_common(top):
+            self.stdout.write(f'  {package:<28} {micros / 1000:7.1f} ms')
+
+    def cold_start(self, options):
+        timings = []
+        for _ in range(options['runs']):
+            port = _free_port()
+            url = f'http://127.0.0.1:{port}{options["path"]}'
+            start = time.perf_counter()
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', 'sonara_backend.wsgi:application',
+                 '--config', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'),
+                 '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']),
+                 '--threads', str(options['threads'])],
+                cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                status = self.wait_for_response(url, server, start + options['timeout'])
+                timings.append(time.perf_counter() - start)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait()
+            self.stdout.write(f'  first response ({status}) after {timings[-1] * 1000:.0f} ms')
+        timings.sort()
+        self.stdout.write(
+            f'cold start, spawn to first served request ({options["workers"]} workers x {options["threads"]} threads): '
+            f'min {timings[0] * 1000:.0f} ms, median {timings[len(timings) // 2] * 1000:.0f} ms'
+        )
+
+    def wait_for_response(self, url, server, deadline):
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {server.returncode}')
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    return response.status
+            except urllib.error.HTTPError as exc:
+                return exc.code  # still a served request
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f'no response from {url} in time')
@@ -0,0 +1,87 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.views.static import serve
+
+from accounts.file_serving import write_precompressed
+from accounts.static_assets import serve_collected
+
+# The frontend's own media, as Vite would emit them into dist/assets
+FRONTEND_ASSETS = ('sonara_logo_animated.webm', 'loginSound1.mp3', 'loginSound2.mp3', 'loginSound3.mp3')
+
+
+def fake_bundle(size):
+    """Minified-looking JavaScript of roughly `size` bytes."""
+    rng = random.Random(0)
+    words = ('const', 'function', 'return', 'useState', 'useEffect', 'props', 'className', 'await', 'fetch', '=>')
+    parts, length = [], 0
+    while length < size:
+        part = f'{rng.choice(words)} {rng.choice(words)}{rng.randrange(100)}({rng.choice(words)});'
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts).encode()
+
+
+def consume(response):
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    if hasattr(response, 'close'):
+        response.close()
+    return len(body)
+
+
+class Command(BaseCommand):
+    help = ("Compare the frontend's bundle and media served by accounts/static_assets.py against "
+            "django.views.static.serve: bytes sent and time per request on a first visit and a revisit.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bundle-kb', type=int, default=1024, help='Size of the synthetic JS bundle.')
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        source_dir = os.path.join(settings.BASE_DIR.parent, 'frontend', 'src', 'assets')
+
+        with tempfile.TemporaryDirectory() as root:
+            names = ['index.js']
+            with open(os.path.join(root, 'index.js'), 'wb') as f:
+                f.write(fake_bundle(options['bundle_kb'] * 1024))
+            for name in FRONTEND_ASSETS:
+                if os.path.exists(os.path.join(source_dir, name)):
+                    shutil.copyfile(os.path.join(source_dir, name), os.path.join(root, name))
+                    names.append(name)
+            for name in names:
+                write_precompressed(os.path.join(root, name))
+
+            def plain(name, headers):
+                return serve(factory.get(f'/{name}', headers=headers), name, document_root=root)
+
+            def precompressed(name, headers):
+                return serve_collected(factory.get(f'/assets/{name}', headers=headers), os.path.join(root, name), True)
+
+            self.stdout.write(f"{'file':<28} {'visit':<8} {'static.serve':>22} {'static_assets':>22}")
+            for name in names:
+                first_visit = {'Accept-Encoding': 'gzip, deflate, br'}
+                revisit = {
+                    'plain': {**first_visit, 'If-Modified-Since': plain(name, first_visit)['Last-Modified']},
+                    'precompressed': {**first_visit, 'If-None-Match': precompressed(name, first_visit)['ETag']},
+                }
+                for visit in ('first', 'revisit'):
+                    cells = []
+                    for label, view in (('plain', plain), ('precompressed', precompressed)):
+                        headers = first_visit if visit == 'first' else revisit[label]
+                        start = time.perf_counter()
+                        for _ in range(options['requests']):
+                            sent = consume(view(name, headers))
+                        per_request = (time.perf_counter() - start) / options['requests']
+                        cells.append(f'{sent:>10,} B {per_request * 1e6:>6.0f} us')
+                    self.stdout.write(f'{name:<28} {visit:<8} {cells[0]:>22} {cells[1]:>22}')
+            self.stdout.write(
+                "static_assets marks these names immutable (max-age=31536000), so browsers skip the revisit "
+                "entirely; static.serve sends no Cache-Control and each use costs a conditional request."
+            )
@@ -0,0 +1,111 @@
+import io
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image
+
+from accounts import images
+from accounts.management.commands.bench_project_encoding import best_of
+from accounts.models import Publication, generate_image_derivatives
+
+
+class SlowStorage(FileSystemStorage):
+    """Local files, with a fixed round-trip delay on every upload and delete like a remote store."""
+
+    def __init__(self, latency, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def _save(self, name, content):
+        time.sleep(self.latency)
+        return super()._save(name, content)
+
+    def delete(self, name):
+        time.sleep(self.latency)
+        super().delete(name)
+
+
+def jpeg(size):
+    buffer = io.BytesIO()
+    Image.new('RGB', (size, size), (200, 80, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = ("Time a publish, a profile picture and header change (each with its derivative job), and a "
+            "publication delete against a local storage that sleeps on every call, with storage calls "
+            "run one by one and concurrently (rows are rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency-ms', type=float, default=100)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        cover, audio = jpeg(1200), os.urandom(1024 * 1024)
+        fields = [User._meta.get_field('profile_picture'), User._meta.get_field('header_image'),
+                  Publication._meta.get_field('audio_file'), Publication._meta.get_field('cover_image')]
+
+        with tempfile.TemporaryDirectory() as root:
+            storage = SlowStorage(options['latency_ms'] / 1000, location=root)
+            originals = [field.storage for field in fields], images.default_storage
+            for field in fields:
+                field.storage = storage
+            images.default_storage = storage  # derivatives
+            try:
+                with transaction.atomic():
+                    user = User.objects.create(username='bench-storage-io')
+                    user.profile_picture = ContentFile(cover, 'avatar.jpg')
+                    user.header_image = ContentFile(cover, 'header.jpg')
+                    user.save()
+
+                    # Derivatives are made by a job after commit, which never comes here; run it inline
+                    def publish():
+                        publication = Publication.objects.create(
+                            user=user, title='Bench song',
+                            audio_file=ContentFile(audio, 'song.mp3'), cover_image=ContentFile(cover, 'cover.jpg'),
+                        )
+                        generate_image_derivatives(Publication, publication.pk)
+                        publication.refresh_from_db()
+                        return publication
+
+                    def update_profile():
+                        user.profile_picture = ContentFile(cover, 'avatar.jpg')
+                        user.header_image = ContentFile(cover, 'header.jpg')
+                        user.save()
+                        generate_image_derivatives(User, user.pk)
+                        user.refresh_from_db()
+
+                    scenarios = [
+                        ('publish (2 uploads + 6 derivatives)', publish, None),
+                        ('profile images (2 + 12 uploads, 14 deletes)', update_profile, None),
+                        ('delete publication (8 deletes)', lambda publication: publication.delete(), publish),
+                    ]
+                    self.stdout.write(f"{'':<46} {'one by one ms':>14} {'concurrent ms':>14}")
+                    for label, run, setup in scenarios:
+                        timings = []
+                        for workers in (1, None):
+                            with override_settings(**({'STORAGE_IO_WORKERS': workers} if workers else {})):
+                                if setup is None:
+                                    timings.append(best_of(run, options['repeat']))
+                                    continue
+                                elapsed = []
+                                for _ in range(options['repeat']):
+                                    target = setup()
+                                    start = time.perf_counter()
+                                    run(target)
+                                    elapsed.append(time.perf_counter() - start)
+                                timings.append(min(elapsed))
+                        self.stdout.write(f'{label:<46} {timings[0] * 1000:>14.0f} {timings[1] * 1000:>14.0f}')
+                    transaction.set_rollback(True)
+            finally:
+                for field, original in zip(fields, originals[0]):
+                    field.storage = original
+                images.default_storage = originals[1]
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.throttling import SimpleRateThrottle
+
+from accounts.models import ThrottleState
+from accounts.throttling import SharedRateThrottleMixin
+
+
+class SharedThrottle(SharedRateThrottleMixin, SimpleRateThrottle):
+    pass
+
+
+def throttle_class(base, rate, key):
+    class BenchThrottle(base):
+        def get_rate(self):
+            return rate
+
+        def get_cache_key(self, request, view):
+            return key(threading.get_ident())
+    return BenchThrottle
+
+
+class Command(BaseCommand):
+    help = ("Compare per-check overhead of DRF's default throttle (per-process cache, timestamp "
+            "history) with the shared GCRA throttle, from concurrent threads.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--checks', type=int, default=1000, help='Checks per thread.')
+        parser.add_argument('--hot-limit', type=int, default=500,
+                            help='Per-hour limit of the shared hot key in the correctness run.')
+
+    def run_threads(self, throttle, threads, checks):
+        timings = [[] for _ in range(threads)]
+        allowed = [0] * threads
+
+        def worker(n):
+            instance = throttle()
+            try:
+                for _ in range(checks):
+                    start = time.perf_counter()
+                    allowed[n] += instance.allow_request(None, None)
+                    timings[n].append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return np.concatenate(timings) * 1000, sum(allowed), elapsed
+
+    def handle(self, *args, **options):
+        threads, checks = options['threads'], options['checks']
+        ThrottleState.objects.all().delete()
+        # A generous limit on one key per thread: every check is admitted, so this is pure overhead
+        for name, base in (('DRF default (LocMem)', SimpleRateThrottle), ('shared GCRA (database)', SharedThrottle)):
+            timings, _, elapsed = self.run_threads(
+                throttle_class(base, '1000000/hour', lambda ident: f'bench_{ident}'), threads, checks,
+            )
+            self.stdout.write(
+                f'{name:<24} p50 {np.percentile(timings, 50):.3f} ms, p99 {np.percentile(timings, 99):.3f} ms, '
+                f'{len(timings) / elapsed:,.0f} checks/s over {threads} threads'
+            )
+
+        # All threads hammer one key: the burst of hot-limit, plus one per emission interval that passed
+        limit = options['hot_limit']
+        _, allowed, elapsed = self.run_threads(
+            throttle_class(SharedThrottle, f'{limit}/hour', lambda ident: 'bench_hot'), threads, checks,
+        )
+        expected = limit + int(elapsed // (3600 / limit))
+        self.stdout.write(
+            f'hot key, {threads * checks} concurrent checks at {limit}/hour in {elapsed:.1f} s: '
+            f'{allowed} admitted (expected {expected})'
+        )
+        ThrottleState.objects.filter(key__startswith='bench_').delete()
@@ -0,0 +1,21 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from accounts.models import Publication
+from accounts.similarity import index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the "similar songs" index from the embeddings of all public publications.'
+
+    def handle(self, *args, **options):
+        rows = Publication.objects.filter(is_public=True, embedding__isnull=False).values_list('pk', 'embedding')
+        ids, embeddings = [], []
+        for pk, embedding in rows.iterator(chunk_size=2000):
+            ids.append(pk)
+            embeddings.append(np.frombuffer(embedding, dtype=np.float32))
+        start = time.perf_counter()
+        nlist = index.build(ids, np.array(embeddings).reshape(len(ids), index.dim))
+        self.stdout.write(f'indexed {len(ids)} publications in {nlist} lists ({time.perf_counter() - start:.2f} s)')
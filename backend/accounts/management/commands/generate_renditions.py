@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts.models import Publication, RENDITION_FIELDS, store_renditions
+from accounts.renditions import transcode_renditions
+
+
+class Command(BaseCommand):
+    help = 'Transcode the 30-second preview and streaming renditions of existing publications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Replace renditions that already exist.')
+        parser.add_argument('--workers', type=int, default=settings.BACKGROUND_PROCESS_WORKERS)
+
+    def handle(self, *args, **options):
+        fields = list(RENDITION_FIELDS.values())
+        queryset = Publication.objects.exclude(audio_file='').only('pk', 'audio_file', *fields)
+        if not options['all']:
+            # An empty FileField is saved as '' (NULL only on rows from before the fields existed)
+            missing = Q()
+            for field in fields:
+                missing |= Q(**{f'{field}__isnull': True}) | Q(**{field: ''})
+            queryset = queryset.filter(missing)
+        max_in_flight = options['workers'] * 2
+        done = failed = 0
+        pending = {}
+
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                instance = pending.pop(future)
+                try:
+                    renditions = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'Publication {instance.pk}: {exc}')
+                    continue
+                done += 1
+                for name in store_renditions(instance, renditions):
+                    previous = getattr(instance, name)
+                    if previous:
+                        previous.delete(save=False)
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for instance in queryset.iterator(chunk_size=100):
+                # Bound the number of uploads held in memory at once
+                if len(pending) >= max_in_flight:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                with instance.audio_file.open('rb') as f:
+                    data = f.read()
+                pending[pool.submit(transcode_renditions, data)] = instance
+            collect(wait(pending).done)
+        self.stdout.write(f'{done} transcoded, {failed} failed')
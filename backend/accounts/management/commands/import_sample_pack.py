@@ -0,0 +1,51 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import SamplePack, Sample
+from accounts.sample_packs import NOTE_RE, SAMPLE_EXTENSIONS, pack_hash, store_sample
+
+
+class Command(BaseCommand):
+    help = 'Import a directory of note-named samples (A1.mp3, C4.mp3, …) as a self-hosted sample pack.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--preset', help='Preset id from models/presets.ts (defaults to the directory name).')
+        parser.add_argument('--name', help='Display name (defaults to the preset id).')
+        parser.add_argument('--release', type=float, default=None)
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f'{directory} is not a directory')
+        preset_id = options['preset'] or os.path.basename(os.path.normpath(directory))
+
+        stored = {}
+        for entry in sorted(os.listdir(directory)):
+            note, extension = os.path.splitext(entry)
+            if extension.lower() not in SAMPLE_EXTENSIONS:
+                continue
+            if not NOTE_RE.match(note):
+                self.stderr.write(f'Skipping {entry}: file name is not a note name')
+                continue
+            stored[note] = store_sample(os.path.join(directory, entry))
+        if not stored:
+            raise CommandError(f'No samples found in {directory}')
+
+        with transaction.atomic():
+            pack, _ = SamplePack.objects.update_or_create(
+                preset_id=preset_id,
+                defaults={
+                    'name': options['name'] or preset_id,
+                    'release': options['release'],
+                    'content_hash': pack_hash({note: values['content_hash'] for note, values in stored.items()}),
+                },
+            )
+            pack.samples.exclude(note__in=stored).delete()
+            for note, values in stored.items():
+                Sample.objects.update_or_create(pack=pack, note=note, defaults=values)
+
+        total = sum(values['size'] for values in stored.values())
+        self.stdout.write(f'{preset_id}: {len(stored)} samples, {total / 1024:.0f} KB')
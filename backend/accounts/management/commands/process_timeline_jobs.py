@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.timelines import run_due_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued home-timeline jobs (fan-out, backfills, removals) in batches, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--max-attempts', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting once the queue is drained.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep between polls in --loop mode.')
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = run_due_jobs(options['batch_size'], options['max_attempts'])
+            if done or failed:
+                self.stdout.write(f'Ran {done}, failed {failed}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.jobs import purge_orphans
+
+
+class Command(BaseCommand):
+    help = 'Remove fingerprints, matches, similarity-index entries and sample files whose rows are gone.'
+
+    def handle(self, *args, **options):
+        for name, count in purge_orphans().items():
+            self.stdout.write(f'{name}: {count} removed')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from accounts.jobs import fill_missing_file_sizes, reconcile_storage_usage
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user storage ledger (StorageUsage) from the recorded sizes of uploaded files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fetch-sizes', action='store_true',
+                            help='First ask storage for the size of files uploaded before sizes were recorded (slow).')
+
+    def handle(self, *args, **options):
+        if options['fetch_sizes']:
+            self.stdout.write(f'{fill_missing_file_sizes()} file sizes filled in')
+        self.stdout.write(f'{reconcile_storage_usage()} users reconciled')
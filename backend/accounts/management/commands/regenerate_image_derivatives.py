@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts.jobs import regenerate_image_derivatives
+from accounts.models import Publication
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG derivatives for existing avatars, headers and cover art.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are already up to date.')
+        parser.add_argument('--model', choices=['user', 'publication'], help='Only process one model.')
+
+    def handle(self, *args, **options):
+        querysets = {
+            'user': get_user_model().objects.filter(Q(profile_picture__gt='') | Q(header_image__gt='')),
+            'publication': Publication.objects.filter(cover_image__gt=''),
+        }
+        for label, queryset in querysets.items():
+            if options['model'] and options['model'] != label:
+                continue
+            updated, failed = regenerate_image_derivatives(queryset, force=options['force'])
+            self.stdout.write(f'{label}: {updated} updated, {failed} failed')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.emails import deliver_due_emails
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches, retrying failures with exponential backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--max-attempts', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting once the outbox is drained.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls in --loop mode.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_due_emails(options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='header_image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='cover_image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations, models
+
+
+def analysis_fields(model_name):
+    return [
+        migrations.AddField(
+            model_name=model_name,
+            name='analysis_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=16),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='duration_seconds',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='sample_rate',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='channels',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='loudness_lufs',
+            field=models.FloatField(blank=True, db_index=True, help_text='Integrated loudness (EBU R128)', null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='true_peak_dbtp',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='bpm',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='musical_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=16),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_image_derivatives'),
+    ]
+
+    operations = analysis_fields('track') + analysis_fields('publication')
@@ -0,0 +1,67 @@
+from django.db import migrations, models
+
+from accounts.project_summary import summarize_project_data
+
+
+def backfill_summaries(apps, schema_editor):
+    Project = apps.get_model('accounts', 'Project')
+    batch = []
+    for project in Project.objects.only('pk', 'data').iterator(chunk_size=200):
+        for field, value in summarize_project_data(project.data).items():
+            setattr(project, field, value)
+        batch.append(project)
+        if len(batch) >= 200:
+            Project.objects.bulk_update(batch, ['bpm', 'track_count', 'clip_count', 'note_count', 'duration_beats', 'byte_size', 'content_hash'])
+            batch = []
+    if batch:
+        Project.objects.bulk_update(batch, ['bpm', 'track_count', 'clip_count', 'note_count', 'duration_beats', 'byte_size', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_audio_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='bpm',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='track_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='clip_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='note_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='duration_beats',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='byte_size',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', '-updated_at'], name='project_user_updated_idx'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_project_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='cache_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='cache_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
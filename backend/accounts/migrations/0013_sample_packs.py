@@ -0,0 +1,42 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SamplePack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preset_id', models.SlugField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('release', models.FloatField(blank=True, null=True)),
+                ('content_hash', models.CharField(help_text='Hash over all sample hashes; changes whenever any sample does', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['preset_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Sample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note', models.CharField(max_length=8)),
+                ('file_name', models.CharField(help_text='<sha256><ext>, relative to SAMPLE_PACKS_ROOT/<first two hex chars>/', max_length=80)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('content_type', models.CharField(max_length=64)),
+                ('size', models.PositiveIntegerField()),
+                ('pack', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='samples', to='accounts.samplepack')),
+            ],
+            options={
+                'ordering': ['pack', 'note'],
+                'constraints': [models.UniqueConstraint(fields=('pack', 'note'), name='unique_sample_note')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_sample_packs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='embedding',
+            field=models.BinaryField(blank=True, editable=False, help_text='float32 audio features for "similar songs"', null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+KIND_CHOICES = [(1, 'Track'), (2, 'Publication')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_publication_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.IntegerField()),
+                ('kind', models.PositiveSmallIntegerField(choices=KIND_CHOICES)),
+                ('object_id', models.PositiveIntegerField()),
+                ('offset', models.PositiveIntegerField(help_text='Anchor time in fingerprint frames')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['hash'], name='fingerprint_hash_idx'),
+                    models.Index(fields=['kind', 'object_id'], name='fingerprint_object_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='AudioMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_kind', models.PositiveSmallIntegerField(choices=KIND_CHOICES)),
+                ('source_id', models.PositiveIntegerField()),
+                ('matched_kind', models.PositiveSmallIntegerField(choices=KIND_CHOICES)),
+                ('matched_id', models.PositiveIntegerField()),
+                ('score', models.PositiveIntegerField(help_text='Hashes that agree on one time offset')),
+                ('coverage', models.FloatField(help_text='score / hashes looked up')),
+                ('offset_seconds', models.FloatField(help_text='Where the source starts within the match')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-score'],
+                'constraints': [
+                    models.UniqueConstraint(fields=['source_kind', 'source_id', 'matched_kind', 'matched_id'], name='unique_audio_match'),
+                ],
+                'indexes': [
+                    models.Index(fields=['matched_kind', 'matched_id'], name='audio_match_matched_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Trigram indexes for the admin's icontains searches, which Django compiles to
+# UPPER(column::text) LIKE UPPER('%term%'); a plain b-tree index can't serve those.
+TRIGRAM_INDEXES = [
+    ('accounts_user_username_trgm', 'accounts_user', 'username'),
+    ('accounts_user_email_trgm', 'accounts_user', 'email'),
+    ('accounts_project_name_trgm', 'accounts_project', 'name'),
+    ('accounts_publication_title_trgm', 'accounts_publication', 'title'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_audio_fingerprints'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
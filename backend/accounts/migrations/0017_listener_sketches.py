@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListenerSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(blank=True, null=True)),
+                ('sketch', models.BinaryField()),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listener_sketches', to='accounts.publication')),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('publication', 'day'), name='unique_listener_sketch_day'),
+                    models.UniqueConstraint(condition=models.Q(('day__isnull', True)), fields=('publication',), name='unique_listener_sketch_all_time'),
+                ],
+            },
+        ),
+    ]
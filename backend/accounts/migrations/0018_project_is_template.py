@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_listener_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='is_template',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_template', True)), fields=['name'], name='project_template_idx'),
+        ),
+    ]
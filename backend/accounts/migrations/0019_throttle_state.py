@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_project_is_template'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleState',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('value', models.FloatField()),
+                ('expires_at', models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
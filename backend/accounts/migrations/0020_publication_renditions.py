@@ -0,0 +1,22 @@
+from django.db import migrations, models
+from cloudinary_storage.storage import RawMediaCloudinaryStorage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_throttle_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='preview_audio',
+            field=models.FileField(blank=True, editable=False, null=True, storage=RawMediaCloudinaryStorage(), upload_to='publications/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='stream_audio',
+            field=models.FileField(blank=True, editable=False, null=True, storage=RawMediaCloudinaryStorage(), upload_to='publications/renditions/'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_publication_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['user', '-published_at'], name='publication_user_recent_idx'),
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL)),
+                ('followed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('follower', 'followed'), name='unique_follow'),
+                    models.CheckConstraint(condition=models.Q(('follower', models.F('followed')), _negated=True), name='follow_not_self'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.publication')),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('user', 'publication'), name='unique_timeline_entry'),
+                ],
+                'indexes': [
+                    models.Index(fields=['user', '-published_at', '-publication'], name='timeline_page_idx'),
+                ],
+            },
+        ),
+    ]
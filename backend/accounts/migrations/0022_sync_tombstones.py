@@ -0,0 +1,47 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_follow_timelines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['user', 'modified_at'], name='track_user_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['user', 'modified_at'], name='publication_user_modified_idx'),
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.PositiveIntegerField()),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Project'), (2, 'Track'), (3, 'Publication')])),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_deleted_idx'),
+                ],
+            },
+        ),
+    ]
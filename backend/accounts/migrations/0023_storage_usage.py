@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='header_image_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='audio_file_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='audio_file_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('bytes_used', models.PositiveBigIntegerField(default=0)),
+                ('quota', models.PositiveBigIntegerField(blank=True, help_text='Bytes; empty means STORAGE_QUOTA_BYTES', null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_storage_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='preview_audio_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='stream_audio_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
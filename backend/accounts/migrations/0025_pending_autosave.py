@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_rendition_sizes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAutosave',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pending_autosave', serialize=False, to='accounts.project')),
+                ('name', models.CharField(blank=True, max_length=255, null=True)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('queued_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='autosave_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_pending_autosave'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fan_out', 'Fan out a publication'), ('remove_publication', 'Remove a publication'), ('follow', 'Backfill a new follower'), ('unfollow', 'Remove an unfollowed creator'), ('backfill_followers', "Backfill a creator's followers")], max_length=32)),
+                ('args', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='timeline_job_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def wrap_whole_data(apps, schema_editor):
+    # Rows queued before this held the whole data, which is a diff that replaces everything
+    PendingAutosave = apps.get_model('accounts', 'PendingAutosave')
+    for row in PendingAutosave.objects.filter(data_diff__isnull=False):
+        row.data_diff = {'replace': row.data_diff}
+        row.save(update_fields=['data_diff'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_project_collaborator'),
+    ]
+
+    operations = [
+        migrations.RenameField(model_name='pendingautosave', old_name='data', new_name='data_diff'),
+        migrations.RunPython(wrap_whole_data, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,26 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connection, models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models.signals import pre_delete, pre_save
+from django.utils import timezone
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
+from django.core.files.base import ContentFile
 from cloudinary_storage.storage import RawMediaCloudinaryStorage
+import logging
+import os
+
+from .images import IMAGE_FIELDS, validate_image_pixels, sync_derivatives, derivative_files
+from .storage_io import delete_files, save_files, store_field_files
+from .audio_analysis import analyze_audio
+from .background import run_on_spooled_file, run_in_thread
+from .renditions import transcode_renditions
+from .project_summary import summarize_project_data
+from .fragment_cache import VOLATILE_FIELDS, version_bump
+from .similarity import sync_publication
+
+logger = logging.getLogger(__name__)
 
 
 def validate_image_size(file):
@@ -28,7 +44,22 @@ def validate_audio_size(file):
         raise ValidationError(f'Audio file cannot exceed 50 MB. Your file is {file.size / (1024 * 1024):.1f} MB.')
 
 
-class User(AbstractUser):
+class DiscardUploadsOnFailure:
+    """
+    For models whose new files are uploaded in pre_save (store_new_files): if the save fails
+    after that, the stored files and the quota reserved for them are given back.
+    """
+
+    def save(self, *args, **kwargs):
+        self._stored_uploads, self._storage_reserved = [], 0  # nothing from an earlier save
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            discard_failed_uploads(self)
+            raise
+
+
+class User(DiscardUploadsOnFailure, AbstractUser):
     """Custom user with listener/creator roles. A user can be listener, creator, or both."""
     is_listener = models.BooleanField(default=False)
     is_creator = models.BooleanField(default=False)
@@ -36,15 +67,25 @@ class User(AbstractUser):
         upload_to='profiles/headers/',
         blank=True,
         null=True,
-        validators=[validate_header_size]
+        validators=[validate_header_size, validate_image_pixels]
     )
     profile_picture = models.ImageField(
         upload_to='profiles/avatars/',
         blank=True,
         null=True,
-        validators=[validate_image_size]
+        validators=[validate_image_size, validate_image_pixels]
     )
+    # Resized, metadata-stripped copies — see accounts/images.py
+    header_image_derivatives = models.JSONField(default=dict, blank=True)
+    profile_picture_derivatives = models.JSONField(default=dict, blank=True)
+    # Bytes of the stored files, recorded on upload for the storage ledger (StorageUsage)
+    header_image_size = models.PositiveIntegerField(default=0, editable=False)
+    profile_picture_size = models.PositiveIntegerField(default=0, editable=False)
     bio = models.TextField(blank=True, default='')
+    # Maintained by the Follow signals; decides fan-out on write vs. fan-in on read (accounts/timelines.py)
+    follower_count = models.PositiveIntegerField(default=0, db_index=True)
+    # Bumped whenever cached serializer fragments of this row go stale — see accounts/fragment_cache.py
+    cache_version = models.PositiveIntegerField(default=0)
 
     @property
     def role(self):
@@ -58,7 +99,31 @@ class User(AbstractUser):
         return "none"
 
 
-class Track(models.Model):
+class AudioAnalysis(models.Model):
+    """Columns filled in by the upload-time analysis stage (accounts/audio_analysis.py)."""
+    ANALYSIS_PENDING = 'pending'
+    ANALYSIS_DONE = 'done'
+    ANALYSIS_FAILED = 'failed'
+    ANALYSIS_STATUS_CHOICES = [
+        (ANALYSIS_PENDING, 'Pending'),
+        (ANALYSIS_DONE, 'Done'),
+        (ANALYSIS_FAILED, 'Failed'),
+    ]
+
+    analysis_status = models.CharField(max_length=16, choices=ANALYSIS_STATUS_CHOICES, default=ANALYSIS_PENDING, db_index=True)
+    duration_seconds = models.FloatField(null=True, blank=True, db_index=True)
+    sample_rate = models.PositiveIntegerField(null=True, blank=True)
+    channels = models.PositiveSmallIntegerField(null=True, blank=True)
+    loudness_lufs = models.FloatField(null=True, blank=True, db_index=True, help_text='Integrated loudness (EBU R128)')
+    true_peak_dbtp = models.FloatField(null=True, blank=True)
+    bpm = models.FloatField(null=True, blank=True, db_index=True)
+    musical_key = models.CharField(max_length=16, blank=True, default='', db_index=True)
+
+    class Meta:
+        abstract = True
+
+
+class Track(DiscardUploadsOnFailure, AudioAnalysis):
     """A music track uploaded by a user."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -71,10 +136,16 @@ class Track(models.Model):
         validators=[validate_audio_size],
         storage=RawMediaCloudinaryStorage()
     )
+    audio_file_size = models.PositiveIntegerField(default=0, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Also stamped by version_bump() on queryset updates; incremental sync reads it
+    modified_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['user', 'modified_at'], name='track_user_modified_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} — {self.user.username}"
@@ -92,14 +163,41 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Summary of `data`, recomputed on every save so lists never need to load it
+    bpm = models.FloatField(null=True, blank=True)
+    track_count = models.PositiveIntegerField(default=0)
+    clip_count = models.PositiveIntegerField(default=0)
+    note_count = models.PositiveIntegerField(default=0)
+    duration_beats = models.FloatField(default=0)
+    byte_size = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+
+    # Listed in the public template catalog; anyone signed in can duplicate it
+    is_template = models.BooleanField(default=False)
+
+    SUMMARY_FIELDS = ('bpm', 'track_count', 'clip_count', 'note_count', 'duration_beats', 'byte_size', 'content_hash')
+
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='project_user_updated_idx'),
+            models.Index(fields=['name'], condition=models.Q(is_template=True), name='project_template_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} — {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'data' in update_fields:
+            for field, value in summarize_project_data(self.data).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.SUMMARY_FIELDS)
+        super().save(*args, **kwargs)
+
 
-class Publication(models.Model):
+class Publication(DiscardUploadsOnFailure, AudioAnalysis):
     """A published song — public-facing, rendered from a project."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -120,32 +218,480 @@ class Publication(models.Model):
         validators=[validate_audio_size],
         storage=RawMediaCloudinaryStorage()
     )
+    audio_file_size = models.PositiveIntegerField(default=0, editable=False)
+    # Compressed playback copies of audio_file, written by the rendition worker
+    preview_audio = models.FileField(
+        upload_to='publications/renditions/',
+        blank=True,
+        null=True,
+        editable=False,
+        storage=RawMediaCloudinaryStorage()
+    )
+    stream_audio = models.FileField(
+        upload_to='publications/renditions/',
+        blank=True,
+        null=True,
+        editable=False,
+        storage=RawMediaCloudinaryStorage()
+    )
+    preview_audio_size = models.PositiveIntegerField(default=0, editable=False)
+    stream_audio_size = models.PositiveIntegerField(default=0, editable=False)
     cover_image = models.ImageField(
         upload_to='publications/covers/',
         blank=True,
         null=True,
-        validators=[validate_image_size]
+        validators=[validate_image_size, validate_image_pixels]
     )
+    cover_image_derivatives = models.JSONField(default=dict, blank=True)
+    embedding = models.BinaryField(null=True, blank=True, editable=False, help_text='float32 audio features for "similar songs"')
     is_public = models.BooleanField(default=True)
     play_count = models.PositiveIntegerField(default=0)
     published_at = models.DateTimeField(auto_now_add=True)
+    # Also stamped by version_bump() on queryset updates; incremental sync reads it
+    modified_at = models.DateTimeField(auto_now=True)
+    cache_version = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['-published_at']
+        indexes = [
+            models.Index(fields=['user', '-published_at'], name='publication_user_recent_idx'),
+            models.Index(fields=['user', 'modified_at'], name='publication_user_modified_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} — {self.user.username}"
 
 
+class OutboxEmail(models.Model):
+    """A transactional email queued in the request and delivered by the send_outbox_emails worker."""
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    html = models.TextField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to} ({self.status})"
+
+
+class ProjectCollaborator(models.Model):
+    """Someone the owner invited to edit a project with them in its live room (accounts/collab.py)."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='collaborators')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='shared_projects')
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'user'], name='unique_project_collaborator'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} → project {self.project_id}"
+
+
+class PendingAutosave(models.Model):
+    """A project's latest autosaved name/data, shared by all workers until it is flushed (accounts/autosave.py)."""
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='pending_autosave')
+    name = models.CharField(max_length=255, null=True, blank=True)
+    # What changed from the saved Project.data (autosave.diff_project_data), not the whole data
+    data_diff = models.JSONField(null=True, blank=True)
+    # First autosave since the last flush (when the row is due) and the latest one (the project's new updated_at)
+    created_at = models.DateTimeField(auto_now_add=True)
+    queued_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='autosave_due_idx'),
+        ]
+
+
+class SamplePack(models.Model):
+    """Self-hosted samples for one sampler preset (ids match frontend models/presets.ts)."""
+    preset_id = models.SlugField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    release = models.FloatField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, help_text='Hash over all sample hashes; changes whenever any sample does')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['preset_id']
+
+    def __str__(self):
+        return self.name
+
+
+class Sample(models.Model):
+    """One note of a sample pack, stored content-addressed under SAMPLE_PACKS_ROOT."""
+    pack = models.ForeignKey(SamplePack, on_delete=models.CASCADE, related_name='samples')
+    note = models.CharField(max_length=8)
+    file_name = models.CharField(max_length=80, help_text='<sha256><ext>, relative to SAMPLE_PACKS_ROOT/<first two hex chars>/')
+    content_hash = models.CharField(max_length=64)
+    content_type = models.CharField(max_length=64)
+    size = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['pack', 'note']
+        constraints = [
+            models.UniqueConstraint(fields=['pack', 'note'], name='unique_sample_note'),
+        ]
+
+    def __str__(self):
+        return f"{self.pack.preset_id} {self.note}"
+
+
+class AudioFingerprint(models.Model):
+    """
+    One landmark hash of an uploaded track or publication (see landmark_hashes). Rows
+    are kept narrow and looked up by hash only, so the index scales to billions of rows.
+    """
+    KIND_TRACK = 1
+    KIND_PUBLICATION = 2
+    KIND_CHOICES = [(KIND_TRACK, 'Track'), (KIND_PUBLICATION, 'Publication')]
+
+    hash = models.IntegerField()
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(help_text='Anchor time in fingerprint frames')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['hash'], name='fingerprint_hash_idx'),
+            models.Index(fields=['kind', 'object_id'], name='fingerprint_object_idx'),
+        ]
+
+
+class AudioMatch(models.Model):
+    """An upload whose fingerprints line up with an earlier track or publication (a likely duplicate)."""
+    source_kind = models.PositiveSmallIntegerField(choices=AudioFingerprint.KIND_CHOICES)
+    source_id = models.PositiveIntegerField()
+    matched_kind = models.PositiveSmallIntegerField(choices=AudioFingerprint.KIND_CHOICES)
+    matched_id = models.PositiveIntegerField()
+    score = models.PositiveIntegerField(help_text='Hashes that agree on one time offset')
+    coverage = models.FloatField(help_text='score / hashes looked up')
+    offset_seconds = models.FloatField(help_text='Where the source starts within the match')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['source_kind', 'source_id', 'matched_kind', 'matched_id'], name='unique_audio_match'),
+        ]
+        indexes = [
+            models.Index(fields=['matched_kind', 'matched_id'], name='audio_match_matched_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_kind_display()} {self.source_id} ≈ {self.get_matched_kind_display()} {self.matched_id}"
+
+
+
+class ListenerSketch(models.Model):
+    """
+    HyperLogLog sketch of the distinct listeners of a publication on one day, or over
+    all time when day is null (see accounts/listeners.py).
+    """
+    publication = models.ForeignKey(Publication, on_delete=models.CASCADE, related_name='listener_sketches')
+    day = models.DateField(null=True, blank=True)
+    sketch = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['publication', 'day'], name='unique_listener_sketch_day'),
+            models.UniqueConstraint(fields=['publication'], condition=models.Q(day__isnull=True),
+                                    name='unique_listener_sketch_all_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.publication_id} {self.day or 'all time'}"
+
+
+class Follow(models.Model):
+    """follower sees followed's publications in their home feed."""
+    follower = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='following')
+    followed = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='followers')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followed'], name='unique_follow'),
+            models.CheckConstraint(condition=~models.Q(follower=models.F('followed')), name='follow_not_self'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} → {self.followed_id}"
+
+
+class TimelineEntry(models.Model):
+    """
+    One publication in one user's precomputed home timeline, written by fan-out on
+    publish (accounts/timelines.py). published_at is copied so a page is a single
+    index range scan.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    publication = models.ForeignKey(Publication, on_delete=models.CASCADE, related_name='+')
+    published_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'publication'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-published_at', '-publication'], name='timeline_page_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.publication_id}"
+
+
+class TimelineJob(models.Model):
+    """
+    A home-timeline update (accounts/timelines.py), queued in the same transaction as the
+    publish or follow that causes it and run by the process_timeline_jobs worker.
+    Done jobs are deleted; failures are retried with backoff.
+    """
+    KIND_FAN_OUT = 'fan_out'
+    KIND_REMOVE_PUBLICATION = 'remove_publication'
+    KIND_FOLLOW = 'follow'
+    KIND_UNFOLLOW = 'unfollow'
+    KIND_BACKFILL_FOLLOWERS = 'backfill_followers'
+    KIND_CHOICES = [
+        (KIND_FAN_OUT, 'Fan out a publication'),
+        (KIND_REMOVE_PUBLICATION, 'Remove a publication'),
+        (KIND_FOLLOW, 'Backfill a new follower'),
+        (KIND_UNFOLLOW, 'Remove an unfollowed creator'),
+        (KIND_BACKFILL_FOLLOWERS, "Backfill a creator's followers"),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    args = models.JSONField(default=list)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='timeline_job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}{tuple(self.args)}"
+
+
+class Tombstone(models.Model):
+    """
+    A deleted project, track or publication, so incremental sync (accounts/sync.py) can
+    tell clients to drop it. Kept SYNC_TOMBSTONE_DAYS; user_id is a plain integer so
+    tombstones written while a user is being deleted don't block the cascade.
+    """
+    KIND_PROJECT = 1
+    KIND_TRACK = 2
+    KIND_PUBLICATION = 3
+    KIND_CHOICES = [(KIND_PROJECT, 'Project'), (KIND_TRACK, 'Track'), (KIND_PUBLICATION, 'Publication')]
+
+    user_id = models.PositiveIntegerField()
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+
+class StorageUsage(models.Model):
+    """
+    Storage ledger: the bytes of a user's uploads (tracks, publications, avatar, header),
+    moved by atomic updates whenever a file is written, replaced or deleted. Kept off the
+    User row so full saves of a stale User can't overwrite it. Rebuilt by
+    `manage.py reconcile_storage`.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='storage_usage')
+    bytes_used = models.PositiveBigIntegerField(default=0)
+    quota = models.PositiveBigIntegerField(null=True, blank=True, help_text='Bytes; empty means STORAGE_QUOTA_BYTES')
+
+    def __str__(self):
+        return f"{self.user_id}: {self.bytes_used} bytes"
+
+
+class ThrottleState(models.Model):
+    """
+    Shared rate-limit state (accounts/throttling.py): a GCRA theoretical arrival time or a
+    fixed-window counter per key, as unix seconds. Rows past expires_at are dead.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    value = models.FloatField()
+    expires_at = models.FloatField(db_index=True)
+
+# ============ Storage ledger - charge uploads against the owner's quota ============
+# Connected before the cleanup signals, so a refused upload leaves the old file in place
+
+STORED_FILE_SIZES = {
+    User: {'profile_picture': 'profile_picture_size', 'header_image': 'header_image_size'},
+    Track: {'audio_file': 'audio_file_size'},
+    Publication: {
+        'audio_file': 'audio_file_size',
+        'preview_audio': 'preview_audio_size', 'stream_audio': 'stream_audio_size',
+    },
+}
+
+
+class StorageQuotaExceeded(Exception):
+    def __init__(self, needed):
+        super().__init__(f'Storage quota exceeded: this upload needs {needed / (1024 * 1024):.1f} MB more.')
+        self.needed = needed
+
+
+def storage_owner_id(instance):
+    return instance.pk if isinstance(instance, User) else instance.user_id
+
+
+def storage_quota_filter(needed):
+    """StorageUsage rows with at least `needed` bytes to spare"""
+    return (models.Q(quota__isnull=True, bytes_used__lte=settings.STORAGE_QUOTA_BYTES - needed)
+            | models.Q(quota__isnull=False, bytes_used__lte=models.F('quota') - needed))
+
+
+def charge_storage(user_id, delta, enforce=True):
+    """Move a user's ledger by delta bytes in one UPDATE; growth past the quota raises StorageQuotaExceeded"""
+    usage = StorageUsage.objects.filter(user_id=user_id)
+    if delta < 0:
+        usage.update(bytes_used=Greatest(models.F('bytes_used') + delta, 0))
+        return
+    if delta == 0:
+        return
+    if enforce:
+        usage = usage.filter(storage_quota_filter(delta))
+    if usage.update(bytes_used=models.F('bytes_used') + delta):
+        return
+    # First upload: create the row, then charge it under the same condition
+    if StorageUsage.objects.get_or_create(user_id=user_id)[1] and usage.update(bytes_used=models.F('bytes_used') + delta):
+        return
+    raise StorageQuotaExceeded(delta)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Track)
+@receiver(pre_save, sender=Publication)
+def reserve_storage(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Record the size of newly assigned uploads and reserve any growth before the files are stored"""
+    instance._storage_delta = instance._storage_reserved = 0
+    if raw or update_fields is not None:
+        return  # partial saves here never write file fields
+    sizes = STORED_FILE_SIZES[sender]
+    previous = {}
+    if not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values(*sizes.values()).first() or {}
+    delta = 0
+    for file_field, size_field in sizes.items():
+        file = getattr(instance, file_field)
+        if not file:
+            setattr(instance, size_field, 0)
+        elif not file._committed:
+            setattr(instance, size_field, file.size)
+        delta += getattr(instance, size_field) - previous.get(size_field, 0)
+    if delta > 0 and not (sender is User and instance._state.adding):
+        charge_storage(storage_owner_id(instance), delta)
+        instance._storage_reserved = delta
+    else:
+        # Shrinking is settled once the save succeeds; a new user has no ledger row to reserve on yet
+        instance._storage_delta = delta
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Track)
+@receiver(post_save, sender=Publication)
+def settle_storage(sender, instance, **kwargs):
+    if getattr(instance, '_storage_delta', 0):
+        charge_storage(storage_owner_id(instance), instance._storage_delta, enforce=False)
+        instance._storage_delta = 0
+
+
+@receiver(post_delete, sender=Track)
+@receiver(post_delete, sender=Publication)
+def release_storage(sender, instance, **kwargs):
+    """A deleted user's ledger row goes with them; tracks and publications give their bytes back"""
+    charge_storage(instance.user_id, -sum(getattr(instance, size) for size in STORED_FILE_SIZES[sender].values()))
+
+
+# ============ Uploads - store a save's new files concurrently ============
+# After the quota reservation, before the cleanup signals compare old and new names
+
+UPLOAD_FIELDS = {
+    User: ('profile_picture', 'header_image'),
+    Track: ('audio_file',),
+    Publication: ('audio_file', 'cover_image'),
+}
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Track)
+@receiver(pre_save, sender=Publication)
+def store_new_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Upload every newly assigned file at once instead of one by one in Model.save; all or nothing"""
+    if raw:
+        return
+    instance._stored_uploads = store_field_files(getattr(instance, name) for name in UPLOAD_FIELDS[sender]
+                                                 if update_fields is None or name in update_fields)
+
+
+def discard_failed_uploads(instance):
+    """
+    The save failed after store_new_files (a later pre_save receiver, the INSERT/UPDATE itself):
+    no row refers to the files it stored, so delete them and give back reserve_storage's charge.
+    """
+    stored, instance._stored_uploads = getattr(instance, '_stored_uploads', []), []
+    reserved, instance._storage_reserved = getattr(instance, '_storage_reserved', 0), 0
+    try:
+        delete_files(stored)
+    except Exception:
+        logger.exception('Could not delete files stored by a failed save of %s', type(instance).__name__)
+    # In a transaction the failed query broke, the reservation is rolled back along with it
+    if reserved and not transaction.get_connection().needs_rollback:
+        charge_storage(storage_owner_id(instance), -reserved, enforce=False)
+
+
 # ============ Cleanup signals - delete files from Cloudinary ============
 
+def stored_files(*field_files):
+    return [(field_file.storage, field_file.name) for field_file in field_files if field_file]
+
+
 @receiver(pre_delete, sender=User)
 def delete_user_files(sender, instance, **kwargs):
     """Delete profile picture and header from Cloudinary when user is deleted"""
-    if instance.profile_picture:
-        instance.profile_picture.delete(save=False)
-    if instance.header_image:
-        instance.header_image.delete(save=False)
+    delete_files(stored_files(instance.profile_picture, instance.header_image)
+                 + derivative_files(instance.profile_picture_derivatives)
+                 + derivative_files(instance.header_image_derivatives))
 
 
 @receiver(pre_delete, sender=Track)
@@ -158,15 +704,14 @@ def delete_track_file(sender, instance, **kwargs):
 @receiver(pre_delete, sender=Publication)
 def delete_publication_files(sender, instance, **kwargs):
     """Delete audio file and cover image from Cloudinary when publication is deleted"""
-    if instance.audio_file:
-        instance.audio_file.delete(save=False)
-    if instance.cover_image:
-        instance.cover_image.delete(save=False)
+    delete_files(stored_files(instance.audio_file, instance.preview_audio, instance.stream_audio,
+                              instance.cover_image)
+                 + derivative_files(instance.cover_image_derivatives))
 
 
 @receiver(pre_save, sender=User)
 def delete_old_user_files(sender, instance, **kwargs):
-    """Delete old files when user uploads new profile picture or header"""
+    """Note old files replaced by a new profile picture or header; deleted once the save succeeds"""
     if not instance.pk:
         return  # New user, nothing to delete
     
@@ -175,18 +720,18 @@ def delete_old_user_files(sender, instance, **kwargs):
     except User.DoesNotExist:
         return
     
-    # Delete old profile picture if changed
-    if old_instance.profile_picture and old_instance.profile_picture != instance.profile_picture:
-        old_instance.profile_picture.delete(save=False)
-    
-    # Delete old header if changed
-    if old_instance.header_image and old_instance.header_image != instance.header_image:
-        old_instance.header_image.delete(save=False)
+    # Old profile picture and header, if changed
+    instance._replaced_files = stored_files(*(
+        old_file for old_file, new_file in (
+            (old_instance.profile_picture, instance.profile_picture),
+            (old_instance.header_image, instance.header_image),
+        ) if old_file != new_file
+    ))
 
 
 @receiver(pre_save, sender=Track)
 def delete_old_track_file(sender, instance, **kwargs):
-    """Delete old audio file when track is updated with new file"""
+    """Note the old audio file when track is updated with new file; deleted once the save succeeds"""
     if not instance.pk:
         return
     
@@ -195,5 +740,261 @@ def delete_old_track_file(sender, instance, **kwargs):
     except Track.DoesNotExist:
         return
     
-    if old_instance.audio_file and old_instance.audio_file != instance.audio_file:
-        old_instance.audio_file.delete(save=False)
\ No newline at end of file
+    if old_instance.audio_file != instance.audio_file:
+        instance._replaced_files = stored_files(old_instance.audio_file)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Track)
+def delete_replaced_files(sender, instance, **kwargs):
+    replaced, instance._replaced_files = getattr(instance, '_replaced_files', []), []
+    try:
+        delete_files(replaced)
+    except Exception:
+        # The row already points at the new files; an orphan is better than failing the save
+        logger.exception('Could not delete files replaced on %s %s', sender.__name__, instance.pk)
+
+
+# ============ Image derivatives - regenerate on upload ============
+
+def generate_image_derivatives(model, pk):
+    """Bring one row's derivatives in line with its images, unless the images change again meanwhile"""
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    try:
+        changed = sync_derivatives(instance)
+    except (ValidationError, OSError):
+        logger.exception('Could not generate image derivatives for %s %s', model.__name__, pk)
+        return
+    if changed:
+        save_derivatives(instance, changed)
+
+
+def save_derivatives(instance, changed):
+    """
+    Write the derivative JSON fields named in changed, unless the row's images were replaced
+    since instance was loaded. Returns whether the row was updated.
+    """
+    model = type(instance)
+    unchanged = models.Q()
+    for image_field, json_field in IMAGE_FIELDS[model.__name__]:
+        if json_field in changed:
+            name = getattr(instance, image_field).name
+            unchanged &= models.Q(**{image_field: name}) if name else \
+                models.Q(**{image_field: ''}) | models.Q(**{f'{image_field}__isnull': True})
+    updated = model.objects.filter(unchanged, pk=instance.pk).update(
+        **{name: getattr(instance, name) for name in changed}, **version_bump(model)
+    )
+    if not updated:
+        # A newer upload (or a delete) got there first; its own job makes its derivatives
+        delete_files([file for name in changed for file in derivative_files(getattr(instance, name))])
+    return bool(updated)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Publication)
+def update_image_derivatives(sender, instance, **kwargs):
+    """Generate 64/256/1024 WebP + JPEG copies, after the response, whenever an image field points at a new file"""
+    for image_field, json_field in IMAGE_FIELDS[sender.__name__]:
+        field_file = getattr(instance, image_field)
+        if (getattr(instance, json_field) or {}).get('source') != (field_file.name if field_file else None):
+            run_in_thread(generate_image_derivatives, sender, instance.pk)
+            return
+
+
+# ============ Audio analysis - run in the process pool on upload ============
+
+def schedule_audio_analysis(instance):
+    """Queue analysis of instance.audio_file; results are written back with a single UPDATE."""
+    model = type(instance)
+
+    def save_result(result):
+        fingerprints = result.pop('fingerprints')
+        updated = model.objects.filter(pk=instance.pk).update(
+            analysis_status=AudioAnalysis.ANALYSIS_DONE, **result, **version_bump(model)
+        )
+        if not updated:
+            return  # deleted while it was being analyzed
+        index_fingerprints(instance, fingerprints)
+        if model is Publication:
+            update_similarity_index(instance.pk, force=True)
+
+    def mark_failed(exc):
+        model.objects.filter(pk=instance.pk).update(
+            analysis_status=AudioAnalysis.ANALYSIS_FAILED, **version_bump(model)
+        )
+
+    run_on_spooled_file(instance.audio_file, analyze_audio, model is Publication,
+                        on_success=save_result, on_error=mark_failed)
+
+
+@receiver(post_save, sender=Track)
+@receiver(post_save, sender=Publication)
+def analyze_uploaded_audio(sender, instance, created, **kwargs):
+    """Analyze duration, loudness, tempo and key of newly uploaded audio"""
+    if created and instance.audio_file:
+        schedule_audio_analysis(instance)
+        if sender is Publication:
+            schedule_renditions(instance)
+
+
+# ============ Playback renditions - transcode in the process pool on publish ============
+
+RENDITION_FIELDS = {'preview': 'preview_audio', 'stream': 'stream_audio'}
+
+
+def store_renditions(instance, renditions):
+    """Upload transcode_renditions() output and point the publication at it; returns the fields set"""
+    basename = os.path.splitext(os.path.basename(instance.audio_file.name))[0]
+    fields = [Publication._meta.get_field(RENDITION_FIELDS[kind]) for kind in renditions]
+    stored = dict(zip(fields, save_files(
+        (field.storage, field.generate_filename(instance, f'{basename}_{kind}.{extension}'), ContentFile(payload))
+        for field, (kind, (extension, payload)) in zip(fields, renditions.items())
+    )))
+    if not stored:
+        return []
+    sizes = {STORED_FILE_SIZES[Publication][field.name]: len(payload)
+             for field, (_, payload) in zip(fields, renditions.values())}
+    with transaction.atomic():
+        previous = Publication.objects.select_for_update().filter(pk=instance.pk).values('user_id', *sizes).first()
+        if previous is None:  # deleted while it was being transcoded
+            transaction.on_commit(lambda: delete_files((field.storage, name) for field, name in stored.items()))
+            return []
+        Publication.objects.filter(pk=instance.pk).update(
+            **{field.name: name for field, name in stored.items()}, **sizes, **version_bump(Publication)
+        )
+        # Renditions come from an upload that was already admitted, so they are charged but never refused
+        charge_storage(previous['user_id'], sum(sizes.values()) - sum(previous[size] for size in sizes), enforce=False)
+    return [field.name for field in stored]
+
+
+def schedule_renditions(instance):
+    """Queue the preview and stream transcodes of a publication's audio_file"""
+    run_on_spooled_file(instance.audio_file, transcode_renditions,
+                        on_success=lambda renditions: store_renditions(instance, renditions))
+
+
+# ============ Duplicate detection - acoustic fingerprints ============
+
+def index_fingerprints(instance, fingerprints):
+    """Flag near-duplicates of a newly analyzed upload and add it to the fingerprint index"""
+    from .fingerprints import index_upload  # imports this module
+    index_upload(instance, fingerprints)
+
+
+@receiver(post_delete, sender=Track)
+@receiver(post_delete, sender=Publication)
+def delete_audio_fingerprints(sender, instance, **kwargs):
+    from .fingerprints import delete_fingerprints
+    delete_fingerprints(instance)
+
+
+# ============ Similar songs - keep the ANN index in line with public publications ============
+
+def update_similarity_index(pk, force=False):
+    publication = Publication.objects.filter(pk=pk).values('embedding', 'is_public').first()
+    try:
+        if publication is None:
+            sync_publication(pk, None, False)
+        else:
+            sync_publication(pk, publication['embedding'], publication['is_public'], force=force)
+    except OSError:
+        logger.exception('Could not update the similarity index for publication %s', pk)
+
+
+@receiver(post_save, sender=Publication)
+def index_publication_visibility(sender, instance, created, update_fields=None, **kwargs):
+    """Publishing or unpublishing adds or removes the song from "similar songs" results"""
+    if not created and (update_fields is None or 'is_public' in update_fields):
+        update_similarity_index(instance.pk)
+
+
+@receiver(post_delete, sender=Publication)
+def unindex_deleted_publication(sender, instance, **kwargs):
+    update_similarity_index(instance.pk)
+
+
+# ============ Home timelines - fan out on publish, follow and unfollow ============
+
+# Jobs are rows written with the change itself, so none is lost to a restart (see TimelineJob)
+
+@receiver(post_save, sender=Publication)
+def fan_out_publication(sender, instance, created, update_fields=None, **kwargs):
+    """Publishing or unpublishing adds or removes the song from followers' home timelines"""
+    if created or update_fields is None or 'is_public' in update_fields:
+        if instance.is_public:
+            TimelineJob.objects.create(kind=TimelineJob.KIND_FAN_OUT, args=[instance.pk])
+        elif not created:
+            TimelineJob.objects.create(kind=TimelineJob.KIND_REMOVE_PUBLICATION, args=[instance.pk])
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.followed_id).update(follower_count=models.F('follower_count') + 1)
+        TimelineJob.objects.create(kind=TimelineJob.KIND_FOLLOW, args=[instance.follower_id, instance.followed_id])
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        # RETURNING gives each concurrent unfollow its own count, so exactly one sees the crossing
+        cursor.execute(
+            f'UPDATE {quote(User._meta.db_table)} SET {quote("follower_count")} = {quote("follower_count")} - 1 '
+            f'WHERE {quote("id")} = %s AND {quote("follower_count")} > 0 RETURNING {quote("follower_count")}',
+            [instance.followed_id],
+        )
+        row = cursor.fetchone()
+    TimelineJob.objects.create(kind=TimelineJob.KIND_UNFOLLOW, args=[instance.follower_id, instance.followed_id])
+    if row is not None and row[0] == settings.TIMELINE_FANOUT_MAX_FOLLOWERS:
+        # Back under the fan-out threshold: reads stop merging their songs in, so write them out
+        TimelineJob.objects.create(kind=TimelineJob.KIND_BACKFILL_FOLLOWERS, args=[instance.followed_id])
+
+
+# ============ Sync tombstones - remember deletions for incremental sync ============
+
+TOMBSTONE_KINDS = {
+    Project: Tombstone.KIND_PROJECT,
+    Track: Tombstone.KIND_TRACK,
+    Publication: Tombstone.KIND_PUBLICATION,
+}
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Track)
+@receiver(post_delete, sender=Publication)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(user_id=instance.user_id, kind=TOMBSTONE_KINDS[sender], object_id=instance.pk)
+
+
+# ============ Fragment cache versions ============
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Publication)
+def bump_cache_version(sender, instance, update_fields=None, **kwargs):
+    """
+    Full saves carry the bump in the same UPDATE. It is computed by the database, so
+    a version bumped by another request since this instance was loaded isn't reused.
+    """
+    if update_fields is None and not instance._state.adding:
+        instance.cache_version = models.F('cache_version') + 1
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Publication)
+def bump_cache_version_after_partial_save(sender, instance, created, update_fields=None, **kwargs):
+    """Partial saves of anything but volatile fields (play_count, last_login) need their own bump"""
+    if update_fields is not None and not set(update_fields) <= VOLATILE_FIELDS[sender.__name__]:
+        sender.objects.filter(pk=instance.pk).update(**version_bump(sender))
+    elif update_fields is not None or created:
+        return
+    # Read back the new version, so cards rendered from this instance use the new key
+    instance.refresh_from_db(fields=['cache_version'])
+
+
+@receiver(pre_delete, sender=Project)
+def bump_publications_of_deleted_project(sender, instance, **kwargs):
+    """Deleting a project clears Publication.project with a bulk UPDATE that skips the bumps above"""
+    instance.publications.update(**version_bump(Publication))
@@ -0,0 +1,179 @@
+import json
+import os
+import posixpath
+import zipfile
+from urllib.request import urlopen
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+
+from .models import Track, Project
+from .serializers import ALLOWED_AUDIO_TYPES, AUDIO_MAX_SIZE
+
+ARCHIVE_FORMAT = 'sonara-project/1'
+CHUNK_SIZE = 64 * 1024
+PROJECT_JSON_MAX_SIZE = 50 * 1024 * 1024
+ARCHIVE_MAX_MEMBERS = 1000
+
+AUDIO_EXTENSIONS = {
+    '.mp3': 'audio/mpeg', '.wav': 'audio/wav', '.ogg': 'audio/ogg', '.flac': 'audio/flac',
+    '.aac': 'audio/aac', '.m4a': 'audio/mp4', '.webm': 'audio/webm',
+}
+
+
+def _clips(data):
+    for track in data.get('tracks') or []:
+        if isinstance(track, dict):
+            for clip in track.get('clips') or []:
+                if isinstance(clip, dict):
+                    yield clip
+
+
+def _iter_file_chunks(field_file):
+    """Read a stored file in chunks, from disk when the storage is local and over HTTP otherwise."""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        with urlopen(field_file.url) as response:
+            while chunk := response.read(CHUNK_SIZE):
+                yield chunk
+    else:
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+
+class _ChunkBuffer:
+    """Write-only file object that ZipFile writes into; the export generator drains it."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def export_project_archive(project):
+    """
+    Yield a zip of project.json, peaks.json and every audio file the project references
+    from the owner's tracks. Audio is copied chunk by chunk, so memory stays flat.
+    Pending autosaves (autosave.buffer.pending) should already be applied to project.
+    """
+    data = json.loads(json.dumps(project.data))  # deep copy; rewritten below
+    tracks_by_url = {track.audio_file.url: track for track in Track.objects.filter(user=project.user) if track.audio_file}
+
+    audio, peaks = {}, {}
+    for clip in _clips(data):
+        if 'waveformPeaks' in clip:
+            peaks[str(clip.get('id'))] = clip.pop('waveformPeaks')
+        track = tracks_by_url.get(clip.get('audioFileUrl'))
+        if track is not None:
+            path = f'audio/{track.pk}-{posixpath.basename(track.audio_file.name)}'
+            audio[path] = track
+            clip['audioFileUrl'] = path
+
+    manifest = {
+        'format': ARCHIVE_FORMAT,
+        'name': project.name,
+        'data': data,
+        'audio': [{'path': path, 'title': track.title} for path, track in audio.items()],
+    }
+
+    buffer = _ChunkBuffer()
+    # ZipFile falls back to data descriptors on an unseekable stream, so nothing is buffered
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('project.json', json.dumps(manifest))
+        archive.writestr('peaks.json', json.dumps(peaks))
+        yield buffer.drain()
+        for path, track in audio.items():
+            # Audio is already compressed; storing it keeps export CPU-light
+            with archive.open(zipfile.ZipInfo(path), 'w') as member:
+                for chunk in _iter_file_chunks(track.audio_file):
+                    member.write(chunk)
+                    yield buffer.drain()
+    yield buffer.drain()
+
+
+def _read_member(archive, name, max_size):
+    info = archive.getinfo(name)
+    if info.file_size > max_size:
+        raise ValidationError(f'{name} is too large.')
+    return archive.read(info)
+
+
+def import_project_archive(user, archive_file):
+    """
+    Create a Project and its Tracks from an uploaded archive. archive_file must be seekable
+    (Django spools large uploads to disk), and members are streamed from it one at a time.
+    """
+    try:
+        archive = zipfile.ZipFile(archive_file)
+    except zipfile.BadZipFile:
+        raise ValidationError('Not a valid project archive.')
+
+    with archive:
+        if len(archive.infolist()) > ARCHIVE_MAX_MEMBERS:
+            raise ValidationError('Archive has too many files.')
+        try:
+            manifest = json.loads(_read_member(archive, 'project.json', PROJECT_JSON_MAX_SIZE))
+            peaks = json.loads(_read_member(archive, 'peaks.json', PROJECT_JSON_MAX_SIZE))
+        except KeyError:
+            raise ValidationError('Archive is missing project.json or peaks.json.')
+        except ValueError:
+            raise ValidationError('Archive metadata is not valid JSON.')
+        if not isinstance(manifest, dict) or manifest.get('format') != ARCHIVE_FORMAT:
+            raise ValidationError('Unsupported archive format.')
+        data = manifest.get('data') if isinstance(manifest.get('data'), dict) else {}
+
+        saved_files = []
+        try:
+            with transaction.atomic():
+                urls = {}
+                for entry in manifest.get('audio') or []:
+                    path = entry.get('path', '')
+                    content_type = AUDIO_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+                    if content_type not in ALLOWED_AUDIO_TYPES:
+                        raise ValidationError(f'{path}: unsupported audio format.')
+                    try:
+                        info = archive.getinfo(path)
+                    except KeyError:
+                        raise ValidationError(f'{path} is missing from the archive.')
+                    if info.file_size > AUDIO_MAX_SIZE:
+                        raise ValidationError(f'{path}: audio file must be under 50 MB.')
+                    with archive.open(info) as member:
+                        track = Track(user=user, title=str(entry.get('title') or posixpath.basename(path))[:255])
+                        upload = File(member, name=posixpath.basename(path))
+                        upload.size = info.file_size  # without decompressing the member to measure it
+                        # Assigned uncommitted, so the save charges it to the quota before uploading it
+                        track.audio_file = upload
+                        track.save()
+                        saved_files.append(track.audio_file)
+                    urls[path] = track.audio_file.url
+
+                for clip in _clips(data):
+                    if clip.get('audioFileUrl') in urls:
+                        clip['audioFileUrl'] = urls[clip['audioFileUrl']]
+                    clip_peaks = peaks.get(str(clip.get('id'))) if isinstance(peaks, dict) else None
+                    if clip_peaks is not None:
+                        clip['waveformPeaks'] = clip_peaks
+
+                return Project.objects.create(
+                    user=user,
+                    name=str(manifest.get('name') or 'Imported Project')[:255],
+                    data=data,
+                )
+        except Exception:
+            # The rollback removes the rows, but uploaded files need deleting by hand
+            for field_file in saved_files:
+                field_file.storage.delete(field_file.name)
+            raise
@@ -0,0 +1,150 @@
+"""
+Optional columnar wire encoding for Project.data.
+
+Each clip's `notes` list becomes parallel typed arrays (base64, little-endian) and
+`waveformPeaks` becomes a uint8-quantized array. Note columns pick the smallest type
+that round-trips every value exactly, so notes decode to the same JSON they came from;
+peaks are lossy by design (1/255 resolution is below what a waveform can draw).
+"""
+import base64
+import sys
+from array import array
+
+NOTE_COLUMNS = ('id', 'pitch', 'startBeat', 'duration', 'velocity')
+NOTE_TYPE_CANDIDATES = {
+    'id': ('I', 'd'),
+    'pitch': ('B', 'f', 'd'),
+    'velocity': ('B', 'f', 'd'),
+    'startBeat': ('f', 'd'),
+    'duration': ('f', 'd'),
+}
+TYPE_NAMES = {'B': 'u1', 'I': 'u4', 'f': 'f4', 'd': 'f8'}
+TYPE_CODES = {name: code for code, name in TYPE_NAMES.items()}
+
+NOTES_FORMAT = 'columnar/1'
+PEAKS_FORMAT = 'u8/1'
+
+
+def _to_bytes(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def _from_bytes(code, encoded):
+    """Decode one base64 column; ValueError if it isn't valid base64 of whole items."""
+    if not isinstance(encoded, str):
+        raise ValueError('columns must be base64 strings')
+    values = array(code)
+    values.frombytes(base64.b64decode(encoded, validate=True))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _pack_column(values, candidates):
+    for code in candidates:
+        try:
+            packed = array(code, values)
+        except (OverflowError, TypeError):
+            continue
+        if packed.tolist() == values:
+            return [TYPE_NAMES[code], _to_bytes(packed)]
+    return None
+
+
+def _plain_number(value):
+    # JSON.stringify writes 2.0 as 2; keep decoded output identical to what the client sent
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def encode_notes(notes):
+    if not notes or any(not isinstance(n, dict) or n.keys() != set(NOTE_COLUMNS) for n in notes):
+        return notes
+    columns = {}
+    for name in NOTE_COLUMNS:
+        values = [n[name] for n in notes]
+        if any(isinstance(v, bool) or not isinstance(v, (int, float)) for v in values):
+            return notes
+        packed = _pack_column(values, NOTE_TYPE_CANDIDATES[name])
+        if packed is None:
+            return notes
+        columns[name] = packed
+    return {'format': NOTES_FORMAT, 'count': len(notes), 'columns': columns}
+
+
+def decode_notes(notes):
+    """Columnar notes → list of note dicts; ValueError if the columns are malformed or of unequal length."""
+    if not isinstance(notes, dict) or notes.get('format') != NOTES_FORMAT:
+        return notes
+    count, columns = notes.get('count'), notes.get('columns')
+    if isinstance(count, bool) or not isinstance(count, int) or count < 0:
+        raise ValueError(f'{NOTES_FORMAT} notes need a non-negative integer count')
+    if not isinstance(columns, dict) or columns.keys() != set(NOTE_COLUMNS):
+        raise ValueError(f'{NOTES_FORMAT} notes need exactly the columns {", ".join(NOTE_COLUMNS)}')
+    decoded = {}
+    for name in NOTE_COLUMNS:
+        column = columns[name]
+        if not isinstance(column, (list, tuple)) or len(column) != 2 or column[0] not in TYPE_CODES:
+            raise ValueError(f'column {name} must be [type, base64] with type one of {", ".join(TYPE_CODES)}')
+        try:
+            values = _from_bytes(TYPE_CODES[column[0]], column[1])
+        except ValueError:
+            raise ValueError(f'column {name} is not valid base64 of {column[0]} values')
+        if len(values) != count:
+            raise ValueError(f'column {name} has {len(values)} values for {count} notes')
+        decoded[name] = [_plain_number(v) for v in values]
+    return [dict(zip(NOTE_COLUMNS, row)) for row in zip(*(decoded[name] for name in NOTE_COLUMNS))]
+
+
+def encode_peaks(peaks):
+    if not peaks or any(isinstance(p, bool) or not isinstance(p, (int, float)) for p in peaks):
+        return peaks
+    quantized = array('B', (min(255, max(0, round(p * 255))) for p in peaks))
+    return {'format': PEAKS_FORMAT, 'data': _to_bytes(quantized)}
+
+
+def decode_peaks(peaks):
+    """Quantized peaks → list of floats; ValueError if `data` is missing or not base64."""
+    if not isinstance(peaks, dict) or peaks.get('format') != PEAKS_FORMAT:
+        return peaks
+    try:
+        quantized = _from_bytes('B', peaks.get('data'))
+    except ValueError:
+        raise ValueError(f'{PEAKS_FORMAT} peaks need base64 data')
+    return [round(q / 255, 4) for q in quantized]
+
+
+def _map_clips(data, notes_fn, peaks_fn):
+    if not isinstance(data, dict) or not isinstance(data.get('tracks'), list):
+        return data
+    tracks = []
+    for track in data['tracks']:
+        if isinstance(track, dict) and isinstance(track.get('clips'), list):
+            clips = []
+            for clip in track['clips']:
+                if isinstance(clip, dict):
+                    clip = dict(clip)
+                    if 'notes' in clip:
+                        clip['notes'] = notes_fn(clip['notes'])
+                    if 'waveformPeaks' in clip:
+                        clip['waveformPeaks'] = peaks_fn(clip['waveformPeaks'])
+                clips.append(clip)
+            track = {**track, 'clips': clips}
+        tracks.append(track)
+    return {**data, 'tracks': tracks}
+
+
+def encode_project_data(data):
+    """Canonical Project.data → columnar wire form."""
+    return _map_clips(data, encode_notes, encode_peaks)
+
+
+def decode_project_data(data):
+    """Columnar (or already canonical) wire form → canonical Project.data; ValueError if malformed."""
+    return _map_clips(data, decode_notes, decode_peaks)
+
+
+def wants_columnar(request):
+    """Clients opt in per request with ?encoding=columnar."""
+    return request is not None and request.query_params.get('encoding') == 'columnar'
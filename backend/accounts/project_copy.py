@@ -0,0 +1,41 @@
+"""
+Server-side project duplication: one INSERT ... SELECT copies the row, so the project
+data never leaves the database. The copy's clips keep pointing at the same audio URLs
+(Tracks are shared, not re-uploaded), and its summary columns are copied as-is since
+they describe identical data.
+"""
+from django.db import connection
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Project
+
+
+def duplicate_project(source_id, user_id, name):
+    """Copy project source_id to a new project of user_id; returns the new pk, or raises Http404 if it's gone."""
+    now = timezone.now()
+    overrides = {'user': user_id, 'name': name, 'created_at': now, 'updated_at': now, 'is_template': False}
+    quote = connection.ops.quote_name
+    columns, selects, params = [], [], []
+    for field in Project._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        columns.append(quote(field.column))
+        if field.name in overrides:
+            selects.append('%s')
+            params.append(field.get_db_prep_save(overrides[field.name], connection))
+        else:
+            selects.append(quote(field.column))
+    table = quote(Project._meta.db_table)
+    pk_column = quote(Project._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({", ".join(columns)}) '
+            f'SELECT {", ".join(selects)} FROM {table} WHERE {pk_column} = %s '
+            f'RETURNING {pk_column}',
+            [*params, source_id],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        raise Http404('Project not found')  # deleted since the caller looked it up
+    return row[0]
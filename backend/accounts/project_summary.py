@@ -0,0 +1,40 @@
+import hashlib
+import json
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def summarize_project_data(data):
+    """Summary column values for a canonical Project.data dict (see Project.save)."""
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+    summary = {
+        'bpm': None,
+        'track_count': 0,
+        'clip_count': 0,
+        'note_count': 0,
+        'duration_beats': 0.0,
+        'byte_size': len(encoded),
+        'content_hash': hashlib.sha256(encoded).hexdigest(),
+    }
+    if not isinstance(data, dict):
+        return summary
+
+    summary['bpm'] = _number(data.get('bpm'))
+    tracks = data.get('tracks') if isinstance(data.get('tracks'), list) else []
+    summary['track_count'] = len(tracks)
+    for track in tracks:
+        clips = track.get('clips') if isinstance(track, dict) else None
+        if not isinstance(clips, list):
+            continue
+        for clip in clips:
+            if not isinstance(clip, dict):
+                continue
+            summary['clip_count'] += 1
+            if isinstance(clip.get('notes'), list):
+                summary['note_count'] += len(clip['notes'])
+            start, length = _number(clip.get('startBeat')), _number(clip.get('duration'))
+            if start is not None and length is not None:
+                summary['duration_beats'] = max(summary['duration_beats'], float(start + length))
+    return summary
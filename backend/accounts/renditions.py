@@ -0,0 +1,117 @@
+"""
+Playback renditions of published songs, so feeds and profiles don't stream the
+original upload (often a 50 MB WAV): a 30-second preview for feed cards and a
+full-length stream at a modest bitrate.
+
+Both are AAC in MP4 with the index up front (faststart), so playback starts before
+the download finishes. The stream is skipped when the upload is already compressed
+at about that bitrate; players fall back to audio_file. Without ffmpeg only WAV
+uploads get a preview, written as a small mono WAV with SciPy.
+
+No Django imports, so it runs in the process pool like audio_analysis.
+"""
+import io
+import json
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+from .audio_analysis import decode_audio, ffmpeg_available, is_wav, local_path
+
+PREVIEW_SECONDS = 30
+PREVIEW_FADE_SECONDS = 1
+PREVIEW_BITRATE = 64_000
+STREAM_BITRATE = 128_000
+# An upload within this factor of STREAM_BITRATE is streamed as-is
+STREAM_MIN_SAVING = 1.5
+FALLBACK_SAMPLE_RATE = 22050
+
+
+def preview_window(duration):
+    """(start, length) of the preview: a third of the way in, past most intros."""
+    if duration is None or duration <= PREVIEW_SECONDS:
+        return 0.0, duration or PREVIEW_SECONDS
+    return min(duration / 3, duration - PREVIEW_SECONDS), PREVIEW_SECONDS
+
+
+def _fades(start, length, duration):
+    """Short fades where the preview cuts into the song."""
+    fades = []
+    if start > 0:
+        fades.append(f'afade=t=in:d={PREVIEW_FADE_SECONDS}')
+    if duration is not None and start + length < duration:
+        fades.append(f'afade=t=out:st={length - PREVIEW_FADE_SECONDS}:d={PREVIEW_FADE_SECONDS}')
+    return ','.join(fades)
+
+
+def _probe(path):
+    probe = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration,bit_rate', '-of', 'json', path],
+        capture_output=True, check=True,
+    )
+    info = json.loads(probe.stdout).get('format') or {}
+    duration, bit_rate = info.get('duration'), info.get('bit_rate')
+    return (float(duration) if duration not in (None, 'N/A') else None,
+            int(bit_rate) if bit_rate not in (None, 'N/A') else None)
+
+
+def _encode_aac(source, bitrate, input_args=(), output_args=()):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'rendition.m4a')
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', *input_args, '-i', source, '-map', 'a:0', '-vn', *output_args,
+             '-c:a', 'aac', '-b:a', str(bitrate), '-movflags', '+faststart', output],
+            capture_output=True, check=True,
+        )
+        with open(output, 'rb') as f:
+            return f.read()
+
+
+def _transcode_with_ffmpeg(source):
+    renditions = {}
+    with local_path(source) as path:
+        duration, bit_rate = _probe(path)
+        start, length = preview_window(duration)
+        fades = _fades(start, length, duration)
+        renditions['preview'] = ('m4a', _encode_aac(
+            path, PREVIEW_BITRATE,
+            input_args=['-ss', f'{start:.3f}', '-t', f'{length:.3f}'],
+            output_args=['-af', fades] if fades else [],
+        ))
+        if bit_rate is None or bit_rate > STREAM_BITRATE * STREAM_MIN_SAVING:
+            renditions['stream'] = ('m4a', _encode_aac(path, STREAM_BITRATE))
+    return renditions
+
+
+def _wav_preview(source):
+    from scipy import signal
+    from scipy.io import wavfile
+    samples, rate = decode_audio(source)
+    duration = len(samples) / rate
+    start, length = preview_window(duration)
+    mono = samples[int(start * rate):int((start + length) * rate)].mean(axis=1)
+    fade = min(int(PREVIEW_FADE_SECONDS * rate), len(mono) // 2)
+    if start > 0 and fade:
+        mono[:fade] *= np.linspace(0, 1, fade, dtype=np.float32)
+    if start + length < duration and fade:
+        mono[-fade:] *= np.linspace(1, 0, fade, dtype=np.float32)
+    divisor = np.gcd(FALLBACK_SAMPLE_RATE, rate)
+    mono = signal.resample_poly(mono, FALLBACK_SAMPLE_RATE // divisor, rate // divisor)
+    pcm = (np.clip(mono, -1, 1) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    wavfile.write(buffer, FALLBACK_SAMPLE_RATE, pcm)
+    return buffer.getvalue()
+
+
+def transcode_renditions(source):
+    """
+    Return {'preview': (extension, bytes), 'stream': (extension, bytes)} for encoded audio
+    (bytes or a file path); either may be missing.
+    """
+    if ffmpeg_available():
+        return _transcode_with_ffmpeg(source)
+    if is_wav(source):
+        return {'preview': ('wav', _wav_preview(source))}
+    return {}
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import struct
+import tempfile
+
+from django.conf import settings
+
+from .file_serving import CHUNK_SIZE, write_precompressed
+
+SAMPLE_EXTENSIONS = {'.mp3', '.ogg', '.wav', '.flac', '.m4a', '.webm'}
+NOTE_RE = re.compile(r'^[A-G](#|b|s)?-?\d$')
+FILE_NAME_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{2,5}$')
+
+
+def sample_path(file_name):
+    """Absolute path of a stored sample; file_name is validated so it cannot escape the root."""
+    if not FILE_NAME_RE.match(file_name):
+        raise ValueError('invalid sample file name')
+    return os.path.join(settings.SAMPLE_PACKS_ROOT, file_name[:2], file_name)
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_sample(source):
+    """Copy source into the content-addressed store (with precompressed variants); returns Sample field values."""
+    extension = os.path.splitext(source)[1].lower()
+    content_hash = _hash_file(source)
+    file_name = f'{content_hash}{extension}'
+    path = sample_path(file_name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, path)
+        write_precompressed(path)
+    return {
+        'file_name': file_name,
+        'content_hash': content_hash,
+        'content_type': mimetypes.guess_type(source)[0] or 'application/octet-stream',
+        'size': os.path.getsize(path),
+    }
+
+
+def pack_hash(sample_hashes):
+    """Version of a pack: hash over (note, sample hash) pairs."""
+    digest = hashlib.sha256()
+    for note, content_hash in sorted(sample_hashes.items()):
+        digest.update(f'{note}:{content_hash}\n'.encode())
+    return digest.hexdigest()
+
+
+# ─── Bundles ───
+# One response with every sample of a preset:
+#   4-byte big-endian header length N, N bytes of JSON header, then the sample bytes back to back.
+#   Header: {"samples": {"<note>": {"offset", "length", "hash", "contentType"}}}; offsets are
+#   relative to the first byte after the header.
+
+def bundle_header(samples):
+    offset, entries = 0, {}
+    for sample in samples:
+        entries[sample.note] = {
+            'offset': offset, 'length': sample.size,
+            'hash': sample.content_hash, 'contentType': sample.content_type,
+        }
+        offset += sample.size
+    header = json.dumps({'samples': entries}, separators=(',', ':')).encode()
+    return struct.pack('>I', len(header)) + header, offset
+
+
+def iter_bundle(samples):
+    header, _ = bundle_header(samples)
+    yield header
+    for sample in samples:
+        with open(sample_path(sample.file_name), 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
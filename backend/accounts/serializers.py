@@ -1,8 +1,12 @@
 from rest_framework import serializers
+from django.db import models
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from django.core.files.storage import default_storage
-from .models import Track, Project, Publication
+from .models import Track, Project, ProjectCollaborator, Publication
+from .images import srcset_map
+from .project_codec import encode_project_data, decode_project_data, wants_columnar
+from .fragment_cache import fragment_key, cached_fragments
+from .storage_quota import storage_usage
 
 User = get_user_model()
 
@@ -10,6 +14,9 @@ User = get_user_model()
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     role = serializers.ReadOnlyField()
+    header_image_srcset = serializers.SerializerMethodField()
+    profile_picture_srcset = serializers.SerializerMethodField()
+    storage = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -17,8 +24,20 @@ class UserSerializer(serializers.ModelSerializer):
             'id', 'username', 'email', 'password',
             'is_listener', 'is_creator', 'role',
             'header_image', 'profile_picture',
-            'bio',
+            'header_image_srcset', 'profile_picture_srcset',
+            'bio', 'follower_count', 'storage',
         )
+        read_only_fields = ('follower_count',)
+
+    def get_header_image_srcset(self, obj):
+        return srcset_map(obj.header_image_derivatives, obj.header_image)
+
+    def get_profile_picture_srcset(self, obj):
+        return srcset_map(obj.profile_picture_derivatives, obj.profile_picture)
+
+    def get_storage(self, obj):
+        used, quota = storage_usage(obj.pk)
+        return {'used': used, 'quota': quota}
 
     def create(self, validated_data):
         user = User.objects.create_user(**validated_data)
@@ -67,9 +86,6 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         remove_header = validated_data.pop('remove_header_image', False)
         remove_pfp = validated_data.pop('remove_profile_picture', False)
 
-        old_header_name = instance.header_image.name if instance.header_image else None
-        old_pfp_name = instance.profile_picture.name if instance.profile_picture else None
-
         if remove_header and instance.header_image:
             instance.header_image = None
         if remove_pfp and instance.profile_picture:
@@ -78,18 +94,9 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
+        # New files are uploaded together, and replaced or removed ones deleted together
+        # once the row is saved (the upload and cleanup signals in accounts/models.py)
         instance.save()
-
-        # Delete old files from storage when replaced or removed
-        if old_header_name:
-            new_header_name = instance.header_image.name if instance.header_image else None
-            if new_header_name != old_header_name:
-                default_storage.delete(old_header_name)
-        if old_pfp_name:
-            new_pfp_name = instance.profile_picture.name if instance.profile_picture else None
-            if new_pfp_name != old_pfp_name:
-                default_storage.delete(old_pfp_name)
-
         return instance
 
 
@@ -101,14 +108,20 @@ ALLOWED_AUDIO_TYPES = {
 
 AUDIO_MAX_SIZE = 50 * 1024 * 1024  # 50 MB
 
+# Filled in asynchronously after upload — see accounts/audio_analysis.py
+AUDIO_ANALYSIS_FIELDS = (
+    'analysis_status', 'duration_seconds', 'sample_rate', 'channels',
+    'loudness_lufs', 'true_peak_dbtp', 'bpm', 'musical_key',
+)
+
 
 class TrackSerializer(serializers.ModelSerializer):
     audio_file = serializers.FileField()
 
     class Meta:
         model = Track
-        fields = ('id', 'title', 'audio_file', 'uploaded_at')
-        read_only_fields = ('id', 'uploaded_at')
+        fields = ('id', 'title', 'audio_file', 'uploaded_at') + AUDIO_ANALYSIS_FIELDS
+        read_only_fields = ('id', 'uploaded_at') + AUDIO_ANALYSIS_FIELDS
 
     def validate_audio_file(self, value):
         if value.content_type not in ALLOWED_AUDIO_TYPES:
@@ -130,6 +143,19 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'data', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
+    def validate_data(self, value):
+        # Clients may send notes/peaks columnar; always store the canonical shape
+        try:
+            return decode_project_data(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        if wants_columnar(self.context.get('request')):
+            representation['data'] = encode_project_data(representation['data'])
+        return representation
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
@@ -139,23 +165,96 @@ class ProjectListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing projects (no data payload)."""
     class Meta:
         model = Project
-        fields = ('id', 'name', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        fields = ('id', 'name', 'created_at', 'updated_at') + Project.SUMMARY_FIELDS
+        read_only_fields = fields
 
 
-class PublicationSerializer(serializers.ModelSerializer):
+class ProjectTemplateSerializer(ProjectListSerializer):
+    """A template catalog entry: the project summary and who made it."""
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta(ProjectListSerializer.Meta):
+        fields = ProjectListSerializer.Meta.fields + ('username',)
+        read_only_fields = fields
+
+
+class SharedProjectSerializer(ProjectTemplateSerializer):
+    """A project someone shared with you: its summary and its owner."""
+
+
+class ProjectCollaboratorSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
-    profile_picture = serializers.ImageField(source='user.profile_picture', read_only=True)
+
+    class Meta:
+        model = ProjectCollaborator
+        fields = ('username', 'added_at')
+        read_only_fields = fields
+
+
+class UserCardSerializer(serializers.ModelSerializer):
+    """The user fields embedded in every publication card."""
+    profile_picture_srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ('username', 'profile_picture', 'profile_picture_srcset')
+        read_only_fields = fields
+
+    def get_profile_picture_srcset(self, obj):
+        return srcset_map(obj.profile_picture_derivatives, obj.profile_picture)
+
+
+class CachedPublicationListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of publications from the fragment cache: publication and user cards
+    are fetched in one get_many and only the misses are rendered. Expects select_related('user').
+    """
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        users = {item.user_id: item.user for item in items}
+        entries = [
+            (fragment_key(item), lambda item=item: self.child.publication_fields(item))
+            for item in items
+        ] + [
+            (fragment_key(user), lambda user=user: UserCardSerializer(user, context=self.context).data)
+            for user in users.values()
+        ]
+        fragments = cached_fragments(entries)
+        user_cards = dict(zip(users, fragments[len(items):]))
+        return [
+            {**card, 'play_count': item.play_count, **user_cards[item.user_id]}
+            for item, card in zip(items, fragments)
+        ]
+
+
+class PublicationSerializer(serializers.ModelSerializer):
+    cover_image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Publication
         fields = (
-            'id', 'title', 'description', 'audio_file', 'cover_image',
+            'id', 'title', 'description', 'audio_file', 'preview_audio', 'stream_audio',
+            'cover_image', 'cover_image_srcset',
             'is_public', 'play_count', 'published_at',
-            'project', 'username', 'profile_picture',
-        )
-        read_only_fields = ('id', 'play_count', 'published_at', 'username', 'profile_picture')
+            'project',
+        ) + AUDIO_ANALYSIS_FIELDS
+        read_only_fields = (
+            'id', 'preview_audio', 'stream_audio', 'play_count', 'published_at',
+        ) + AUDIO_ANALYSIS_FIELDS
+        list_serializer_class = CachedPublicationListSerializer
+
+    def get_cover_image_srcset(self, obj):
+        return srcset_map(obj.cover_image_derivatives, obj.cover_image)
+
+    def publication_fields(self, instance):
+        return super().to_representation(instance)
+
+    def to_representation(self, instance):
+        # username, profile_picture and profile_picture_srcset come from the user card
+        data = self.publication_fields(instance)
+        data.update(UserCardSerializer(instance.user, context=self.context).data)
+        return data
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
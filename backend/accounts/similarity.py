@@ -0,0 +1,303 @@
+"""
+Approximate nearest-neighbour index over publication audio embeddings ("similar songs").
+
+IVF layout: k-means centroids split the vectors into lists and a query only scores the
+SIMILARITY_NPROBE lists closest to it. Vectors are standardized with the corpus mean and
+scale, L2-normalized (so a dot product is cosine similarity) and kept in memory-mapped
+files under SIMILARITY_INDEX_DIR, so every worker shares the same pages:
+
+  CURRENT               name of the live generation directory
+  gen-<n>/meta.json     dim, count, capacity, generation, trained_count
+  gen-<n>/centroids.npy float32[nlist, dim]; mean.npy, scale.npy  float32[dim]
+  gen-<n>/vectors       float32[capacity, dim]
+  gen-<n>/ids           int64[capacity]   publication pk, -1 for removed rows
+  gen-<n>/lists         int32[capacity]   list of each row
+
+Adds and removals update the live generation in place under an exclusive flock, and
+readers notice them through its meta.json, which is always replaced atomically. Growing
+the capacity or rebuilding writes a complete new generation directory and only then
+swaps CURRENT with os.replace, so a reader never pairs one build's centroids with
+another's vectors. The previous generation is kept until the next one is published,
+for readers that are still opening it. Centroids and scaling come from the last build,
+so run `manage.py build_similarity_index` again once the catalogue has grown a lot.
+"""
+import fcntl
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from .audio_analysis import EMBEDDING_DIM
+
+POINTER = 'CURRENT'
+INITIAL_CAPACITY = 1024
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50_000
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def train_centroids(vectors, nlist, seed=0):
+    """Spherical k-means on (a sample of) normalized vectors."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > KMEANS_SAMPLE:
+        vectors = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]  # keep the old centroid for empty lists
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+class SimilarityIndex:
+    def __init__(self, path, dim=EMBEDDING_DIM, nprobe=None):
+        self.path = str(path)
+        self.dim = dim
+        self.nprobe = settings.SIMILARITY_NPROBE if nprobe is None else nprobe
+        self._state = None
+        self._stamp = None
+        self._reload_lock = threading.Lock()
+
+    def _file(self, name, generation=None):
+        if generation is None:
+            return os.path.join(self.path, name)
+        return os.path.join(self.path, f'gen-{generation}', name)
+
+    # ─── Reading ───
+
+    def _current(self):
+        """The live generation, or None before the first write."""
+        try:
+            with open(self._file(POINTER)) as f:
+                return int(f.read())
+        except FileNotFoundError:
+            return None
+
+    def _read_meta(self, generation):
+        with open(self._file('meta.json', generation)) as f:
+            return json.load(f)
+
+    def _open(self, meta, mode):
+        generation, capacity = meta['generation'], meta['capacity']
+        return {
+            'meta': meta,
+            'centroids': np.load(self._file('centroids.npy', generation)),
+            'mean': np.load(self._file('mean.npy', generation)),
+            'scale': np.load(self._file('scale.npy', generation)),
+            'vectors': np.memmap(self._file('vectors', generation), dtype=np.float32, mode=mode, shape=(capacity, self.dim)),
+            'ids': np.memmap(self._file('ids', generation), dtype=np.int64, mode=mode, shape=(capacity,)),
+            'lists': np.memmap(self._file('lists', generation), dtype=np.int32, mode=mode, shape=(capacity,)),
+        }
+
+    def state(self):
+        """Read-only mapping of the live generation, reopened when CURRENT or its meta.json changes; None if empty."""
+        generation = self._current()
+        if generation is None:
+            return None
+        stat = os.stat(self._file('meta.json', generation))
+        stamp = (generation, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with self._reload_lock:
+                if stamp != self._stamp:
+                    self._state = self._reader_state(self._open(self._read_meta(generation), 'r'))
+                    self._stamp = stamp
+        return self._state
+
+    def _reader_state(self, state):
+        # Plain ndarray views skip np.memmap's per-slice overhead; rows sorted by list give
+        # each list a contiguous run of row numbers (rebuilt whenever meta.json changes)
+        count = state['meta']['count']
+        for name in ('vectors', 'ids', 'lists'):
+            state[name] = state[name][:count].view(np.ndarray)
+        state['order'] = np.argsort(state['lists'], kind='stable')
+        state['offsets'] = np.concatenate([[0], np.cumsum(np.bincount(state['lists'], minlength=len(state['centroids'])))])
+        return state
+
+    def prepare(self, embedding, state):
+        vector = np.frombuffer(embedding, dtype=np.float32) if isinstance(embedding, bytes) else embedding
+        return _normalize((vector - state['mean']) / state['scale']).astype(np.float32)
+
+    def __len__(self):
+        state = self.state()
+        return 0 if state is None else int((state['ids'] >= 0).sum())
+
+    def __contains__(self, pk):
+        state = self.state()
+        return state is not None and bool((state['ids'] == pk).any())
+
+    def search(self, query, k=10, exclude=()):
+        """[(pk, cosine similarity)] of the k nearest stored vectors to a prepared query vector."""
+        state = self.state()
+        if state is None:
+            return []
+        ids, order, offsets = state['ids'], state['order'], state['offsets']
+        probes = np.argsort(state['centroids'] @ query)[::-1][:self.nprobe]
+        rows = np.concatenate([order[offsets[probe]:offsets[probe + 1]] for probe in probes])
+        rows = rows[ids[rows] >= 0]
+        if exclude:
+            rows = rows[~np.isin(ids[rows], list(exclude))]
+        if not len(rows):
+            return []
+        scores = state['vectors'][rows] @ query
+        top = np.argpartition(-scores, min(k, len(rows)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[rows[i]]), float(scores[i])) for i in top]
+
+    def similar_to(self, pk, k=10):
+        """Nearest neighbours of an indexed publication, excluding itself; [] if it isn't indexed."""
+        state = self.state()
+        if state is None:
+            return []
+        rows = np.flatnonzero(state['ids'] == pk)
+        if not len(rows):
+            return []
+        return self.search(state['vectors'][rows[0]], k, exclude=(pk,))
+
+    # ─── Writing ───
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file('lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_meta(self, meta):
+        temp_path = self._file('meta.json.tmp', meta['generation'])
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self._file('meta.json', meta['generation']))
+
+    def _create_generation(self, meta, centroids, mean, scale):
+        """Write a complete, unpublished generation directory and open it for writing."""
+        directory = os.path.dirname(self._file('meta.json', meta['generation']))
+        shutil.rmtree(directory, ignore_errors=True)  # left over from an interrupted build
+        os.makedirs(directory)
+        for name, array in (('centroids', centroids), ('mean', mean), ('scale', scale)):
+            np.save(os.path.join(directory, f'{name}.npy'), np.asarray(array, dtype=np.float32))
+        capacity = meta['capacity']
+        for name, dtype, shape in (('vectors', np.float32, (capacity, self.dim)),
+                                   ('ids', np.int64, (capacity,)), ('lists', np.int32, (capacity,))):
+            mapped = np.memmap(os.path.join(directory, name), dtype=dtype, mode='w+', shape=shape)
+            if name == 'ids':
+                mapped[:] = -1
+            mapped.flush()
+        self._write_meta(meta)
+        return self._open(meta, 'r+')
+
+    def _publish(self, generation):
+        """Make a generation live, then drop the ones before the previous (still being opened by slow readers)."""
+        temp_path = self._file(f'{POINTER}.tmp')
+        with open(temp_path, 'w') as f:
+            f.write(str(generation))
+        os.replace(temp_path, self._file(POINTER))
+        for name in os.listdir(self.path):
+            if name.startswith('gen-') and name[4:].isdigit() and int(name[4:]) < generation - 1:
+                # Workers still mapping the old files keep them alive until they reopen
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _writable_state(self):
+        generation = self._current()
+        if generation is None:
+            # First vector before any build: one list, no scaling
+            meta = {'dim': self.dim, 'count': 0, 'capacity': INITIAL_CAPACITY, 'generation': 1, 'trained_count': 0}
+            state = self._create_generation(meta, np.zeros((1, self.dim)), np.zeros(self.dim), np.ones(self.dim))
+            self._publish(1)
+            return state
+        return self._open(self._read_meta(generation), 'r+')
+
+    def add(self, pk, embedding):
+        """Insert or replace one publication's vector."""
+        with self._locked():
+            state = self._writable_state()
+            meta = state['meta']
+            vector = self.prepare(embedding, state)
+            existing = np.flatnonzero(state['ids'][:meta['count']] == pk)
+            if len(existing):
+                row = int(existing[0])
+            else:
+                if meta['count'] == meta['capacity']:
+                    state = self._grow(state)
+                    meta = state['meta']
+                row = meta['count']
+                meta['count'] += 1
+            state['vectors'][row] = vector
+            state['lists'][row] = int(np.argmax(state['centroids'] @ vector))
+            state['ids'][row] = pk
+            for name in ('vectors', 'lists', 'ids'):
+                state[name].flush()
+            self._write_meta(meta)
+
+    def remove(self, pk):
+        with self._locked():
+            generation = self._current()
+            if generation is None:
+                return
+            state = self._open(self._read_meta(generation), 'r+')
+            rows = np.flatnonzero(state['ids'][:state['meta']['count']] == pk)
+            if len(rows):
+                state['ids'][rows] = -1
+                state['ids'].flush()
+                self._write_meta(state['meta'])
+
+    def _grow(self, state):
+        meta = dict(state['meta'])
+        count = meta['count']
+        meta['generation'] += 1
+        meta['capacity'] *= 2
+        grown = self._create_generation(meta, state['centroids'], state['mean'], state['scale'])
+        for name in ('vectors', 'ids', 'lists'):
+            grown[name][:count] = state[name][:count]
+            grown[name].flush()
+        self._publish(meta['generation'])
+        return grown
+
+    def build(self, ids, embeddings):
+        """Rebuild from scratch: corpus scaling, sqrt(n) k-means lists and a fresh generation."""
+        ids = np.asarray(ids, dtype=np.int64)
+        raw = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dim)
+        mean = raw.mean(axis=0) if len(raw) else np.zeros(self.dim, np.float32)
+        scale = np.maximum(raw.std(axis=0), 1e-6) if len(raw) else np.ones(self.dim, np.float32)
+        vectors = _normalize((raw - mean) / scale).astype(np.float32)
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        centroids = train_centroids(vectors, nlist) if len(vectors) else np.zeros((1, self.dim), np.float32)
+
+        with self._locked():
+            generation = (self._current() or 0) + 1
+            capacity = max(INITIAL_CAPACITY, 1 << int(np.ceil(np.log2(max(len(ids), 1) * 1.25))))
+            meta = {'dim': self.dim, 'count': len(ids), 'capacity': capacity,
+                    'generation': generation, 'trained_count': len(ids)}
+            state = self._create_generation(meta, centroids, mean, scale)
+            state['vectors'][:len(ids)] = vectors
+            state['ids'][:len(ids)] = ids
+            state['lists'][:len(ids)] = np.argmax(vectors @ centroids.T, axis=1) if len(ids) else []
+            for name in ('vectors', 'ids', 'lists'):
+                state[name].flush()
+            self._publish(generation)
+        return nlist
+
+
+index = SimilarityIndex(settings.SIMILARITY_INDEX_DIR)
+
+
+def sync_publication(pk, embedding, is_public, force=False):
+    """Keep one publication's index entry in line with its embedding and visibility."""
+    wanted = bool(embedding) and is_public
+    if wanted and (force or pk not in index):
+        index.add(pk, bytes(embedding))
+    elif not wanted and pk in index:
+        index.remove(pk)
@@ -0,0 +1,16 @@
+// Changelist filters rendered by accounts.admin.UserAutocompleteFilter: picking a value
+// reloads the changelist with it as the filter parameter, starting from the first page.
+'use strict';
+{
+    const $ = django.jQuery;
+    $(document).on('change', 'select[data-filter-parameter]', function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete('p');
+        if (this.value) {
+            params.set(this.dataset.filterParameter, this.value);
+        } else {
+            params.delete(this.dataset.filterParameter);
+        }
+        window.location.search = params.toString();
+    });
+}
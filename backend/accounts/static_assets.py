@@ -0,0 +1,87 @@
+"""
+Static files and the frontend build, served by the backend itself so a single
+container can host the whole site.
+
+collectstatic copies the apps' static files into STATIC_ROOT, and the Vite build
+(FRONTEND_DIST) goes under app/. Then PrecompressedManifestStaticFilesStorage:
+- adds a content hash to every file name (ManifestStaticFilesStorage). {% static %}
+  URLs change whenever a file does, so hashed names are cached for a year;
+- writes .br/.gz siblings of text assets. Compression then happens once per deploy
+  rather than once per response.
+
+Requests go through file_serving.serve_file: conditional GET, Range, the precompressed
+variant the client accepts, and FileResponse, which gunicorn sends with sendfile().
+Anything without a hash in its name is revalidated on every use, including index.html
+and the unhashed originals.
+
+Vite already hashes everything it emits into assets/, so /assets/ is immutable too.
+Any other path outside the API gets index.html for the client-side router.
+"""
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.functional import cached_property
+
+from .file_serving import serve_file, write_precompressed
+
+# Directory of the Vite build inside STATIC_ROOT (see STATICFILES_DIRS)
+APP_PREFIX = 'app'
+
+# Images, audio, video and fonts are compressed already; only text-like types gain
+COMPRESSIBLE_TYPES = {
+    'application/javascript', 'application/json', 'application/manifest+json', 'application/wasm',
+    'application/xml', 'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon',
+}
+
+
+def compressible(name):
+    content_type = mimetypes.guess_type(name)[0] or ''
+    return content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES or name.endswith('.map')
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest-hashed static files with .br/.gz variants written at collectstatic time."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        # Files adjusted in several passes are yielded once per pass; compress each once, at the end
+        collected = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                collected[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name, hashed_name in collected.items():
+            if compressible(name):
+                # The unhashed originals are collected too, and still requested by the Vite build
+                write_precompressed(self.path(name))
+                write_precompressed(self.path(hashed_name))
+
+    @cached_property
+    def immutable_names(self):
+        return set(self.hashed_files.values())
+
+
+def collected_path(path, prefix=''):
+    """Absolute path of a collected file under STATIC_ROOT (and prefix), or None."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, prefix, path)
+    except SuspiciousFileOperation:
+        return None
+    return full_path if os.path.isfile(full_path) else None
+
+
+def is_hashed(path):
+    """Whether path is a manifest-hashed name, whose contents never change."""
+    return path in getattr(staticfiles_storage, 'immutable_names', ())
+
+
+def serve_collected(request, full_path, immutable):
+    if immutable:
+        return serve_file(request, full_path, etag=os.path.basename(full_path))
+    stat = os.stat(full_path)
+    return serve_file(request, full_path, cache_control='no-cache', etag=f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
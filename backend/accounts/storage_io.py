@@ -0,0 +1,93 @@
+"""
+Concurrent storage I/O for saves that touch several files.
+
+Every upload to or delete from Cloudinary is a remote round trip. Done one after
+another, a publish with an audio file, a cover and six cover derivatives waits for
+all of them in turn. These helpers run independent calls on a bounded thread pool,
+so the caller waits roughly as long as the slowest call.
+
+Uploads are all or nothing: if one fails, the files that were stored are deleted
+again before the error is raised. Deletes can't be undone; every one is attempted
+and the first error is raised afterwards.
+
+The calls only talk to storage, never the database, so pool threads need no
+connection handling.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_THREAD_PREFIX = 'storage-io'
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.STORAGE_IO_WORKERS, thread_name_prefix=_THREAD_PREFIX)
+    return _pool
+
+
+def _attempt(call):
+    try:
+        return call(), None
+    except Exception as exc:
+        return None, exc
+
+
+def run_concurrently(calls):
+    """Run zero-argument callables on the storage pool and wait for all; returns (result, exception) pairs in order."""
+    calls = list(calls)
+    # Waiting on the pool from one of its own threads could deadlock it, so nested calls run inline
+    if len(calls) < 2 or settings.STORAGE_IO_WORKERS < 2 or threading.current_thread().name.startswith(_THREAD_PREFIX):
+        return [_attempt(call) for call in calls]
+    return list(_get_pool().map(_attempt, calls))
+
+
+def _raise_first(outcomes):
+    for _, exc in outcomes:
+        if exc is not None:
+            raise exc
+
+
+def _discard(files):
+    """Delete (storage, name) pairs after a failed upload, logging rather than masking the original error."""
+    files = list(files)
+    for (storage, name), (_, exc) in zip(files, run_concurrently(partial(storage.delete, name) for storage, name in files)):
+        if exc is not None:
+            logger.error('Could not remove %s after a failed upload: %s', name, exc)
+
+
+def save_files(files):
+    """Save (storage, name, content) triples concurrently and return the stored names; all or nothing."""
+    files = list(files)
+    outcomes = run_concurrently(partial(storage.save, name, content) for storage, name, content in files)
+    if any(exc is not None for _, exc in outcomes):
+        _discard((storage, stored) for (storage, _, _), (stored, exc) in zip(files, outcomes) if exc is None)
+        _raise_first(outcomes)
+    return [stored for stored, _ in outcomes]
+
+
+def store_field_files(field_files):
+    """
+    Store every uncommitted FieldFile concurrently, as FileField.pre_save would one at a time,
+    so Model.save finds them committed; all or nothing. Returns the (storage, name) pairs stored.
+    """
+    pending = [field_file for field_file in field_files if field_file and not field_file._committed]
+    outcomes = run_concurrently(
+        partial(field_file.save, field_file.name, field_file.file, save=False) for field_file in pending
+    )
+    if any(exc is not None for _, exc in outcomes):
+        _discard((field_file.storage, field_file.name) for field_file, (_, exc) in zip(pending, outcomes) if exc is None)
+        _raise_first(outcomes)
+    return [(field_file.storage, field_file.name) for field_file in pending]
+
+
+def delete_files(files):
+    """Delete (storage, name) pairs concurrently; all are attempted, then the first error is raised."""
+    _raise_first(run_concurrently(partial(storage.delete, name) for storage, name in files))
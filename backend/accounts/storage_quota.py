@@ -0,0 +1,65 @@
+"""
+Per-user storage quotas, from the StorageUsage ledger.
+
+Every upload's size is recorded on its row (audio_file_size, profile_picture_size,
+header_image_size) when it's stored, and so is the size of each playback rendition
+(preview_audio_size, stream_audio_size). The owner's StorageUsage.bytes_used moves by the
+difference in one atomic UPDATE, whenever a file is written, replaced or deleted (see
+the "Storage ledger" signals in accounts/models.py). Usage is never computed by asking
+Cloudinary or summing files at request time. jobs.reconcile_storage_usage rebuilds
+the ledger from the size columns in bulk.
+
+Uploads are checked twice:
+- StorageQuotaMixin refuses a request whose Content-Length can't fit, before the
+  body is read.
+- At save time the reservation itself is conditional (bytes_used + size <= quota in
+  the UPDATE's WHERE), so concurrent uploads can't overshoot together.
+
+Both answer 413.
+"""
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import StorageQuotaExceeded, StorageUsage
+
+# Multipart boundaries, part headers and the other form fields of an upload request
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class StorageQuotaError(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Storage quota exceeded.'
+    default_code = 'storage_quota_exceeded'
+
+
+def storage_usage(user_id):
+    """(bytes used, quota in bytes) for one user."""
+    usage = StorageUsage.objects.filter(user_id=user_id).values_list('bytes_used', 'quota').first()
+    used, quota = usage or (0, None)
+    return used, settings.STORAGE_QUOTA_BYTES if quota is None else quota
+
+
+class StorageQuotaMixin:
+    """For upload views: refuse bodies that can't fit in the user's quota before reading them."""
+    quota_methods = ('POST', 'PUT', 'PATCH')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Runs after authentication; request.data (and so the body) hasn't been touched yet
+        if request.method not in self.quota_methods or not request.user.is_authenticated:
+            return
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return
+        used, quota = storage_usage(request.user.pk)
+        if length - MULTIPART_OVERHEAD > quota - used:
+            raise StorageQuotaError(
+                f'Storage quota exceeded: {used / (1024 * 1024):.1f} of {quota / (1024 * 1024):.0f} MB used.'
+            )
+
+    def handle_exception(self, exc):
+        if isinstance(exc, StorageQuotaExceeded):
+            exc = StorageQuotaError(str(exc))
+        return super().handle_exception(exc)
@@ -1,3 +1,1315 @@
-from django.test import TestCase
+import copy
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connections, transaction
+from django.db.models.signals import pre_save
+from django.http import Http404
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from sonara_backend import db_router
+
+from . import fingerprints, jobs, similarity, storage_io, timelines
+from .audio_analysis import ANALYSIS_SAMPLE_RATE, FINGERPRINT_HOP, analyze_audio, decode_audio, landmark_hashes
+from .autosave import WriteBehindBuffer, apply_data_diff, buffer as autosave_buffer, diff_project_data
+from .background import run_on_spooled_file
+from .checks import ffmpeg_installed
+from .collab import CollabHub, Connection, StaleProject, _authorize as collab_authorize
+from .file_serving import write_precompressed
+from .hyperloglog import REGISTERS, STANDARD_ERROR, HyperLogLog
+from .models import (
+    AudioFingerprint, AudioMatch, Follow, ListenerSketch, PendingAutosave, Project, ProjectCollaborator, Publication,
+    StorageQuotaExceeded, StorageUsage, TimelineEntry, TimelineJob, Track,
+)
+from .project_codec import (
+    NOTES_FORMAT, PEAKS_FORMAT, decode_notes, decode_peaks, decode_project_data, encode_notes, encode_project_data,
+)
+from .project_copy import duplicate_project
+from .sync import decode_token, encode_token
+from .throttling import DatabaseStore, ThrottleCache
+
+User = get_user_model()
+
+
+def sketch_of(keys):
+    sketch = HyperLogLog()
+    for key in keys:
+        sketch.add(key)
+    return sketch
+
+
+# ═══════════════════════════════════════════
+# HyperLogLog listener sketches
+# ═══════════════════════════════════════════
+
+class HyperLogLogTests(SimpleTestCase):
+    def assertWithinError(self, estimate, actual, sigmas=2):
+        self.assertLessEqual(abs(estimate - actual), sigmas * STANDARD_ERROR * actual,
+                             f'estimated {estimate} for {actual} distinct keys')
+
+    def test_relative_error_across_cardinalities(self):
+        for cardinality in (1_000, 10_000, 100_000):
+            with self.subTest(cardinality=cardinality):
+                self.assertWithinError(sketch_of(f'user:{i}' for i in range(cardinality)).count(), cardinality)
+
+    def test_small_cardinalities(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+        for cardinality in (1, 2, 5, 10, 50, 200):
+            with self.subTest(cardinality=cardinality):
+                estimate = sketch_of(f'anon:{i}' for i in range(cardinality)).count()
+                self.assertLessEqual(abs(estimate - cardinality), max(1, 2 * STANDARD_ERROR * cardinality))
+
+    def test_repeated_keys_count_once(self):
+        sketch = sketch_of(f'user:{i % 100}' for i in range(10_000))
+        self.assertWithinError(sketch.count(), 100)
+        self.assertFalse(sketch.add('user:7'))
+        self.assertFalse(sketch.would_change('user:7'))
+
+    def test_merge_is_the_sketch_of_the_union(self):
+        first = sketch_of(f'user:{i}' for i in range(0, 6_000))
+        second = sketch_of(f'user:{i}' for i in range(4_000, 10_000))
+        union = sketch_of(f'user:{i}' for i in range(10_000))
+        self.assertEqual(HyperLogLog.union([first, second]).registers, union.registers)
+        self.assertEqual(first.merge(second).registers, union.registers)
+        self.assertWithinError(first.count(), 10_000)
+
+    def test_serialized_registers_round_trip(self):
+        sketch = sketch_of(f'user:{i}' for i in range(5_000))
+        data = sketch.to_bytes()
+        self.assertEqual(len(data), REGISTERS)
+        restored = HyperLogLog(data)
+        self.assertEqual(restored.registers, sketch.registers)
+        self.assertEqual(restored.count(), sketch.count())
+        # Stored rows come back from some databases as a memoryview
+        self.assertEqual(HyperLogLog(memoryview(data)).count(), sketch.count())
+
+    def test_rejects_sketches_of_another_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(bytes(REGISTERS // 2))
+
+
+class ListenerSketchStorageTests(TestCase):
+    def test_stored_sketch_round_trip(self):
+        user = User.objects.create(username='listener-owner')
+        publication = Publication.objects.create(user=user, title='Song')
+        sketch = sketch_of(f'user:{i}' for i in range(3_000))
+        ListenerSketch.objects.create(publication=publication, day=None, sketch=sketch.to_bytes())
+        stored = ListenerSketch.objects.get(publication=publication, day=None).sketch
+        self.assertEqual(HyperLogLog(stored).count(), sketch.count())
+
+
+# ═══════════════════════════════════════════
+# Columnar project encoding
+# ═══════════════════════════════════════════
+
+def project_data(notes, peaks=None):
+    clip = {'id': 'clip-1', 'startBeat': 0, 'duration': 16, 'notes': notes}
+    if peaks is not None:
+        clip['waveformPeaks'] = peaks
+    return {'bpm': 120, 'tracks': [{'id': 'track-1', 'clips': [clip]}, {'id': 'track-2'}]}
+
+
+class ProjectCodecTests(SimpleTestCase):
+    def encoded_clip(self, data):
+        return encode_project_data(data)['tracks'][0]['clips'][0]
+
+    def test_notes_round_trip_exactly(self):
+        notes = [
+            {'id': 1, 'pitch': 60, 'startBeat': 0, 'duration': 1, 'velocity': 100},
+            {'id': 2, 'pitch': 64, 'startBeat': 0.5, 'duration': 0.25, 'velocity': 0.8},
+            {'id': 2 ** 40, 'pitch': 67.5, 'startBeat': 1 / 3, 'duration': 0.1, 'velocity': 127},
+        ]
+        data = project_data(notes)
+        clip = self.encoded_clip(data)
+        self.assertEqual(clip['notes']['format'], NOTES_FORMAT)
+        self.assertEqual(clip['notes']['count'], 3)
+        self.assertEqual(decode_project_data(encode_project_data(data)), data)
+
+    def test_whole_numbers_decode_as_integers(self):
+        data = project_data([{'id': 1, 'pitch': 60.0, 'startBeat': 2.0, 'duration': 1.0, 'velocity': 90.0}])
+        note = decode_project_data(encode_project_data(data))['tracks'][0]['clips'][0]['notes'][0]
+        self.assertEqual(note, {'id': 1, 'pitch': 60, 'startBeat': 2, 'duration': 1, 'velocity': 90})
+        self.assertTrue(all(isinstance(value, int) for value in note.values()))
+
+    def test_notes_it_cannot_pack_are_left_alone(self):
+        for notes in (
+            [{'id': 1, 'pitch': 60, 'startBeat': 0, 'duration': 1, 'velocity': 100, 'muted': True}],
+            [{'id': 1, 'pitch': 60, 'startBeat': 0, 'duration': 1, 'velocity': True}],
+            [{'id': 'a', 'pitch': 60, 'startBeat': 0, 'duration': 1, 'velocity': 100}],
+            [],
+        ):
+            with self.subTest(notes=notes):
+                self.assertEqual(self.encoded_clip(project_data(notes))['notes'], notes)
+
+    def test_peaks_are_quantized_to_a_byte(self):
+        peaks = [0, 0.1234, 0.5, 0.999, 1]
+        data = project_data([], peaks)
+        self.assertEqual(self.encoded_clip(data)['waveformPeaks']['format'], PEAKS_FORMAT)
+        decoded = decode_project_data(encode_project_data(data))['tracks'][0]['clips'][0]['waveformPeaks']
+        self.assertEqual(len(decoded), len(peaks))
+        for before, after in zip(peaks, decoded):
+            self.assertAlmostEqual(before, after, delta=1 / 510 + 1e-4)
+
+    def test_malformed_columns_are_rejected(self):
+        encoded = self.encoded_clip(project_data(
+            [{'id': i, 'pitch': 60, 'startBeat': i, 'duration': 1, 'velocity': 100} for i in range(3)]
+        ))['notes']
+        short = copy.deepcopy(encoded)
+        short['columns']['pitch'][1] = encode_notes([{'id': 1, 'pitch': 60, 'startBeat': 0, 'duration': 1,
+                                                      'velocity': 100}])['columns']['pitch'][1]
+        for notes in (
+            {'format': NOTES_FORMAT, 'columns': {}},
+            {**encoded, 'count': 4},
+            {**encoded, 'count': True},
+            short,
+            {**encoded, 'columns': {**encoded['columns'], 'pitch': ['i8', encoded['columns']['pitch'][1]]}},
+            {**encoded, 'columns': {**encoded['columns'], 'pitch': ['u1', '!!not base64']}},
+            {**encoded, 'columns': {**encoded['columns'], 'id': ['u4', 'AAA=']}},
+            {**encoded, 'columns': {**encoded['columns'], 'extra': ['u1', '']}},
+        ):
+            with self.subTest(notes=notes):
+                with self.assertRaises(ValueError):
+                    decode_notes(notes)
+        for data in (None, 7, '%%'):
+            peaks = {'format': PEAKS_FORMAT} if data is None else {'format': PEAKS_FORMAT, 'data': data}
+            with self.subTest(peaks=peaks):
+                with self.assertRaises(ValueError):
+                    decode_peaks(peaks)
+
+    def test_canonical_data_decodes_to_itself(self):
+        data = project_data([{'id': 1, 'pitch': 60, 'startBeat': 0, 'duration': 1, 'velocity': 100}], [0.5])
+        self.assertEqual(decode_project_data(data), data)
+        self.assertEqual(decode_project_data('not a project'), 'not a project')
+
+
+class ProjectColumnarApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='codec-owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.notes = [{'id': i, 'pitch': 60 + i, 'startBeat': i / 2, 'duration': 0.5, 'velocity': 100} for i in range(8)]
+        self.project = Project.objects.create(user=self.user, name='Beat', data=project_data(self.notes))
+
+    def test_get_columnar(self):
+        response = self.client.get(f'/api/auth/projects/{self.project.pk}/?encoding=columnar')
+        self.assertEqual(response.status_code, 200)
+        notes = response.json()['data']['tracks'][0]['clips'][0]['notes']
+        self.assertEqual(notes['format'], NOTES_FORMAT)
+        self.assertEqual(decode_project_data(response.json()['data']), self.project.data)
+
+        plain = self.client.get(f'/api/auth/projects/{self.project.pk}/')
+        self.assertEqual(plain.json()['data'], self.project.data)
+
+    def test_malformed_columnar_saves_are_400(self):
+        for notes in ({'format': NOTES_FORMAT, 'columns': {}}, {'format': NOTES_FORMAT, 'count': 1, 'columns': None}):
+            with self.subTest(notes=notes):
+                response = self.client.patch(
+                    f'/api/auth/projects/{self.project.pk}/', {'data': project_data(notes)}, format='json',
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('data', response.json())
+        response = self.client.patch(
+            f'/api/auth/projects/{self.project.pk}/', {'data': project_data([], {'format': PEAKS_FORMAT})}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.data, project_data(self.notes))
+
+    def test_columnar_saves_are_stored_canonical(self):
+        changed = project_data(self.notes[:3])
+        response = self.client.patch(
+            f'/api/auth/projects/{self.project.pk}/', {'data': encode_project_data(changed)}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.data, changed)
+        self.assertEqual(self.project.note_count, 3)
+
+
+# ═══════════════════════════════════════════
+# Shared rate limits (GCRA)
+# ═══════════════════════════════════════════
+
+class FrozenClockMixin:
+    """Pins throttling's clock to self.now, which tests move forward by hand."""
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1_000_000.0
+        patcher = mock.patch('accounts.throttling.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class GcraTests(FrozenClockMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = DatabaseStore()
+
+    def test_allows_a_burst_of_rate_then_denies(self):
+        for _ in range(3):
+            self.assertEqual(self.store.gcra('ip:1', 3, 60), (True, 0.0))
+        allowed, retry_after = self.store.gcra('ip:1', 3, 60)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 20)
+
+    def test_one_more_request_per_interval(self):
+        for _ in range(3):
+            self.store.gcra('ip:1', 3, 60)
+        self.now += 19
+        self.assertFalse(self.store.gcra('ip:1', 3, 60)[0])
+        self.now += 1
+        self.assertTrue(self.store.gcra('ip:1', 3, 60)[0])
+        self.assertFalse(self.store.gcra('ip:1', 3, 60)[0])
+
+    def test_denied_requests_use_no_capacity(self):
+        for _ in range(10):
+            self.store.gcra('ip:1', 3, 60)
+        self.now += 20
+        self.assertTrue(self.store.gcra('ip:1', 3, 60)[0])
+
+    def test_idle_keys_get_their_burst_back(self):
+        for _ in range(3):
+            self.store.gcra('ip:1', 3, 60)
+        self.now += 3600
+        for _ in range(3):
+            self.assertTrue(self.store.gcra('ip:1', 3, 60)[0])
+        self.assertFalse(self.store.gcra('ip:1', 3, 60)[0])
+
+    def test_keys_are_independent(self):
+        for _ in range(3):
+            self.store.gcra('ip:1', 3, 60)
+        self.assertFalse(self.store.gcra('ip:1', 3, 60)[0])
+        self.assertTrue(self.store.gcra('ip:2', 3, 60)[0])
+
+
+class PlayCountThrottleTests(FrozenClockMixin, TestCase):
+    def test_anonymous_plays_are_limited(self):
+        user = User.objects.create(username='throttled-artist')
+        publication = Publication.objects.create(user=user, title='Song', is_public=True)
+        client = APIClient()
+        url = f'/api/auth/publications/{publication.pk}/play/'
+        for _ in range(30):  # play_count: 30/min
+            self.assertEqual(client.post(url).status_code, 200)
+        response = client.post(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.now += 2
+        self.assertEqual(client.post(url).status_code, 200)
+
+
+class ThrottleCacheTests(FrozenClockMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ThrottleCache('', {})
+
+    def test_add_only_sets_missing_or_expired_keys(self):
+        self.assertTrue(self.cache.add('window', 1, 60))
+        self.assertFalse(self.cache.add('window', 5, 60))
+        self.assertEqual(self.cache.get('window'), 1)
+        self.now += 61
+        self.assertIsNone(self.cache.get('window'))
+        self.assertTrue(self.cache.add('window', 5, 60))
+        self.assertEqual(self.cache.get('window'), 5)
+
+    def test_incr(self):
+        self.cache.set('window', 1, 60)
+        self.assertEqual(self.cache.incr('window'), 2)
+        self.assertEqual(self.cache.incr('window', 3), 5)
+        self.now += 61
+        with self.assertRaises(ValueError):
+            self.cache.incr('window')
+
+
+# ═══════════════════════════════════════════
+# Read replicas
+# ═══════════════════════════════════════════
+
+class ReplicaRoutingTests(TestCase):
+    """A second SQLite file stands in for the replica. It is migrated but never written to, so
+    it plays a replica that hasn't caught up: anything read from it comes back empty."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Added here rather than in the class body, since the runner checks declared databases
+        # against settings before any test class is set up
+        cls.databases = {'default', 'replica_1'}
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        settings.DATABASES['replica_1'] = {
+            **connections.settings['default'],
+            'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+        }
+        call_command('migrate', database='replica_1', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica_1'].close()
+        del connections['replica_1']
+        del settings.DATABASES['replica_1']
+        db_router._replica_health.clear()
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        db_router._replica_health.clear()
+        self.user = User.objects.create(username='replica-reader')
+        self.artist = User.objects.create(username='replica-artist')
+        Project.objects.create(user=self.artist, name='Starter', data={}, is_template=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        with db_router.replica_reads():
+            self.assertEqual(Project.objects.all().db, 'replica_1')
+            self.assertFalse(Project.objects.exists())
+            project = Project.objects.create(user=self.user, name='Draft', data={})
+        self.assertEqual(project._state.db, 'default')
+        self.assertEqual(Project.objects.using('replica_1').count(), 0)
+        self.assertEqual(Project.objects.count(), 2)
+
+    def test_lagging_replica_is_skipped(self):
+        with mock.patch.object(db_router, 'replica_lag', return_value=settings.REPLICA_MAX_LAG_SECONDS + 1):
+            with db_router.replica_reads():
+                self.assertEqual(Project.objects.all().db, 'default')
+
+    def test_reads_stay_on_the_primary_after_a_write(self):
+        self.assertEqual(self.client.get('/api/auth/projects/templates/').json(), [])
+        self.assertEqual(self.client.post('/api/auth/users/replica-artist/follow/').status_code, 201)
+        templates = self.client.get('/api/auth/projects/templates/').json()
+        self.assertEqual([row['name'] for row in templates], ['Starter'])
+        # Anonymous clients have no write of their own to read back
+        self.assertEqual(APIClient().get('/api/auth/projects/templates/').json(), [])
+
+    def test_no_stickiness_lookups_without_replicas(self):
+        request = mock.Mock(user=self.user)
+        with mock.patch.object(db_router, 'replica_aliases', return_value=[]), \
+                mock.patch.object(db_router, 'caches') as caches:
+            self.assertFalse(db_router.has_recent_write(request))
+        caches.__getitem__.assert_not_called()
+
+
+# ═══════════════════════════════════════════
+# Fragment cache
+# ═══════════════════════════════════════════
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches['fragments'].clear()
+        self.user = User.objects.create(username='card-artist')
+        self.project = Project.objects.create(user=self.user, name='Session', data={})
+        self.publication = Publication.objects.create(
+            user=self.user, project=self.project, title='Song', is_public=True,
+        )
+
+    def feed(self):
+        return APIClient().get('/api/auth/feed/').json()
+
+    def test_cache_is_bounded(self):
+        self.assertEqual(caches['fragments']._max_entries, settings.FRAGMENT_CACHE_MAX_ENTRIES)
+
+    def test_deleting_the_project_refreshes_the_card(self):
+        self.assertEqual(self.feed()[0]['project'], self.project.pk)
+        self.project.delete()
+        self.assertIsNone(self.feed()[0]['project'])
+
+
+# ═══════════════════════════════════════════
+# Home timelines
+# ═══════════════════════════════════════════
+
+class TimelineJobTests(TestCase):
+    def setUp(self):
+        caches['fragments'].clear()  # cards of rolled-back rows from other tests reuse these pks
+        self.artist = User.objects.create(username='timeline-artist')
+        self.fan = User.objects.create(username='timeline-fan')
+        self.client = APIClient()
+        self.client.force_authenticate(self.fan)
+
+    def home_feed(self):
+        return [row['title'] for row in self.client.get('/api/auth/feed/home/').json()['results']]
+
+    def test_follow_backfills_and_publish_fans_out(self):
+        Publication.objects.create(user=self.artist, title='Before')
+        Follow.objects.create(follower=self.fan, followed=self.artist)
+        Publication.objects.create(user=self.artist, title='After')
+        self.assertEqual(self.home_feed(), [])  # nothing runs until the worker does
+        self.assertEqual(timelines.run_due_jobs(), (3, 0))
+        self.assertEqual(self.home_feed(), ['After', 'Before'])
+        self.assertFalse(TimelineJob.objects.exists())
+
+    def test_unfollow_before_the_backfill_runs(self):
+        Publication.objects.create(user=self.artist, title='Song')
+        timelines.run_due_jobs()
+        Follow.objects.create(follower=self.fan, followed=self.artist)
+        Follow.objects.filter(follower=self.fan).delete()
+        # The backfill runs first and finds the follow gone, rather than writing rows for a moment
+        self.assertEqual(timelines.run_due_jobs(batch_size=1), (1, 0))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(timelines.run_due_jobs(), (1, 0))
+        self.assertFalse(TimelineJob.objects.exists())
+
+    @override_settings(TIMELINE_JOB_MAX_ATTEMPTS=3, TIMELINE_JOB_RETRY_BASE_SECONDS=30)
+    def test_failures_back_off_then_give_up(self):
+        Follow.objects.create(follower=self.fan, followed=self.artist)
+        job = TimelineJob.objects.get()
+        broken = mock.Mock(side_effect=RuntimeError('database went away'))
+        with mock.patch.dict(timelines.JOBS, {TimelineJob.KIND_FOLLOW: broken}), \
+                self.assertLogs('accounts.timelines', 'ERROR'):
+            for attempt, delay in ((1, 30), (2, 60)):
+                started = timezone.now()
+                self.assertEqual(timelines.run_due_jobs(), (0, 1))
+                job.refresh_from_db()
+                self.assertEqual((job.attempts, job.status), (attempt, TimelineJob.STATUS_PENDING))
+                self.assertGreaterEqual(job.next_attempt_at, started + timedelta(seconds=delay))
+                self.assertEqual(timelines.run_due_jobs(), (0, 0))  # not due yet
+                TimelineJob.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(timelines.run_due_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.status, job.last_error), (3, TimelineJob.STATUS_FAILED, 'database went away'))
+        self.assertEqual(timelines.run_due_jobs(), (0, 0))
+
+
+# ═══════════════════════════════════════════
+# Incremental library sync
+# ═══════════════════════════════════════════
+
+@override_settings(SYNC_OVERLAP=0)
+class LibrarySyncTests(TestCase):
+    url = '/api/auth/sync/'
+
+    def setUp(self):
+        self.user = User.objects.create(username='sync-owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.kept = Project.objects.create(user=self.user, name='Kept', data={})
+        self.changed = Project.objects.create(user=self.user, name='Changed', data={})
+        self.removed = Project.objects.create(user=self.user, name='Removed', data={})
+        self.publication = Publication.objects.create(user=self.user, title='Song')
+        # Everything so far predates the token
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Project.objects.update(updated_at=an_hour_ago)
+        Publication.objects.update(modified_at=an_hour_ago)
+        self.token = encode_token(self.user.pk, an_hour_ago + timedelta(minutes=30))
+
+    def ids(self, rows):
+        return {row['id'] for row in rows}
+
+    def test_without_a_token_everything_is_sent(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body['reset'])
+        self.assertEqual(self.ids(body['projects']), {self.kept.pk, self.changed.pk, self.removed.pk})
+        self.assertEqual(self.ids(body['publications']), {self.publication.pk})
+        self.assertEqual(body['deleted'], {'projects': [], 'tracks': [], 'publications': []})
+        self.assertIsNotNone(decode_token(body['token'], self.user.pk))
+
+    def test_only_changes_since_the_token(self):
+        self.changed.name = 'Renamed'
+        self.changed.save()
+        removed_pk = self.removed.pk
+        self.removed.delete()
+
+        body = self.client.get(self.url, {'since': self.token}).json()
+        self.assertFalse(body['reset'])
+        self.assertEqual(self.ids(body['projects']), {self.changed.pk})
+        self.assertEqual(body['projects'][0]['name'], 'Renamed')
+        self.assertEqual(body['publications'], [])
+        self.assertEqual(body['deleted']['projects'], [removed_pk])
+        self.assertEqual(body['deleted']['publications'], [])
+
+        # The returned token starts the next window
+        again = self.client.get(self.url, {'since': body['token']}).json()
+        self.assertEqual((again['projects'], again['deleted']['projects']), ([], []))
+
+    def test_other_users_tombstones_are_not_sent(self):
+        other = User.objects.create(username='sync-other')
+        Project.objects.create(user=other, name='Theirs', data={}).delete()
+        body = self.client.get(self.url, {'since': self.token}).json()
+        self.assertEqual(body['projects'], [])
+        self.assertEqual(body['deleted']['projects'], [])
+
+    def test_stale_or_foreign_tokens_reset(self):
+        for token in (
+            encode_token(self.user.pk + 1, timezone.now()),
+            encode_token(self.user.pk, timezone.now() - timedelta(days=365)),
+        ):
+            with self.subTest(token=token):
+                body = self.client.get(self.url, {'since': token}).json()
+                self.assertTrue(body['reset'])
+                self.assertEqual(len(body['projects']), 3)
+
+    def test_malformed_token(self):
+        for token in ('garbage', '1.2.3', 'x.y'):
+            with self.subTest(token=token):
+                self.assertEqual(self.client.get(self.url, {'since': token}).status_code, 400)
+
+
+# ═══════════════════════════════════════════
+# Storage ledger
+# ═══════════════════════════════════════════
+
+class StorageLedgerTests(TestCase):
+    """Track uploads go to a local FileSystemStorage instead of Cloudinary."""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.storage = FileSystemStorage(location=root.name)
+        field = Track._meta.get_field('audio_file')
+        patcher = mock.patch.object(field, 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(username='ledger-owner')
+
+    def upload(self, size, name='song.mp3'):
+        return Track.objects.create(user=self.user, title='Song', audio_file=ContentFile(b'\0' * size, name))
+
+    def bytes_used(self):
+        return StorageUsage.objects.get(user=self.user).bytes_used
+
+    def stored_files(self):
+        return self.storage.listdir('tracks')[1] if self.storage.exists('tracks') else []
+
+    def test_uploads_are_charged_to_the_owner(self):
+        track = self.upload(1000)
+        self.assertEqual(track.audio_file_size, 1000)
+        self.assertEqual(self.bytes_used(), 1000)
+        self.upload(500)
+        self.assertEqual(self.bytes_used(), 1500)
+
+    def test_deletes_release_their_bytes(self):
+        kept, removed = self.upload(1000), self.upload(700)
+        removed.delete()
+        self.assertEqual(self.bytes_used(), 1000)
+        self.assertEqual(len(self.stored_files()), 1)
+        kept.delete()
+        self.assertEqual(self.bytes_used(), 0)
+
+    @override_settings(STORAGE_QUOTA_BYTES=1500)
+    def test_uploads_past_the_quota_are_refused_before_storing(self):
+        self.upload(1000)
+        with self.assertRaises(StorageQuotaExceeded):
+            self.upload(501)
+        self.assertEqual(self.bytes_used(), 1000)
+        self.assertEqual(Track.objects.count(), 1)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.upload(500)
+        self.assertEqual(self.bytes_used(), 1500)
+
+    def test_quota_override(self):
+        StorageUsage.objects.create(user=self.user, quota=100)
+        with self.assertRaises(StorageQuotaExceeded):
+            self.upload(101)
+        self.upload(100)
+        self.assertEqual(self.bytes_used(), 100)
+
+    def test_failed_uploads_give_back_their_reservation(self):
+        self.upload(1000)
+        with mock.patch.object(self.storage, '_save', side_effect=OSError('storage unavailable')):
+            with self.assertRaises(OSError):
+                self.upload(700)
+        self.assertEqual(self.bytes_used(), 1000)
+
+    def test_failed_saves_delete_their_uploads_and_give_back_their_reservation(self):
+        self.upload(1000)
+
+        def refuse(sender, instance, **kwargs):
+            raise ValueError('refused after the upload')
+
+        pre_save.connect(refuse, sender=Track)
+        self.addCleanup(pre_save.disconnect, refuse, sender=Track)
+        with self.assertRaises(ValueError):
+            self.upload(700)
+        self.assertEqual(self.bytes_used(), 1000)
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_failed_writes_delete_their_uploads(self):
+        self.upload(1000)
+        with mock.patch.object(Track, '_save_table', side_effect=IntegrityError('constraint failed')):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                self.upload(700)
+        # The reservation went with the rolled-back savepoint
+        self.assertEqual(self.bytes_used(), 1000)
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_api_answers_413(self):
+        StorageUsage.objects.create(user=self.user, quota=1000)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/auth/tracks/', {
+            'title': 'Too big', 'audio_file': SimpleUploadedFile('big.mp3', b'\0' * 2000, 'audio/mpeg'),
+        })
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.bytes_used(), 0)
+        self.assertFalse(Track.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+
+# ═══════════════════════════════════════════
+# Collaborative editing rooms
+# ═══════════════════════════════════════════
+
+def collab_project():
+    return {'bpm': 120, 'tracks': [{'id': 't1', 'volume': 0.8, 'clips': [{'id': 'c1', 'startBeat': 0, 'notes': []}]}]}
+
+
+def note_op(note_id, pitch=60):
+    return {'op': 'note.add', 'trackId': 't1', 'clipId': 'c1',
+            'note': {'id': note_id, 'pitch': pitch, 'startBeat': 0, 'duration': 1, 'velocity': 100}}
+
+
+class CollabHubTests(SimpleTestCase):
+    """Rooms against an in-memory store standing in for the Project row."""
+
+    def setUp(self):
+        self.stored = {'data': collab_project(), 'base': 0}
+        self.saves = 0
+
+    async def load(self, project_id):
+        return copy.deepcopy(self.stored['data']), self.stored['base']
+
+    async def save(self, project_id, data, base):
+        if base != self.stored['base']:
+            raise StaleProject(project_id)
+        self.saves += 1
+        self.stored.update(data=data, base=base + 1)
+        return base + 1
+
+    def hub(self):
+        return CollabHub(self.load, self.save, debounce=60, max_delay=60)
+
+    def frames(self, connection):
+        frames = []
+        while not connection.queue.empty():
+            frames.append(json.loads(connection.queue.get_nowait()))
+        return frames
+
+    def test_ops_are_acked_and_fanned_out(self):
+        async def scenario():
+            hub = self.hub()
+            alice, bob = Connection(10), Connection(10)
+            room = await hub.join(1, alice)
+            self.assertIs(await hub.join(1, bob), room)
+            reply = hub.handle(room, alice, {'type': 'op', 'clientSeq': 7, 'op': note_op('n1')})
+            self.assertEqual(reply, {'type': 'ack', 'clientSeq': 7, 'version': 1})
+            self.assertEqual(self.frames(alice), [])
+            self.assertEqual(self.frames(bob), [{'type': 'op', 'version': 1, 'op': note_op('n1')}])
+
+            bad = hub.handle(room, bob, {'type': 'op', 'clientSeq': 1, 'op': {**note_op('n2'), 'clipId': 'nope'}})
+            self.assertEqual(bad['type'], 'error')
+            self.assertEqual(self.frames(alice), [])
+
+            # The last editor to leave writes the room back once
+            await hub.leave(room, alice)
+            await hub.leave(room, bob)
+            self.assertEqual(hub.rooms, {})
+        async_to_sync(scenario)()
+        self.assertEqual(self.saves, 1)
+        self.assertEqual(self.stored['data']['tracks'][0]['clips'][0]['notes'][0]['id'], 'n1')
+
+    def test_stale_rooms_replay_their_ops_on_the_new_data(self):
+        async def scenario():
+            hub = self.hub()
+            editor = Connection(10)
+            room = await hub.join(1, editor)
+            hub.handle(room, editor, {'type': 'op', 'clientSeq': 1, 'op': note_op('n1')})
+            # Saved meanwhile over REST: a new track and a new base
+            self.stored['data']['tracks'].append({'id': 't2', 'clips': []})
+            self.stored['base'] = 5
+            await hub.flush(room)
+            snapshot = self.frames(editor)[-1]
+            self.assertEqual(snapshot['type'], 'snapshot')
+            self.assertEqual([track['id'] for track in snapshot['data']['tracks']], ['t1', 't2'])
+            await hub.flush(room)
+            await hub.leave(room, editor)
+        async_to_sync(scenario)()
+        self.assertEqual(self.stored['base'], 6)
+        self.assertEqual(len(self.stored['data']['tracks']), 2)
+        self.assertEqual(self.stored['data']['tracks'][0]['clips'][0]['notes'][0]['id'], 'n1')
+
+
+class ProjectSharingTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='sharing-owner')
+        self.friend = User.objects.create(username='sharing-friend')
+        self.stranger = User.objects.create(username='sharing-stranger')
+        self.project = Project.objects.create(user=self.owner, name='Jam', data=collab_project())
+        self.client = APIClient()
+        self.url = f'/api/auth/projects/{self.project.pk}/collaborators/'
+
+    def authorize(self, user):
+        return async_to_sync(collab_authorize)(str(AccessToken.for_user(user)), self.project.pk)
+
+    def test_owner_and_collaborators_may_join_the_room(self):
+        ProjectCollaborator.objects.create(project=self.project, user=self.friend)
+        self.assertIsNotNone(self.authorize(self.owner))
+        self.assertIsNotNone(self.authorize(self.friend))
+        self.assertIsNone(self.authorize(self.stranger))
+        self.assertIsNone(async_to_sync(collab_authorize)('not-a-token', self.project.pk))
+
+    def test_owner_invites_and_removes_collaborators(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(self.url, {'username': 'sharing-friend'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['username'] for row in response.json()], ['sharing-friend'])
+        self.assertEqual(self.client.post(self.url, {'username': 'sharing-owner'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'username': 'nobody'}, format='json').status_code, 404)
+
+        self.client.force_authenticate(self.friend)
+        shared = self.client.get('/api/auth/projects/shared/').json()
+        self.assertEqual([(row['id'], row['username']) for row in shared], [(self.project.pk, 'sharing-owner')])
+        # Collaborators can see who else is in, but not invite anyone
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.post(self.url, {'username': 'sharing-stranger'}, format='json').status_code, 404)
+
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.delete(f'{self.url}?username=sharing-friend').json(), [])
+        self.assertIsNone(self.authorize(self.friend))
+
+    def test_collaborators_can_leave(self):
+        ProjectCollaborator.objects.create(project=self.project, user=self.friend)
+        self.client.force_authenticate(self.friend)
+        self.assertEqual(self.client.delete(f'{self.url}?username=sharing-friend').status_code, 200)
+        self.assertFalse(ProjectCollaborator.objects.exists())
+
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.delete(f'{self.url}?username=sharing-stranger').status_code, 404)
+
+
+# ═══════════════════════════════════════════
+# Write-behind autosave
+# ═══════════════════════════════════════════
+
+def song(*tracks, bpm=120):
+    return {'bpm': bpm, 'tracks': [
+        {'id': track_id, 'clips': [{'id': f'{track_id}-clip', 'startBeat': 0, 'notes': [
+            {'id': i, 'pitch': pitch + i, 'startBeat': i, 'duration': 1, 'velocity': 100} for i in range(4)
+        ]}]}
+        for track_id, pitch in tracks
+    ]}
+
+
+class ProjectDiffTests(SimpleTestCase):
+    def test_unchanged_tracks_are_referenced(self):
+        base = song(('drums', 36), ('bass', 40), ('keys', 60))
+        data = song(('keys', 60), ('bass', 41), ('lead', 72), bpm=128)
+        data['swing'] = 0.2
+        diff = diff_project_data(base, data)
+        self.assertEqual(diff['set'], {'bpm': 128, 'swing': 0.2})
+        self.assertEqual(diff['tracks'][0], {'saved': 'keys'})
+        self.assertEqual([next(iter(item)) for item in diff['tracks']], ['saved', 'new', 'new'])
+        self.assertEqual(apply_data_diff(base, diff), data)
+
+    def test_removed_keys_and_odd_shapes(self):
+        for base, data in (
+            ({'bpm': 120, 'tracks': []}, {'tracks': []}),
+            ({'tracks': [{'id': 1}, {'id': 1, 'x': 2}]}, {'tracks': [{'id': 1}, {'id': 1, 'x': 2}]}),
+            ({'tracks': [1, 2]}, {'tracks': [2, 1, {'saved': 1}]}),
+            ({'tracks': 'none'}, {'tracks': 'still none', 'bpm': None}),
+            ({'bpm': 120}, ['not', 'a', 'project']),
+            ([], {'bpm': 90}),
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(apply_data_diff(base, diff_project_data(base, data)), data)
+
+    def test_tracks_removed_by_a_newer_save_stay_removed(self):
+        diff = diff_project_data(song(('drums', 36), ('bass', 40)), song(('drums', 36), ('bass', 41)))
+        self.assertEqual(apply_data_diff(song(('bass', 40)), diff), song(('bass', 41)))
+
+
+class AutosaveTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(autosave_buffer, 'start')  # no flush thread; tests flush by hand
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(username='autosave-owner')
+        self.project = Project.objects.create(user=self.user, name='Draft', data=song(('drums', 36), ('bass', 40)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/auth/projects/{self.project.pk}/'
+
+    def autosave(self, data, **fields):
+        return self.client.patch(f'{self.url}?autosave=1', {'data': data, **fields}, format='json')
+
+    def test_autosaves_are_buffered_as_a_diff(self):
+        edited = song(('drums', 36), ('bass', 43))
+        response = self.autosave(edited, name='Draft 2')
+        self.assertEqual(response.status_code, 202)
+        row = PendingAutosave.objects.get(project=self.project)
+        self.assertEqual(row.data_diff['tracks'][0], {'saved': 'drums'})
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Draft')
+
+        # Every read sees it before it is written
+        body = self.client.get(self.url).json()
+        self.assertEqual((body['name'], body['data']), ('Draft 2', edited))
+
+        # Later autosaves replace the row, still diffed against the saved project
+        edited = song(('drums', 37), ('bass', 43))
+        self.autosave(edited)
+        self.assertEqual(PendingAutosave.objects.get().data_diff['tracks'][1], {'new': edited['tracks'][1]})
+        self.assertEqual(self.client.get(self.url).json()['data'], edited)
+
+    def test_flush_writes_due_rows_stamped_now(self):
+        edited = song(('drums', 36), ('bass', 40), ('keys', 60))
+        self.autosave(edited)
+        queued_at = PendingAutosave.objects.get().queued_at
+        self.assertEqual(WriteBehindBuffer(interval=3600).flush(), 0)
+        self.assertEqual(WriteBehindBuffer(interval=0).flush(), 1)
+        self.assertFalse(PendingAutosave.objects.exists())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.data, edited)
+        self.assertEqual(self.project.track_count, 3)
+        self.assertGreater(self.project.updated_at, queued_at)
+
+    def test_commit_saves_land_on_top(self):
+        self.autosave(song(('drums', 36), ('bass', 41)), name='Autosaved')
+        committed = song(('drums', 36))
+        self.assertEqual(self.client.patch(self.url, {'data': committed}, format='json').status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.name, self.project.data), ('Autosaved', committed))
+        self.assertFalse(PendingAutosave.objects.exists())
+
+    def test_autosaves_older_than_the_project_are_dropped(self):
+        self.autosave(song(('drums', 99)))
+        # Saved elsewhere after the autosave was queued (a collaborative room, say)
+        Project.objects.filter(pk=self.project.pk).update(
+            data=song(('keys', 60)), updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        self.assertEqual(autosave_buffer.flush(self.project.pk), 0)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.data, song(('keys', 60)))
+        self.assertFalse(PendingAutosave.objects.exists())
+
+    def test_export_includes_the_pending_autosave(self):
+        edited = song(('drums', 36), ('keys', 60))
+        self.autosave(edited, name='Autosaved')
+        response = self.client.get(f'{self.url}export/')
+        self.assertIn('filename="autosaved.zip"', response['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            manifest = json.loads(archive.read('project.json'))
+        self.assertEqual((manifest['name'], manifest['data']), ('Autosaved', edited))
+
+    def test_deleting_the_project_drops_its_autosave(self):
+        self.autosave(song(('drums', 1)))
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertFalse(PendingAutosave.objects.exists())
+
+
+# ═══════════════════════════════════════════
+# Project copies
+# ═══════════════════════════════════════════
+
+class ProjectDuplicateTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(autosave_buffer, 'start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(username='copy-owner')
+        self.other = User.objects.create(username='copy-other')
+        self.project = Project.objects.create(user=self.user, name='Beat', data=song(('drums', 36), ('bass', 40)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def duplicate(self, project, **body):
+        return self.client.post(f'/api/auth/projects/{project.pk}/duplicate/', body, format='json')
+
+    def test_copies_data_and_summary_into_a_new_project(self):
+        response = self.duplicate(self.project)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('data', response.json())
+        copy = Project.objects.get(pk=response.json()['id'])
+        self.assertNotEqual(copy.pk, self.project.pk)
+        self.assertEqual((copy.user, copy.name, copy.data), (self.user, 'Beat (copy)', self.project.data))
+        for field in Project.SUMMARY_FIELDS:
+            self.assertEqual(getattr(copy, field), getattr(self.project, field), field)
+        self.assertGreaterEqual(copy.created_at, self.project.created_at)
+        self.assertEqual(self.duplicate(self.project, name='Remix').json()['name'], 'Remix')
+
+    def test_templates_are_copied_for_anyone_private_projects_are_not(self):
+        template = Project.objects.create(user=self.other, name='Starter', data=song(('keys', 60)), is_template=True)
+        private = Project.objects.create(user=self.other, name='Secret', data={})
+        copy = Project.objects.get(pk=self.duplicate(template).json()['id'])
+        self.assertEqual((copy.user, copy.is_template, copy.data), (self.user, False, template.data))
+        self.assertEqual(self.duplicate(private).status_code, 404)
+
+    def test_includes_the_pending_autosave(self):
+        edited = song(('drums', 36), ('keys', 61))
+        autosave_buffer.put(self.project, {'data': edited})
+        copy = Project.objects.get(pk=self.duplicate(self.project).json()['id'])
+        self.assertEqual(copy.data, edited)
+        self.assertEqual(copy.track_count, 2)
+
+    def test_source_deleted_meanwhile(self):
+        pk = self.project.pk
+        self.project.delete()
+        with self.assertRaises(Http404):
+            duplicate_project(pk, self.user.pk, 'Gone')
+
+
+# ═══════════════════════════════════════════
+# Image derivatives
+# ═══════════════════════════════════════════
+
+class RegenerateDerivativesTests(TestCase):
+    derivatives = {'source': 'covers/old.png', 'files': {'64': {'webp': 'derivatives/old-64.webp'}}}
+
+    def setUp(self):
+        artist = User.objects.create(username='cover-artist')
+        publication = Publication.objects.create(user=artist, title='Cover')
+        # Set through update() so no derivative job is scheduled for the test to race with
+        Publication.objects.filter(pk=publication.pk).update(cover_image='covers/old.png')
+        self.queryset = Publication.objects.filter(pk=publication.pk)
+
+    def regenerate(self, sync):
+        with mock.patch.object(jobs, 'sync_derivatives', side_effect=sync), \
+                mock.patch('accounts.models.delete_files') as delete_files:
+            return jobs.regenerate_image_derivatives(self.queryset), delete_files
+
+    def render(self, instance, force):
+        instance.cover_image_derivatives = self.derivatives
+        return ['cover_image_derivatives']
+
+    def test_derivatives_are_saved(self):
+        result, delete_files = self.regenerate(self.render)
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(self.queryset.get().cover_image_derivatives, self.derivatives)
+        delete_files.assert_not_called()
+
+    def test_a_newer_upload_is_not_overwritten(self):
+        def upload_meanwhile(instance, force):
+            self.queryset.update(cover_image='covers/new.png')
+            return self.render(instance, force)
+
+        result, delete_files = self.regenerate(upload_meanwhile)
+        self.assertEqual(result, (0, 0))
+        self.assertEqual(self.queryset.get().cover_image_derivatives, {})
+        delete_files.assert_called_once_with([(mock.ANY, 'derivatives/old-64.webp')])
+
+
+# ═══════════════════════════════════════════
+# Similar songs (IVF index)
+# ═══════════════════════════════════════════
+
+@override_settings(SIMILARITY_NPROBE=2)
+class SimilarityIndexTests(SimpleTestCase):
+    dim = 8
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        rng = np.random.default_rng(7)
+        self.ids = np.arange(1, 201)
+        self.embeddings = rng.normal(size=(len(self.ids), self.dim)).astype(np.float32)
+        self.index = similarity.SimilarityIndex(self.path, dim=self.dim)
+        self.nlist = self.index.build(self.ids, self.embeddings)
+
+    def exact(self, query, k):
+        state = self.index.state()
+        vectors = similarity._normalize((self.embeddings - state['mean']) / state['scale'])
+        scores = vectors @ query
+        return [int(self.ids[i]) for i in np.argsort(-scores)[:k]]
+
+    def test_probing_every_list_is_exact(self):
+        self.assertEqual(self.nlist, 14)  # sqrt(200)
+        full = similarity.SimilarityIndex(self.path, dim=self.dim, nprobe=self.nlist)
+        query = full.prepare(self.embeddings[0], full.state())
+        self.assertEqual([pk for pk, _ in full.search(query, k=10)], self.exact(query, 10))
+
+    def test_few_probes_still_find_close_neighbours(self):
+        # A near-duplicate lands in its original's list, so two probes find it
+        neighbour = self.embeddings[0] + 0.01
+        self.index.add(1000, neighbour)
+        self.assertEqual(self.index.similar_to(1000, k=1)[0][0], 1)
+        self.assertEqual(self.index.similar_to(1, k=1)[0][0], 1000)
+        self.assertNotIn(1, [pk for pk, _ in self.index.similar_to(1, k=20)])
+
+    def test_other_workers_see_adds_removes_and_growth(self):
+        reader = similarity.SimilarityIndex(self.path, dim=self.dim)
+        self.assertEqual(len(reader), 200)
+        generation = self.index.state()['meta']['generation']
+        capacity = self.index.state()['meta']['capacity']
+        self.index.remove(5)
+        for pk in range(1001, 1001 + capacity - 200 + 1):  # one past capacity forces a new generation
+            self.index.add(pk, self.embeddings[pk % 200])
+        meta = reader.state()['meta']
+        self.assertEqual((meta['generation'], meta['capacity']), (generation + 1, capacity * 2))
+        self.assertNotIn(5, reader)
+        self.assertIn(1001 + capacity - 200, reader)
+        self.assertEqual(len(reader), capacity)
+        # Only the live generation and the one before it are kept
+        self.assertEqual(sorted(name for name in os.listdir(self.path) if name.startswith('gen-')),
+                         [f'gen-{generation}', f'gen-{generation + 1}'])
+
+
+# ═══════════════════════════════════════════
+# Admin
+# ═══════════════════════════════════════════
+
+# Admin pages render {% static %}, which the manifest storage can't serve before collectstatic
+@override_settings(STORAGES={
+    **settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class CatalogAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin-user', is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+        artist = User.objects.create(username='search-artist')
+        self.publication = Publication.objects.create(user=artist, title='Nocturne')
+        Project.objects.create(user=artist, name='Sketch', data={})
+
+    def test_changelists_search_by_owner(self):
+        for url, label in (('/admin/accounts/publication/', 'Nocturne'), ('/admin/accounts/project/', 'Sketch')):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url, {'q': 'search-art'}), label)
+                self.assertNotContains(self.client.get(url, {'q': 'nobody'}), label)
+
+    def test_purge_orphans_runs_in_the_background(self):
+        with mock.patch('accounts.admin.run_in_thread') as run:
+            response = self.client.post('/admin/accounts/publication/', {
+                'action': 'purge_orphans', '_selected_action': [self.publication.pk],
+            }, follow=True)
+        run.assert_called_once_with(jobs.purge_orphans)
+        self.assertContains(response, 'Purging orphans in the background')
+
+
+# ═══════════════════════════════════════════
+# Upload analysis
+# ═══════════════════════════════════════════
+
+def wav_bytes(seconds=2, rate=22050):
+    from scipy.io import wavfile
+    t = np.arange(int(seconds * rate)) / rate
+    buffer = io.BytesIO()
+    wavfile.write(buffer, rate, (np.sin(2 * np.pi * 440 * t) * 0.5 * 32767).astype('<i2'))
+    return buffer.getvalue()
+
+
+class UploadAnalysisTests(TestCase):
+    def test_uploads_are_spooled_to_disk_for_the_pool(self):
+        data = wav_bytes()
+        upload = ContentFile(data, 'take.wav')
+        upload.name = 'tracks/take.wav'
+        with mock.patch('accounts.background.run_in_process') as run:
+            with self.captureOnCommitCallbacks(execute=True):
+                run_on_spooled_file(upload, analyze_audio, False)
+        wrapper, fn, path, embedding = run.call_args.args
+        self.assertIs(fn, analyze_audio)
+        self.assertTrue(path.endswith('.wav'))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+        # What the pool runs: analysis straight from the file, which is then removed
+        result = wrapper(fn, path, embedding)
+        self.assertFalse(os.path.exists(path))
+        self.assertAlmostEqual(result['duration_seconds'], 2)
+        self.assertEqual((result['sample_rate'], result['channels']), (22050, 1))
+
+    def test_paths_and_bytes_decode_alike(self):
+        data = wav_bytes(seconds=1)
+        with tempfile.NamedTemporaryFile(suffix='.wav') as f:
+            f.write(data)
+            f.flush()
+            from_path, rate = decode_audio(f.name)
+        from_bytes, _ = decode_audio(data)
+        self.assertEqual(rate, 22050)
+        np.testing.assert_array_equal(from_path, from_bytes)
+
+    def test_missing_ffmpeg_is_a_system_check_warning(self):
+        with mock.patch('accounts.checks.ffmpeg_available', return_value=False):
+            self.assertEqual([message.id for message in ffmpeg_installed(None)], ['accounts.W001'])
+        with mock.patch('accounts.checks.ffmpeg_available', return_value=True):
+            self.assertEqual(ffmpeg_installed(None), [])
+
+
+# ═══════════════════════════════════════════
+# Duplicate detection (fingerprints)
+# ═══════════════════════════════════════════
+
+def tone_sequence(seconds, seed, rate=ANALYSIS_SAMPLE_RATE):
+    """A melody of random 150 ms tones: plenty of distinct spectrogram peaks to hash."""
+    rng = np.random.default_rng(seed)
+    note = int(0.15 * rate)
+    t = np.arange(note) / rate
+    tones = [np.sin(2 * np.pi * rng.uniform(200, 3000) * t) for _ in range(int(seconds / 0.15))]
+    return (np.concatenate(tones) * 0.5).astype(np.float32)
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='fingerprint-owner')
+        self.other = User.objects.create(username='fingerprint-other')
+        self.song = tone_sequence(20, seed=1)
+
+    def upload(self, user, audio, model=Track, **fields):
+        instance = model.objects.create(user=user, title='Take', **fields)
+        fingerprints.index_upload(instance, landmark_hashes(audio))
+        return instance
+
+    def test_a_trimmed_copy_matches_at_its_offset(self):
+        original = self.upload(self.user, self.song)
+        start = 5 * ANALYSIS_SAMPLE_RATE
+        trimmed = self.upload(self.user, self.song[start:start + 10 * ANALYSIS_SAMPLE_RATE] * 0.3)
+        [match] = fingerprints.matches_for(trimmed, self.user)
+        self.assertEqual((match['kind'], match['id']), ('track', original.pk))
+        self.assertAlmostEqual(match['offset_seconds'], 5, delta=FINGERPRINT_HOP / ANALYSIS_SAMPLE_RATE)
+        # Seen from the original, the copy starts 5 s in
+        self.assertAlmostEqual(fingerprints.matches_for(original, self.user)[0]['offset_seconds'], -5, delta=0.05)
+
+    def test_unrelated_audio_does_not_match(self):
+        self.upload(self.user, self.song)
+        other = self.upload(self.user, tone_sequence(20, seed=2))
+        self.assertEqual(fingerprints.matches_for(other, self.user), [])
+
+    def test_matches_only_show_what_the_uploader_may_see(self):
+        self.upload(self.other, self.song)  # someone else's track
+        hidden = self.upload(self.other, self.song, model=Publication, is_public=False)
+        public = self.upload(self.other, self.song, model=Publication, is_public=True)
+        copy = self.upload(self.user, self.song)
+        self.assertEqual([(match['kind'], match['id']) for match in fingerprints.matches_for(copy, self.user)],
+                         [('publication', public.pk)])
+        self.assertNotIn(hidden.pk, [match['id'] for match in fingerprints.matches_for(copy, self.other)])
+
+    def test_deleting_removes_fingerprints_and_matches(self):
+        original = self.upload(self.user, self.song)
+        self.upload(self.user, self.song)
+        original.delete()
+        self.assertFalse(AudioFingerprint.objects.filter(object_id=original.pk, kind=AudioFingerprint.KIND_TRACK).exists())
+        self.assertFalse(AudioMatch.objects.exists())
+
+
+# ═══════════════════════════════════════════
+# Concurrent storage I/O
+# ═══════════════════════════════════════════
+
+class StorageIoTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.storage = FileSystemStorage(location=root.name)
+
+    def files(self):
+        return sorted(self.storage.listdir('')[1])
+
+    def test_calls_overlap_and_results_keep_their_order(self):
+        # Each call waits for all the others, so this only finishes if they run at once
+        barrier = threading.Barrier(3, timeout=5)
+        outcomes = storage_io.run_concurrently(lambda i=i: (barrier.wait(), i)[1] for i in range(3))
+        self.assertEqual(outcomes, [(0, None), (1, None), (2, None)])
+
+    @override_settings(STORAGE_IO_WORKERS=1)
+    def test_one_worker_runs_inline(self):
+        outcomes = storage_io.run_concurrently([threading.current_thread, threading.current_thread])
+        self.assertEqual([thread for thread, _ in outcomes], [threading.current_thread()] * 2)
+
+    def test_nested_calls_run_inline_instead_of_deadlocking(self):
+        def nested():
+            return [thread.name for thread, _ in storage_io.run_concurrently([threading.current_thread] * 2)]
+
+        [(outer, _), (inner, _)] = storage_io.run_concurrently([threading.current_thread, nested])
+        self.assertTrue(outer.name.startswith('storage-io'))
+        self.assertEqual(len(set(inner)), 1)
+
+    def test_saves_are_all_or_nothing(self):
+        names = storage_io.save_files((self.storage, f'{i}.bin', ContentFile(b'x')) for i in range(3))
+        self.assertEqual(sorted(names), self.files())
+        failing = mock.Mock(save=mock.Mock(side_effect=OSError('quota')))
+        with self.assertRaises(OSError):
+            storage_io.save_files([(self.storage, 'a.bin', ContentFile(b'a')), (failing, 'b.bin', ContentFile(b'b')),
+                                   (self.storage, 'c.bin', ContentFile(b'c'))])
+        self.assertEqual(sorted(names), self.files())
+
+    def test_deletes_attempt_everything_then_raise(self):
+        names = storage_io.save_files((self.storage, f'{i}.bin', ContentFile(b'x')) for i in range(2))
+        failing = mock.Mock(delete=mock.Mock(side_effect=OSError('gone')))
+        with self.assertRaises(OSError):
+            storage_io.delete_files([(self.storage, names[0]), (failing, 'other.bin'), (self.storage, names[1])])
+        self.assertEqual(self.files(), [])
+
+
+# ═══════════════════════════════════════════
+# Static files and the frontend build
+# ═══════════════════════════════════════════
+
+class StaticServingTests(SimpleTestCase):
+    css = b'body { color: black; }\n' * 200
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        files = {
+            'site.css': self.css,
+            'app/index.html': b'<!doctype html><div id="root"></div>',
+            'app/assets/main-abc123.js': b'console.log(1)',
+            'app/favicon.ico': b'\0\0\1\0',
+        }
+        for name, data in files.items():
+            os.makedirs(os.path.dirname(os.path.join(root.name, name)), exist_ok=True)
+            with open(os.path.join(root.name, name), 'wb') as f:
+                f.write(data)
+        write_precompressed(os.path.join(root.name, 'site.css'))
+        override = override_settings(STATIC_ROOT=root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_client_routes_get_index_html_revalidated(self):
+        response = self.client.get('/projects/5')
+        self.assertEqual(b''.join(response.streaming_content), b'<!doctype html><div id="root"></div>')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        again = self.client.get('/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get('/favicon.ico')['Content-Type'], 'image/vnd.microsoft.icon')
+
+    def test_missing_files_and_reserved_prefixes_are_404s(self):
+        for url in ('/logo.png', '/assets/missing.js', '/static/../settings.py', '/ws/projects/1/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_vite_assets_are_immutable(self):
+        response = self.client.get('/assets/main-abc123.js')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_hashed_static_files_are_immutable(self):
+        storage = mock.Mock(immutable_names={'site.css'})
+        with mock.patch('accounts.static_assets.staticfiles_storage', storage):
+            self.assertEqual(self.client.get('/static/site.css')['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(self.client.get('/static/site.css')['Cache-Control'], 'no-cache')
+
+    def test_precompressed_variants_and_ranges(self):
+        response = self.client.get('/static/site.css', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.css)
+        identity = self.client.get('/static/site.css', headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertNotEqual(identity['ETag'], response['ETag'])
+
+        partial = self.client.get('/static/site.css', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-3'})
+        self.assertEqual(partial.status_code, 206)
+        self.assertNotIn('Content-Encoding', partial)
+        self.assertEqual(b''.join(partial.streaming_content), b'body')
+        unsatisfiable = self.client.get('/static/site.css', headers={'Range': f'bytes={len(self.css)}-'})
+        self.assertEqual(unsatisfiable.status_code, 416)
@@ -0,0 +1,186 @@
+"""
+Rate-limit state shared by every worker, so limits hold across gunicorn workers and
+restarts instead of living in each process's LocMemCache.
+
+DRF throttles (SharedAnonRateThrottle) use GCRA: each key stores a single
+"theoretical arrival time" that advances by period / rate per admitted request, and a
+request is refused while that time is more than one period ahead of now. That allows
+a burst of `rate` requests and then one every period / rate, in constant memory per
+key, unlike DRF's default list of every request timestamp.
+
+django_ratelimit (ForgotPasswordView) keeps its own fixed-window algorithm and only
+needs a cache with atomic add/incr; ThrottleCache provides that on the same table.
+
+State lives in the ThrottleState table, updated with single atomic upserts, or in
+Redis when THROTTLE_REDIS_URL is set (a Lua script here, Django's RedisCache for
+django_ratelimit; see settings.CACHES). Expired rows are deleted now and then by the
+checks themselves.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connections, router
+from rest_framework.throttling import AnonRateThrottle
+
+from .models import ThrottleState
+
+PURGE_PROBABILITY = 0.001
+NO_EXPIRY = 10 * 365 * 24 * 3600
+
+GCRA_SCRIPT = """
+local now, interval, period = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now) + interval
+if tat - now > period then
+    return {0, tostring(tat - period - now)}
+end
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+return {1, '0'}
+"""
+
+
+class _Table:
+    """Raw SQL on ThrottleState, through the write database."""
+
+    def connection(self):
+        return connections[router.db_for_write(ThrottleState)]
+
+    def execute(self, sql, params):
+        connection = self.connection()
+        quote = connection.ops.quote_name
+        sql = sql.format(
+            table=quote(ThrottleState._meta.db_table), key=quote('key'),
+            greatest='GREATEST' if connection.vendor == 'postgresql' else 'MAX',
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone() if cursor.description else None
+            rowcount = cursor.rowcount
+        if random.random() < PURGE_PROBABILITY:
+            ThrottleState.objects.filter(expires_at__lt=time.time()).delete()
+        return row, rowcount
+
+
+class DatabaseStore(_Table):
+    def gcra(self, key, rate, period):
+        """Admit one request for key at `rate` per `period` seconds; returns (allowed, retry_after)."""
+        now, interval = time.time(), period / rate
+        row, _ = self.execute(
+            'INSERT INTO {table} ({key}, value, expires_at) VALUES (%s, %s, %s) '
+            'ON CONFLICT ({key}) DO UPDATE SET value = {greatest}({table}.value, %s) + %s, '
+            'expires_at = {greatest}({table}.value, %s) + %s '
+            'WHERE {greatest}({table}.value, %s) + %s - %s <= %s '
+            'RETURNING value',
+            [key, now + interval, now + interval, now, interval, now, interval, now, interval, now, period],
+        )
+        if row is not None:
+            return True, 0.0
+        tat = ThrottleState.objects.using(router.db_for_write(ThrottleState)) \
+            .filter(key=key).values_list('value', flat=True).first()
+        return False, max(0.0, (tat or now) + interval - period - now)
+
+
+class RedisStore:
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(GCRA_SCRIPT)
+
+    def gcra(self, key, rate, period):
+        allowed, retry_after = self.script(keys=[f'gcra:{key}'], args=[time.time(), period / rate, period])
+        return bool(int(allowed)), float(retry_after)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = RedisStore(settings.THROTTLE_REDIS_URL) if settings.THROTTLE_REDIS_URL else DatabaseStore()
+    return _store
+
+
+class SharedRateThrottleMixin:
+    """Replaces SimpleRateThrottle's per-process timestamp history with a shared GCRA check."""
+    retry_after = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        allowed, self.retry_after = get_store().gcra(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class SharedAnonRateThrottle(SharedRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class ThrottleCache(BaseCache):
+    """
+    Cache backend over ThrottleState for django_ratelimit's counters (RATELIMIT_USE_CACHE).
+    It stores numbers only; add() and incr() are single atomic statements.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.table = _Table()
+
+    def _expires_at(self, timeout):
+        expires_at = self.get_backend_timeout(timeout)  # absolute unix time, None for never
+        return time.time() + NO_EXPIRY if expires_at is None else expires_at
+
+    @staticmethod
+    def _number(value):
+        return int(value) if float(value).is_integer() else value
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row, _ = self.table.execute(
+            'INSERT INTO {table} ({key}, value, expires_at) VALUES (%s, %s, %s) '
+            'ON CONFLICT ({key}) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+            'WHERE {table}.expires_at <= %s '
+            'RETURNING value',
+            [key, value, self._expires_at(timeout), time.time()],
+        )
+        return row is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.table.execute(
+            'INSERT INTO {table} ({key}, value, expires_at) VALUES (%s, %s, %s) '
+            'ON CONFLICT ({key}) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+            [key, value, self._expires_at(timeout)],
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row, _ = self.table.execute(
+            'SELECT value FROM {table} WHERE {key} = %s AND expires_at > %s', [key, time.time()],
+        )
+        return default if row is None else self._number(row[0])
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row, _ = self.table.execute(
+            'UPDATE {table} SET value = value + %s WHERE {key} = %s AND expires_at > %s RETURNING value',
+            [delta, key, time.time()],
+        )
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return self._number(row[0])
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        _, deleted = self.table.execute('DELETE FROM {table} WHERE {key} = %s', [key])
+        return bool(deleted)
+
+    def clear(self):
+        ThrottleState.objects.using(router.db_for_write(ThrottleState)).all().delete()
@@ -0,0 +1,186 @@
+"""
+Home timelines: the public songs of the people a user follows, newest first.
+
+Each user's timeline is precomputed in TimelineEntry. Publishing fans the song out to
+every follower's timeline with one INSERT ... SELECT over the author's followers. That
+runs as a TimelineJob, queued with the publish and claimed by the process_timeline_jobs
+worker like the email outbox, so a restart delays it but never drops it. A page is then a single range scan of the
+(user, published_at) index, so reading costs the same however many people a user
+follows.
+
+Creators with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers are not fanned out,
+since one publish would write that many rows. Their songs are merged in at read time
+(fan-in) from the few such creators a user follows, by the same keyset. When a creator
+drops back to the threshold, their latest TIMELINE_BACKFILL songs are written to every
+follower, since reads stop merging them in.
+
+Following someone copies their latest TIMELINE_BACKFILL songs into your timeline.
+Unfollowing, unpublishing and deleting take songs out again.
+"""
+import base64
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Follow, Publication, TimelineEntry, TimelineJob, User
+
+logger = logging.getLogger(__name__)
+
+
+def fans_out(follower_count):
+    return follower_count <= settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def _insert_for_followers(publication_id, published_at, author_id):
+    quote = connection.ops.quote_name
+    published_at = TimelineEntry._meta.get_field('published_at').get_db_prep_save(published_at, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(TimelineEntry._meta.db_table)} '
+            f'({quote("user_id")}, {quote("publication_id")}, {quote("published_at")}) '
+            f'SELECT {quote("follower_id")}, %s, %s FROM {quote(Follow._meta.db_table)} '
+            f'WHERE {quote("followed_id")} = %s '
+            f'ON CONFLICT DO NOTHING',
+            [publication_id, published_at, author_id],
+        )
+        return cursor.rowcount
+
+
+def fan_out(publication_id):
+    """Add a public publication to its author's followers' timelines; returns the rows written."""
+    publication = Publication.objects.filter(pk=publication_id, is_public=True) \
+        .values('published_at', 'user_id', 'user__follower_count').first()
+    if publication is None or not fans_out(publication['user__follower_count']):
+        return 0
+    return _insert_for_followers(publication_id, publication['published_at'], publication['user_id'])
+
+
+def remove_publication(publication_id):
+    TimelineEntry.objects.filter(publication_id=publication_id).delete()
+
+
+def add_follow(follower_id, followed_id):
+    """Backfill a new follower's timeline with the followed user's latest songs."""
+    follower_count = User.objects.filter(pk=followed_id).values_list('follower_count', flat=True).first()
+    if follower_count is None or not fans_out(follower_count):
+        return
+    if not Follow.objects.filter(follower_id=follower_id, followed_id=followed_id).exists():
+        return  # unfollowed again before this ran
+    latest = Publication.objects.filter(user_id=followed_id, is_public=True) \
+        .order_by('-published_at').values_list('pk', 'published_at')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follower_id, publication_id=pk, published_at=published_at)
+         for pk, published_at in latest],
+        ignore_conflicts=True,
+    )
+
+
+def remove_follow(follower_id, followed_id):
+    TimelineEntry.objects.filter(user_id=follower_id, publication__user_id=followed_id).delete()
+
+
+def backfill_followers(creator_id):
+    """Write a creator's latest songs to all their followers' timelines; returns the rows written."""
+    follower_count = User.objects.filter(pk=creator_id).values_list('follower_count', flat=True).first()
+    if follower_count is None or not fans_out(follower_count):
+        return 0
+    latest = Publication.objects.filter(user_id=creator_id, is_public=True) \
+        .order_by('-published_at').values_list('pk', 'published_at')[:settings.TIMELINE_BACKFILL]
+    return sum(_insert_for_followers(pk, published_at, creator_id) for pk, published_at in latest)
+
+
+# ─── Jobs ───
+
+JOBS = {
+    TimelineJob.KIND_FAN_OUT: fan_out,
+    TimelineJob.KIND_REMOVE_PUBLICATION: remove_publication,
+    TimelineJob.KIND_FOLLOW: add_follow,
+    TimelineJob.KIND_UNFOLLOW: remove_follow,
+    TimelineJob.KIND_BACKFILL_FOLLOWERS: backfill_followers,
+}
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base, ... capped at one hour."""
+    return timedelta(seconds=min(settings.TIMELINE_JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 3600))
+
+
+def run_due_jobs(batch_size=None, max_attempts=None):
+    """
+    Claim one batch of due timeline jobs and run them in queue order.
+    Returns (done, failed) counts for the batch.
+    """
+    batch_size = batch_size or settings.TIMELINE_JOB_BATCH_SIZE
+    max_attempts = max_attempts or settings.TIMELINE_JOB_MAX_ATTEMPTS
+    done, failed = [], []
+
+    with transaction.atomic():
+        # skip_locked lets several workers drain the queue without running a job twice
+        batch = list(
+            TimelineJob.objects.select_for_update(skip_locked=True)
+            .filter(status=TimelineJob.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        for job in batch:
+            job.attempts += 1
+            try:
+                with transaction.atomic():
+                    JOBS[job.kind](*job.args)
+            except Exception as exc:
+                logger.exception('Timeline job %s failed', job)
+                job.last_error = str(exc)
+                if job.attempts >= max_attempts:
+                    job.status = TimelineJob.STATUS_FAILED
+                else:
+                    job.next_attempt_at = timezone.now() + retry_delay(job.attempts)
+                failed.append(job)
+            else:
+                done.append(job.pk)
+
+        TimelineJob.objects.filter(pk__in=done).delete()
+        TimelineJob.objects.bulk_update(failed, ['status', 'attempts', 'next_attempt_at', 'last_error'])
+
+    return len(done), len(failed)
+
+
+# ─── Reading ───
+
+def encode_cursor(published_at, pk):
+    return base64.urlsafe_b64encode(f'{published_at.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(published_at, pk) of the last item of the previous page; ValueError if malformed."""
+    if not cursor:
+        return None
+    # Bad base64, UTF-8, dates and ints all raise ValueError subclasses
+    published_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(published_at), int(pk)
+
+
+def _before(cursor, pk_field):
+    if cursor is None:
+        return Q()
+    published_at, pk = cursor
+    return Q(published_at__lt=published_at) | Q(published_at=published_at, **{f'{pk_field}__lt': pk})
+
+
+def home_timeline(user_id, cursor=None, limit=20):
+    """Return (publication ids, newest first, next cursor or None) for one page."""
+    fanned_out = TimelineEntry.objects.filter(_before(cursor, 'publication_id'), user_id=user_id) \
+        .order_by('-published_at', '-publication_id').values_list('published_at', 'publication_id')[:limit + 1]
+    large_creators = Follow.objects.filter(
+        follower_id=user_id, followed__follower_count__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS,
+    ).values('followed_id')
+    fanned_in = Publication.objects.filter(_before(cursor, 'pk'), user__in=large_creators, is_public=True) \
+        .order_by('-published_at', '-pk').values_list('published_at', 'pk')[:limit + 1]
+    # A creator who grew past the threshold can have songs in both; keep one of each
+    rows = sorted(dict((pk, published_at) for published_at, pk in [*fanned_out, *fanned_in]).items(),
+                  key=lambda row: (row[1], row[0]), reverse=True)
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(rows) > limit else None
+    return [pk for pk, _ in page], next_cursor
@@ -1,11 +1,15 @@
 from django.urls import path
+from .models import Track, Publication
 from .views import (
     RegisterView, LoginView, ProtectedView, ProfileView,
     ForgotPasswordView, ResetPasswordView,
-    TrackListCreateView, TrackDeleteView,
-    ProjectListCreateView, ProjectDetailView,
+    TrackListCreateView, TrackDeleteView, AudioMatchListView, LibrarySyncView,
+    ProjectListCreateView, ProjectDetailView, ProjectExportView, ProjectImportView, ProjectDuplicateView,
+    SharedProjectListView, ProjectCollaboratorsView,
     PublicationListCreateView, PublicationDeleteView,
-    PublicFeedView, UserPublicationsView, PublicationPlayView,
+    PublicFeedView, UserPublicationsView, PublicationPlayView, PublicationStatsView, SimilarPublicationsView,
+    ProjectTemplateListView, FollowView, HomeFeedView,
+    SampleManifestView, SampleFileView, SampleBundleView,
 )
 
 urlpatterns = [
@@ -17,17 +21,40 @@ urlpatterns = [
     path('reset-password/', ResetPasswordView.as_view(), name='reset-password'),
     path('tracks/', TrackListCreateView.as_view(), name='track-list-create'),
     path('tracks/<int:pk>/', TrackDeleteView.as_view(), name='track-delete'),
+    path('tracks/<int:pk>/matches/', AudioMatchListView.as_view(model=Track), name='track-matches'),
+    # Changes to the user's projects, tracks and publications since a sync token
+    path('sync/', LibrarySyncView.as_view(), name='library-sync'),
 
     # DAW projects
     path('projects/', ProjectListCreateView.as_view(), name='project-list-create'),
     path('projects/<int:pk>/', ProjectDetailView.as_view(), name='project-detail'),
+    path('projects/<int:pk>/export/', ProjectExportView.as_view(), name='project-export'),
+    path('projects/import/', ProjectImportView.as_view(), name='project-import'),
+    path('projects/<int:pk>/duplicate/', ProjectDuplicateView.as_view(), name='project-duplicate'),
+    # Sharing: who may join a project's live editing room
+    path('projects/shared/', SharedProjectListView.as_view(), name='project-shared'),
+    path('projects/<int:pk>/collaborators/', ProjectCollaboratorsView.as_view(), name='project-collaborators'),
 
     # Publications (user's own)
     path('publications/', PublicationListCreateView.as_view(), name='publication-list-create'),
     path('publications/<int:pk>/', PublicationDeleteView.as_view(), name='publication-delete'),
     path('publications/<int:pk>/play/', PublicationPlayView.as_view(), name='publication-play'),
+    path('publications/<int:pk>/matches/', AudioMatchListView.as_view(model=Publication), name='publication-matches'),
+
+    # Follows and the home feed of followed users' songs
+    path('users/<str:username>/follow/', FollowView.as_view(), name='user-follow'),
+    path('feed/home/', HomeFeedView.as_view(), name='home-feed'),
 
     # Public endpoints (no auth required)
     path('feed/', PublicFeedView.as_view(), name='public-feed'),
     path('users/<str:username>/publications/', UserPublicationsView.as_view(), name='user-publications'),
+    path('publications/<int:pk>/similar/', SimilarPublicationsView.as_view(), name='publication-similar'),
+    path('projects/templates/', ProjectTemplateListView.as_view(), name='project-templates'),
+    path('publications/<int:pk>/stats/', PublicationStatsView.as_view(), name='publication-stats'),
+
+    # Self-hosted sample packs (public, immutable files)
+    path('samples/', SampleManifestView.as_view(), name='sample-manifest'),
+    path('samples/files/<str:file_name>', SampleFileView.as_view(), name='sample-file'),
+    path('samples/<slug:preset_id>/', SampleManifestView.as_view(), name='sample-pack-manifest'),
+    path('samples/<slug:preset_id>/bundle/<str:pack_hash>/', SampleBundleView.as_view(), name='sample-bundle'),
 ]
\ No newline at end of file
@@ -9,22 +9,39 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.core.files.storage import default_storage
 from django.db import models as db_models
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.utils.decorators import method_decorator
 from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.views import View
+from django.utils.text import slugify
 from django_ratelimit.decorators import ratelimit
-from datetime import datetime, timedelta
-from rest_framework.throttling import AnonRateThrottle
-import resend
 import os
+from rest_framework.filters import OrderingFilter
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.utils.urls import replace_query_param
+
+from .serializers import UserSerializer, ProfileUpdateSerializer, TrackSerializer, ProjectSerializer, ProjectListSerializer, ProjectTemplateSerializer, PublicationSerializer, SharedProjectSerializer, ProjectCollaboratorSerializer
+from .models import Track, Project, ProjectCollaborator, Publication, Follow, SamplePack
+from .emails import queue_password_reset_email
+from .autosave import buffer as autosave_buffer, wants_autosave
+from .project_archive import export_project_archive, import_project_archive
+from .project_copy import duplicate_project
+from .file_serving import serve_file, IMMUTABLE
+from .similarity import index as similarity_index
+from .fingerprints import matches_for
+from .listeners import record_listener, unique_listeners
+from .timelines import home_timeline, decode_cursor
+from .sync import changes_since, decode_token
+from .storage_quota import StorageQuotaMixin
+from .throttling import SharedAnonRateThrottle
+from .sample_packs import sample_path, pack_hash, bundle_header, iter_bundle
+from .static_assets import APP_PREFIX, collected_path, is_hashed, serve_collected
+from sonara_backend.db_router import start_replica_reads, stop_replica_reads, has_recent_write
 
-from .serializers import UserSerializer, ProfileUpdateSerializer, TrackSerializer, ProjectSerializer, ProjectListSerializer, PublicationSerializer
-from .models import Track, Project, Publication
-
-resend.api_key = os.environ.get('RESEND_API_KEY')
 User = get_user_model()
 
 class RegisterView(generics.CreateAPIView):
@@ -66,68 +83,8 @@ class ForgotPasswordView(APIView):
         frontend_url = settings.FRONTEND_URL  # Add this to settings.py
         reset_link = f"{frontend_url}/reset-password?uid={uid}&token={token}"
 
-        # Send email with Resend
-        # In your ForgotPasswordView, before sending the email:
-        expires_at = datetime.now() + timedelta(hours=1)
-        expires_formatted = expires_at.strftime("%B %d, %Y at %I:%M %p")
-        resend.Emails.send({
-            "from": "Sonara <noreply@support.sonara.us>",
-            "to": email,
-            "subject": "Reset your Sonara password",
-            "html": f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-            </head>
-            <body style="font-family: 'Helvetica Neue', Arial, sans-serif; background-color: #1a1a2e; color: #ffffff; padding: 0; margin: 0;">
-                <table width="100%" border="0" cellspacing="0" cellpadding="0" style="background-color: #1a1a2e;">
-                    <tr>
-                        <td align="center" style="padding: 40px 20px;">
-                            <table width="600" border="0" cellspacing="0" cellpadding="0" style="background-color: #1a1a2e; border-radius: 12px; padding: 40px;">
-                                <tr>
-                                    <td align="center">
-                                        <!-- Logo -->
-                                        <img src="https://www.sonara.us/sonara_logo.png" alt="Sonara" style="width: 200px; margin-bottom: 30px;" />
-                                    </td>
-                                </tr>
-                                <tr>
-                                    <td align="center">
-                                        <h1 style="color: #ffffff; font-size: 24px; margin-bottom: 20px;">Reset Your Password</h1>
-                                        <p style="color: rgba(255,255,255,0.7); font-size: 16px; line-height: 1.6; margin-bottom: 30px;">
-                                            We received a request to reset your password. Click the button below to create a new one.
-                                        </p>
-                                    </td>
-                                </tr>
-                                <tr>
-                                    <td align="center" style="padding: 20px 0;">
-                                        <a href="{reset_link}" style="display: inline-block; background: linear-gradient(135deg, #00d4ff 0%, #0096c7 100%); color: #ffffff; text-decoration: none; padding: 14px 40px; border-radius: 8px; font-weight: 600; font-size: 16px;">
-                                            Reset Password
-                                        </a>
-                                    </td>
-                                </tr>
-                                <tr>
-                                    <td align="center">
-                                        <p style="color: rgba(255,255,255,0.5); font-size: 12px; margin-top: 20px;">
-                                            This link expires on {expires_formatted}
-                                        </p>
-                                        <p style="color: rgba(255,255,255,0.5); font-size: 14px; margin-top: 30px;">
-                                            If you didn't request this, you can safely ignore this email.
-                                        </p>
-                                        <hr style="border: none; border-top: 1px solid rgba(255,255,255,0.1); margin: 30px 0;" />
-                                        <p style="color: rgba(255,255,255,0.4); font-size: 12px;">
-                                            © 2026 Sonara. All rights reserved.
-                                        </p>
-                                    </td>
-                                </tr>
-                            </table>
-                        </td>
-                    </tr>
-                </table>
-            </body>
-            </html>
-            """
-        })
+        # Queue the email; send_outbox_emails delivers it outside the request
+        queue_password_reset_email(user, reset_link)
 
         return Response({'message': 'If an account with this email exists, a reset link has been sent.'})
 
@@ -163,7 +120,7 @@ class ResetPasswordView(APIView):
 
         return Response({'message': 'Password has been reset successfully'})
 
-class ProfileView(RetrieveUpdateAPIView):
+class ProfileView(StorageQuotaMixin, RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
     queryset = User.objects.all()
 
@@ -189,7 +146,7 @@ class ProfileView(RetrieveUpdateAPIView):
         return Response(UserSerializer(instance, context=self.get_serializer_context()).data)
 
 
-class TrackListCreateView(generics.ListCreateAPIView):
+class TrackListCreateView(StorageQuotaMixin, generics.ListCreateAPIView):
     """List the authenticated user's tracks or upload a new one."""
     serializer_class = TrackSerializer
     permission_classes = [IsAuthenticated]
@@ -207,10 +164,45 @@ class TrackDeleteView(generics.DestroyAPIView):
     def get_queryset(self):
         return Track.objects.filter(user=self.request.user)
 
-    def perform_destroy(self, instance):
-        if instance.audio_file:
-            default_storage.delete(instance.audio_file.name)
-        instance.delete()
+
+class AudioMatchListView(APIView):
+    """Likely duplicates of one of the user's tracks or publications, found by acoustic fingerprint."""
+    permission_classes = [IsAuthenticated]
+    model = None  # Track or Publication, set in urls.py
+
+    def get(self, request, pk):
+        try:
+            instance = self.model.objects.get(pk=pk, user=request.user)
+        except self.model.DoesNotExist:
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(matches_for(instance, request.user))
+
+
+class LibrarySyncView(APIView):
+    """
+    Projects, tracks and publications changed or deleted since ?since=<token>; omit it for
+    everything. Keep the returned token for the next call. Reads the primary database, since
+    a lagging replica could hide changes from before the new token.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            since = decode_token(request.query_params.get('since'), request.user.pk)
+        except ValueError:
+            raise DRFValidationError({'since': 'Invalid sync token.'})
+        changes = changes_since(request.user, since)
+        context = {'request': request}
+        return Response({
+            'token': changes['token'],
+            'reset': changes['reset'],
+            'projects': ProjectListSerializer(changes['projects'].defer('data'), many=True).data,
+            'tracks': TrackSerializer(changes['tracks'], many=True, context=context).data,
+            'publications': PublicationSerializer(
+                changes['publications'].select_related('user'), many=True, context=context,
+            ).data,
+            'deleted': changes['deleted'],
+        })
 
 
 # ═══════════════════════════════════════════
@@ -221,36 +213,198 @@ class ProjectListCreateView(generics.ListCreateAPIView):
     """List user's projects (lightweight) or create a new one."""
     permission_classes = [IsAuthenticated]
 
+    filter_backends = [OrderingFilter]
+    # ?ordering=-note_count, ?bpm__gte=100&bpm__lte=130, ?content_hash=…
+    range_filter_fields = ('bpm', 'track_count', 'clip_count', 'note_count', 'duration_beats', 'byte_size')
+    ordering_fields = ('name', 'created_at', 'updated_at') + range_filter_fields
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return ProjectListSerializer
         return ProjectSerializer
 
     def get_queryset(self):
-        return Project.objects.filter(user=self.request.user)
+        queryset = Project.objects.filter(user=self.request.user)
+        if self.request.method != 'GET':
+            return queryset
+
+        queryset = queryset.defer('data')
+        filters = {}
+        for field in self.range_filter_fields:
+            for lookup in ('gte', 'lte'):
+                value = self.request.query_params.get(f'{field}__{lookup}')
+                if value is None:
+                    continue
+                try:
+                    filters[f'{field}__{lookup}'] = float(value)
+                except ValueError:
+                    raise DRFValidationError({f'{field}__{lookup}': 'Must be a number.'})
+        content_hash = self.request.query_params.get('content_hash')
+        if content_hash:
+            filters['content_hash'] = content_hash
+        return queryset.filter(**filters)
 
 
 class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
-    """Get, update, or delete a specific project."""
+    """
+    Get, update, or delete a specific project.
+    Updates with ?autosave=1 are validated and buffered (see accounts/autosave.py) and
+    answered with 202; any other update is a commit save and is written immediately.
+    """
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Project.objects.filter(user=self.request.user)
+        return Project.objects.filter(user=self.request.user).select_related('pending_autosave')
+
+    def get_object(self):
+        project = super().get_object()
+        # Reads see the latest autosave, whichever worker took it
+        for field, value in autosave_buffer.pending(project).items():
+            setattr(project, field, value)
+        return project
+
+    def update(self, request, *args, **kwargs):
+        if not wants_autosave(request):
+            return super().update(request, *args, **kwargs)
+        # As saved, without pending changes: the autosave is stored as a diff from it
+        project = super().get_object()
+        serializer = self.get_serializer(project, data=request.data, partial=kwargs.get('partial', False))
+        serializer.is_valid(raise_exception=True)
+        fields = {field: serializer.validated_data[field] for field in ('name', 'data') if field in serializer.validated_data}
+        if fields:
+            autosave_buffer.put(project, fields)
+        return Response({'id': project.pk, 'autosaved': True}, status=status.HTTP_202_ACCEPTED)
+
+    def perform_update(self, serializer):
+        # A commit save lands on top of everything autosaved before it
+        autosave_buffer.flush(serializer.instance.pk)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        instance.delete()  # cascades to a pending autosave
+
+
+class SharedProjectListView(generics.ListAPIView):
+    """Projects other people shared with you; open one in its live room (accounts/collab.py)."""
+    serializer_class = SharedProjectSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Project.objects.filter(collaborators__user=self.request.user).defer('data').select_related('user')
+
+
+class ProjectCollaboratorsView(APIView):
+    """
+    Who may edit one of your projects live with you: list them (GET), invite someone by
+    username (POST) or remove them (DELETE ?username=…). Collaborators may remove themselves.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_project(self, pk, owner_only=True):
+        projects = Project.objects.filter(pk=pk)
+        if owner_only:
+            projects = projects.filter(user=self.request.user)
+        else:
+            projects = projects.filter(
+                db_models.Q(user=self.request.user) | db_models.Q(collaborators__user=self.request.user)
+            ).distinct()
+        project = projects.only('pk', 'user_id').first()
+        if project is None:
+            raise Http404
+        return project
+
+    def collaborators(self, project):
+        return Response(ProjectCollaboratorSerializer(
+            project.collaborators.select_related('user').order_by('added_at'), many=True,
+        ).data)
+
+    def get(self, request, pk):
+        return self.collaborators(self.get_project(pk, owner_only=False))
+
+    def post(self, request, pk):
+        project = self.get_project(pk)
+        user = User.objects.filter(username=request.data.get('username')).only('pk').first()
+        if user is None:
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        if user.pk == project.user_id:
+            return Response({'error': 'You already own this project'}, status=status.HTTP_400_BAD_REQUEST)
+        ProjectCollaborator.objects.get_or_create(project=project, user=user)
+        return self.collaborators(project)
+
+    def delete(self, request, pk):
+        username = request.query_params.get('username', '')
+        project = self.get_project(pk, owner_only=username != request.user.username)
+        ProjectCollaborator.objects.filter(project=project, user__username=username).delete()
+        return self.collaborators(project)
+
+
+class ProjectExportView(APIView):
+    """Download a project as a zip of its JSON, peaks and referenced track audio (streamed)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            project = Project.objects.select_related('pending_autosave').get(pk=pk, user=request.user)
+        except Project.DoesNotExist:
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        # Export what the editor last saved, even if its autosave hasn't been flushed yet
+        for field, value in autosave_buffer.pending(project).items():
+            setattr(project, field, value)
+        response = StreamingHttpResponse(export_project_archive(project), content_type='application/zip')
+        filename = slugify(project.name) or f'project-{project.pk}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}.zip"'
+        return response
+
+
+class ProjectImportView(StorageQuotaMixin, APIView):
+    """Create a new project (and its tracks) from an uploaded archive."""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        archive = request.FILES.get('archive')
+        if archive is None:
+            return Response({'error': 'archive is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            project = import_project_archive(request.user, archive)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ProjectListSerializer(project).data, status=status.HTTP_201_CREATED)
+
+
+class ProjectDuplicateView(APIView):
+    """
+    Copy one of your projects, or a catalog template, into a new project of yours without
+    the data making a round trip through the client. Responds with the new summary only.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        source = Project.objects.filter(
+            db_models.Q(user=request.user) | db_models.Q(is_template=True), pk=pk,
+        ).values('name').first()
+        if source is None:
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        name = str(request.data.get('name') or f"{source['name']} (copy)")[:Project._meta.get_field('name').max_length]
+        # Include a pending autosave of the source
+        autosave_buffer.flush(pk)
+        project = Project.objects.defer('data').get(pk=duplicate_project(pk, request.user.pk, name))
+        return Response(ProjectListSerializer(project).data, status=status.HTTP_201_CREATED)
 
 
 # ═══════════════════════════════════════════
 # Publication endpoints (public songs)
 # ═══════════════════════════════════════════
 
-class PublicationListCreateView(generics.ListCreateAPIView):
+class PublicationListCreateView(StorageQuotaMixin, generics.ListCreateAPIView):
     """List user's own publications or create (publish) a new one."""
     serializer_class = PublicationSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
     def get_queryset(self):
-        return Publication.objects.filter(user=self.request.user)
+        return Publication.objects.filter(user=self.request.user).select_related('user')
 
 
 class PublicationDeleteView(generics.DestroyAPIView):
@@ -261,34 +415,74 @@ class PublicationDeleteView(generics.DestroyAPIView):
     def get_queryset(self):
         return Publication.objects.filter(user=self.request.user)
 
-    def perform_destroy(self, instance):
-        if instance.audio_file:
-            default_storage.delete(instance.audio_file.name)
-        if instance.cover_image:
-            default_storage.delete(instance.cover_image.name)
-        instance.delete()
 
+class ReplicaReadMixin:
+    """Serve safe requests from a read replica unless this client wrote very recently."""
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Runs after authentication, so stickiness can key on the user as well as the IP
+        if request.method in permissions.SAFE_METHODS and not has_recent_write(request):
+            self._replica_token = start_replica_reads()
 
-class PublicFeedView(generics.ListAPIView):
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            stop_replica_reads(self._replica_token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PublicFeedView(ReplicaReadMixin, generics.ListAPIView):
     """Public feed — list all published songs (no auth required)."""
     serializer_class = PublicationSerializer
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        return Publication.objects.filter(is_public=True)
+        return Publication.objects.filter(is_public=True).select_related('user')
 
 
-class UserPublicationsView(generics.ListAPIView):
+class UserPublicationsView(ReplicaReadMixin, generics.ListAPIView):
     """View a specific user's public publications (no auth required)."""
     serializer_class = PublicationSerializer
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
         username = self.kwargs.get('username')
-        return Publication.objects.filter(user__username=username, is_public=True)
+        return Publication.objects.filter(user__username=username, is_public=True).select_related('user')
 
 
-class PlayCountThrottle(AnonRateThrottle):
+class SimilarPublicationsView(ReplicaReadMixin, APIView):
+    """Public songs that sound like this one, nearest first (no auth required)."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        if not Publication.objects.filter(pk=pk, is_public=True).exists():
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            raise DRFValidationError({'limit': 'Must be an integer.'})
+        scores = dict(similarity_index.similar_to(pk, limit))
+        # The index can briefly lag a publication being hidden, so filter on is_public again
+        publications = Publication.objects.filter(pk__in=scores, is_public=True).select_related('user')
+        publications = sorted(publications, key=lambda publication: -scores[publication.pk])
+        data = PublicationSerializer(publications, many=True, context={'request': request}).data
+        for item in data:
+            item['similarity'] = round(scores[item['id']], 4)
+        return Response(data)
+
+
+class ProjectTemplateListView(ReplicaReadMixin, generics.ListAPIView):
+    """The template catalog: projects anyone can start from via projects/<id>/duplicate/ (no auth required)."""
+    serializer_class = ProjectTemplateSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        return Project.objects.filter(is_template=True).defer('data').select_related('user').order_by('name')
+
+
+class PlayCountThrottle(SharedAnonRateThrottle):
     scope = 'play_count'
 
 class PublicationPlayView(APIView):
@@ -301,6 +495,188 @@ class PublicationPlayView(APIView):
             pub = Publication.objects.get(pk=pk, is_public=True)
             pub.play_count = db_models.F('play_count') + 1
             pub.save(update_fields=['play_count'])
+            record_listener(pub.pk, request)
             return Response({'status': 'ok'})
         except Publication.DoesNotExist:
-            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class PublicationStatsView(ReplicaReadMixin, APIView):
+    """Play count and estimated unique listeners of a public publication, or of one's own."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        visible = db_models.Q(is_public=True)
+        if request.user.is_authenticated:
+            visible |= db_models.Q(user=request.user)
+        pub = Publication.objects.filter(visible, pk=pk).only('pk', 'play_count').first()
+        if pub is None:
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'id': pub.pk, 'play_count': pub.play_count, 'unique_listeners': unique_listeners(pub.pk)})
+
+
+# ═══════════════════════════════════════════
+# Follows and home feed
+# ═══════════════════════════════════════════
+
+class FollowView(APIView):
+    """Follow (POST) or unfollow (DELETE) a user."""
+    permission_classes = [IsAuthenticated]
+
+    def follow_state(self, followed, following, status_code=status.HTTP_200_OK):
+        follower_count = User.objects.filter(pk=followed.pk).values_list('follower_count', flat=True).first()
+        return Response(
+            {'username': followed.username, 'following': following, 'follower_count': follower_count},
+            status=status_code,
+        )
+
+    def get_followed(self, username):
+        followed = User.objects.filter(username=username).only('pk', 'username').first()
+        if followed is None:
+            raise Http404
+        return followed
+
+    def post(self, request, username):
+        followed = self.get_followed(username)
+        if followed.pk == request.user.pk:
+            return Response({'error': 'You cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
+        _, created = Follow.objects.get_or_create(follower=request.user, followed=followed)
+        return self.follow_state(followed, True, status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def delete(self, request, username):
+        followed = self.get_followed(username)
+        Follow.objects.filter(follower=request.user, followed=followed).delete()
+        return self.follow_state(followed, False)
+
+
+class HomeFeedView(ReplicaReadMixin, APIView):
+    """Public songs of the people you follow, newest first; pass `next` back for the next page."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', settings.HOME_FEED_PAGE_SIZE)), 50)
+            cursor = decode_cursor(request.query_params.get('cursor'))
+        except ValueError:
+            raise DRFValidationError({'detail': 'Invalid limit or cursor.'})
+        ids, next_cursor = home_timeline(request.user.pk, cursor, limit)
+        # Re-check is_public: removal from timelines runs in the background
+        publications = Publication.objects.filter(pk__in=ids, is_public=True).select_related('user')
+        order = {pk: position for position, pk in enumerate(ids)}
+        publications = sorted(publications, key=lambda publication: order[publication.pk])
+        next_url = None
+        if next_cursor is not None:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({
+            'next': next_url,
+            'results': PublicationSerializer(publications, many=True, context={'request': request}).data,
+        })
+
+
+# ═══════════════════════════════════════════
+# Sample packs (self-hosted sampler instruments)
+# ═══════════════════════════════════════════
+
+class SampleManifestView(APIView):
+    """Per-preset sample URLs and content hashes, in Tone.Sampler's {baseUrl, urls} shape."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, preset_id=None):
+        packs = SamplePack.objects.prefetch_related('samples')
+        if preset_id is not None:
+            packs = packs.filter(preset_id=preset_id)
+        packs = list(packs)
+        if preset_id is not None and not packs:
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = '"{}"'.format(pack_hash({pack.preset_id: pack.content_hash for pack in packs}))
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        base_url = request.build_absolute_uri(reverse('sample-manifest') + 'files/')
+        presets = {
+            pack.preset_id: {
+                'name': pack.name,
+                'release': pack.release,
+                'hash': pack.content_hash,
+                'baseUrl': base_url,
+                'urls': {sample.note: sample.file_name for sample in pack.samples.all()},
+                'hashes': {sample.note: sample.content_hash for sample in pack.samples.all()},
+                'bundleUrl': request.build_absolute_uri(
+                    reverse('sample-bundle', args=[pack.preset_id, pack.content_hash])
+                ),
+            }
+            for pack in packs
+        }
+        # Short max-age: the manifest is the one mutable piece; everything it points at is immutable
+        return Response({'presets': presets}, headers={'ETag': etag, 'Cache-Control': 'public, max-age=300'})
+
+
+class SampleFileView(View):
+    """A single content-addressed sample, immutable, with Range and precompressed variants."""
+
+    def get(self, request, file_name):
+        try:
+            path = sample_path(file_name)
+        except ValueError:
+            raise Http404
+        if not os.path.exists(path):
+            raise Http404
+        return serve_file(request, path, etag=file_name.split('.')[0])
+
+
+class SampleBundleView(View):
+    """All samples of a preset in one response — see accounts/sample_packs.py for the format."""
+
+    def get(self, request, preset_id, pack_hash):
+        try:
+            pack = SamplePack.objects.get(preset_id=preset_id, content_hash=pack_hash)
+        except SamplePack.DoesNotExist:
+            raise Http404
+        samples = list(pack.samples.all())
+        header, body_size = bundle_header(samples)
+        response = StreamingHttpResponse(iter_bundle(samples), content_type='application/octet-stream')
+        response['Content-Length'] = str(len(header) + body_size)
+        response['Cache-Control'] = IMMUTABLE
+        response['ETag'] = f'"{pack_hash}"'
+        return response
+
+
+# ═══════════════════════════════════════════
+# Static files and the frontend app (see accounts/static_assets.py)
+# ═══════════════════════════════════════════
+
+class StaticFileView(View):
+    """A collected static file: immutable when its name is manifest-hashed, revalidated otherwise."""
+
+    def get(self, request, path):
+        full_path = collected_path(path)
+        if full_path is None:
+            raise Http404
+        return serve_collected(request, full_path, immutable=is_hashed(path))
+
+
+class AppAssetView(View):
+    """A file of the Vite build's assets/ directory; Vite puts a content hash in every name."""
+
+    def get(self, request, path):
+        full_path = collected_path(path, prefix=f'{APP_PREFIX}/assets')
+        if full_path is None:
+            raise Http404
+        return serve_collected(request, full_path, immutable=True)
+
+
+class AppView(View):
+    """The frontend's top-level files (favicon, logos), and index.html for every client-side route."""
+
+    def get(self, request, path=''):
+        full_path = collected_path(path, prefix=APP_PREFIX) if path else None
+        if full_path is None:
+            # A missing file is a 404; anything else is a route for the client-side router
+            if '.' in path.rsplit('/', 1)[-1]:
+                raise Http404
+            full_path = collected_path('index.html', prefix=APP_PREFIX)
+            if full_path is None:
+                raise Http404
+        return serve_collected(request, full_path, immutable=False)
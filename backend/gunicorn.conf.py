@@ -0,0 +1,58 @@
+"""
+Gunicorn settings (picked up automatically from the working directory; see start.sh).
+
+The app is loaded once in the master and workers are forked from it, so a worker
+(re)start costs a fork instead of a full Django import. Nothing in the app opens
+connections, threads or process pools at import time, so forking a loaded app is
+safe; `manage.py bench_startup` measures the import profile and the cold start.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+preload_app = True
+
+# HTTP only (WSGI): the collaboration WebSockets run in their own ASGI process (start.sh).
+# Requests mostly wait on Postgres and Cloudinary, so each worker serves a few
+# concurrently on threads; CPU-bound audio analysis runs in a separate process pool.
+# Every thread keeps its own database connection (conn_max_age), so workers x threads
+# must fit in Postgres's max_connections.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Uploads are streamed to Cloudinary within the request, so allow for slow ones;
+# on shutdown, in-flight requests get graceful_timeout to finish.
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Static files, samples and the frontend build go out as FileResponse; workers hand
+# them to the kernel with sendfile() rather than copying them through Python
+sendfile = True
+
+# Recycle workers now and then to bound memory growth; with preload this is cheap
+max_requests = 2000
+max_requests_jitter = 200
+
+# Heartbeat files on tmpfs: a slow container disk can otherwise stall workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def when_ready(server):
+    # Import the URLconf (views, serializers, DRF) before forking, so workers don't
+    # pay for it on their first request, and close anything opened in the master.
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Threads don't survive the fork, so each worker starts its own autosave flusher;
+    # autosaves left pending by a previous deploy are written as soon as one boots
+    from accounts.autosave import buffer
+
+    buffer.start()
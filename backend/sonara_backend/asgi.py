@@ -2,6 +2,10 @@
 ASGI config for sonara_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+In production it serves only the collaborative editing WebSockets (/ws/, rooms in
+accounts/collab.py), as one uvicorn process; HTTP goes to the gunicorn workers
+(sonara_backend/wsgi.py). HTTP that does reach it, as with a local `uvicorn`, goes to
+Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -13,4 +17,23 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sonara_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from accounts.collab import hub, websocket_application  # noqa: E402  (needs apps loaded)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        # Write unsaved collaborative edits before the server exits
+        while True:
+            event = await receive()
+            if event['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif event['type'] == 'lifespan.shutdown':
+                await hub.flush_all()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    else:
+        await django_application(scope, receive, send)
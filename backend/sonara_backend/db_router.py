@@ -0,0 +1,131 @@
+"""
+Read-replica routing for public read traffic.
+
+Reads go to a replica only inside `replica_reads()` (entered by public GET views), never
+for clients that wrote within REPLICA_STICKY_SECONDS, and never to a replica that is
+unreachable or lagging more than REPLICA_MAX_LAG_SECONDS. Everything else uses `default`.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_replica_health = {}  # alias -> (checked_at, healthy)
+
+STICKY_KEY = 'db-sticky:{}'
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def start_replica_reads():
+    """Let reads on this thread/task use replicas; pass the token to stop_replica_reads()."""
+    return _replica_reads.set(True)
+
+
+def stop_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    token = start_replica_reads()
+    try:
+        yield
+    finally:
+        stop_replica_reads(token)
+
+
+# ─── Read-your-writes stickiness ───
+# Kept in the 'shared' cache (the database or Redis), since the next read may land on any
+# worker. Keyed on the user or session: behind the proxy every client shares a few IPs.
+
+def _sticky_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return STICKY_KEY.format(f'user:{user.pk}')
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return STICKY_KEY.format(f'session:{session.session_key}')
+    return None  # an anonymous write has nothing of its own to read back
+
+
+def mark_recent_write(request):
+    key = _sticky_key(request)
+    if key is not None:
+        caches['shared'].set(key, 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def has_recent_write(request):
+    if not replica_aliases():
+        return False  # every read is on the primary anyway; skip the cache round trip
+    key = _sticky_key(request)
+    return key is not None and caches['shared'].get(key) is not None
+
+
+class PrimaryStickinessMiddleware:
+    """Remember clients that just wrote, so their next reads stay on the primary."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_aliases() and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            mark_recent_write(request)
+        return response
+
+
+# ─── Replica lag ───
+
+LAG_QUERIES = {
+    # 0 when the standby has replayed everything it received, NULL on a primary
+    'postgresql': (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+def replica_lag(alias):
+    """Replication lag in seconds (0 where the backend has no notion of lag)."""
+    connection = connections[alias]
+    query = LAG_QUERIES.get(connection.vendor)
+    with connection.cursor() as cursor:
+        cursor.execute(query or 'SELECT 1')
+        row = cursor.fetchone()
+    return float(row[0] or 0) if query else 0.0
+
+
+def replica_is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _replica_health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return healthy
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    except DatabaseError:
+        healthy = False
+    _replica_health[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return 'default'
+        healthy = [alias for alias in replica_aliases() if replica_is_healthy(alias)]
+        return random.choice(healthy) if healthy else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
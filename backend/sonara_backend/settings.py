@@ -86,6 +86,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sonara_backend.db_router.PrimaryStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -120,6 +121,20 @@ DATABASES = {
     )
 }
 
+# Read replicas for public read traffic, e.g.
+# DATABASE_REPLICA_URLS=postgres://…@replica-1/db,postgres://…@replica-2/db
+# (two local SQLite files work for trying the router out)
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=600),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['sonara_backend.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10  # reads stay on the primary this long after a client's own write
+REPLICA_MAX_LAG_SECONDS = 5  # replicas further behind than this are skipped
+REPLICA_HEALTH_CHECK_INTERVAL = 5  # seconds between lag checks per replica, per process
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -140,6 +155,17 @@ AUTH_PASSWORD_VALIDATORS = [
 
 PASSWORD_RESET_TIMEOUT = 3600
 
+# Email — messages are queued in OutboxEmail and sent by `manage.py send_outbox_emails`.
+# Set EMAIL_BACKEND to django.core.mail.backends.console.EmailBackend (or .filebased with
+# EMAIL_FILE_PATH) to stand in for Resend locally; the test runner switches to locmem.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'accounts.emails.ResendEmailBackend')
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
+DEFAULT_FROM_EMAIL = 'Sonara <noreply@support.sonara.us>'
+RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 30
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -148,6 +174,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed JSON (falls back to the stdlib when orjson isn't installed)
+    'DEFAULT_RENDERER_CLASSES': (
+        'accounts.fast_json.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'accounts.fast_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_THROTTLE_RATES': {
         'play_count': '30/min',
     },
@@ -172,11 +208,95 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+# collectstatic target; the backend serves it itself (accounts/static_assets.py)
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# The frontend's `npm run build` output, collected under app/ and served as the SPA when
+# it exists at collectstatic time
+FRONTEND_DIST = Path(os.environ.get('FRONTEND_DIST', BASE_DIR.parent / 'frontend' / 'dist'))
+STATICFILES_DIRS = [('app', FRONTEND_DIST)] if FRONTEND_DIST.is_dir() else []
 
 # Media files (user uploads)
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Process pool for CPU-bound upload work (audio analysis); created lazily in each worker
+BACKGROUND_PROCESS_WORKERS = int(os.environ.get('BACKGROUND_PROCESS_WORKERS', 2))
+
+# Threads per worker for uploads and deletes that one save makes together (accounts/storage_io.py);
+# 1 runs them one after another
+STORAGE_IO_WORKERS = int(os.environ.get('STORAGE_IO_WORKERS', 8))
+
+# Rate limits shared by all workers (accounts/throttling.py): kept in the database, or in
+# Redis when THROTTLE_REDIS_URL is set. DRF throttles use it directly; django_ratelimit and
+# read-your-writes stickiness (sonara_backend/db_router.py) go through the 'shared' cache.
+THROTTLE_REDIS_URL = os.environ.get('THROTTLE_REDIS_URL')
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': (
+        {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': THROTTLE_REDIS_URL}
+        if THROTTLE_REDIS_URL else {'BACKEND': 'accounts.throttling.ThrottleCache'}
+    ),
+}
+RATELIMIT_USE_CACHE = 'shared'
+
+# Serialized publication/user cards, keyed by cache_version (see accounts/fragment_cache.py).
+# Shared through Redis when THROTTLE_REDIS_URL is set; otherwise each worker keeps its own,
+# sized for the catalog rather than LocMemCache's default of 300 entries.
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 20000))
+CACHES['fragments'] = (
+    {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': THROTTLE_REDIS_URL}
+    if THROTTLE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {'MAX_ENTRIES': FRAGMENT_CACHE_MAX_ENTRIES},
+    }
+)
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Autosaves (PATCH/PUT ?autosave=1) are buffered in PendingAutosave, as a diff from the saved
+# project, and written to the project this often
+AUTOSAVE_FLUSH_INTERVAL = float(os.environ.get('AUTOSAVE_FLUSH_INTERVAL', 5))
+
+# Collaborative editing rooms (accounts/collab.py): save edits this long after the last op,
+# but at most COLLAB_SAVE_MAX_DELAY after the first unsaved one
+COLLAB_SAVE_DEBOUNCE = float(os.environ.get('COLLAB_SAVE_DEBOUNCE', 2))
+COLLAB_SAVE_MAX_DELAY = float(os.environ.get('COLLAB_SAVE_MAX_DELAY', 10))
+# Outgoing frames buffered per editor before a slow connection is dropped
+COLLAB_MAX_QUEUE = 1000
+
+# "Similar songs" ANN index (accounts/similarity.py): memory-mapped files shared by all workers;
+# NPROBE is how many k-means lists each query scans (more = better recall, slower)
+SIMILARITY_INDEX_DIR = os.environ.get('SIMILARITY_INDEX_DIR', BASE_DIR / 'similarity_index')
+SIMILARITY_NPROBE = int(os.environ.get('SIMILARITY_NPROBE', 8))
+
+# Home timelines (accounts/timelines.py): publications are fanned out to followers' timelines
+# unless the author has more followers than this, in which case they're merged in at read time
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.environ.get('TIMELINE_FANOUT_MAX_FOLLOWERS', 10_000))
+# Songs copied into a timeline when following someone
+TIMELINE_BACKFILL = 50
+# Fan-out and backfill jobs (TimelineJob), drained by the process_timeline_jobs worker
+TIMELINE_JOB_BATCH_SIZE = 50
+TIMELINE_JOB_MAX_ATTEMPTS = 5
+TIMELINE_JOB_RETRY_BASE_SECONDS = 30
+HOME_FEED_PAGE_SIZE = 20
+
+# Incremental library sync (accounts/sync.py): deletions are remembered this long; older
+# tokens get a full resync. Each sync re-reads this many seconds before its token, to catch
+# rows stamped before they committed (slow transactions, clock skew)
+SYNC_TOMBSTONE_DAYS = 30
+SYNC_OVERLAP = 10
+
+# Per-user storage for uploads (tracks, publications, avatar, header); StorageUsage.quota
+# overrides it for one user. Tracked in the StorageUsage ledger, see accounts/storage_quota.py
+STORAGE_QUOTA_BYTES = int(os.environ.get('STORAGE_QUOTA_BYTES', 1024 * 1024 * 1024))
+
+# Uploaded images larger than this are rejected before decoding (decompression-bomb guard)
+IMAGE_MAX_PIXELS = 40_000_000
+
+# Self-hosted sampler instruments, imported with `manage.py import_sample_pack`
+SAMPLE_PACKS_ROOT = os.environ.get('SAMPLE_PACKS_ROOT', BASE_DIR / 'sample_packs')
+
 # Cloudinary configuration
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME'),
@@ -189,8 +309,13 @@ STORAGES = {
     "default": {
         "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
     },
+    # Content-hashed names plus .br/.gz variants, written by collectstatic. The manifest only
+    # exists after collectstatic, so development keeps the plain storage.
     "staticfiles": {
-        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "accounts.static_assets.PrecompressedManifestStaticFilesStorage"
+        ),
     },
 }
 
@@ -15,11 +15,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from accounts.views import AppAssetView, AppView, StaticFileView
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,3 +31,13 @@ urlpatterns = [
 
 #if settings.DEBUG:
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Static files and the frontend build (accounts/static_assets.py). The app catches every
+# other path for its client-side router, so it goes last. Bare prefixes like /admin are
+# left unmatched too, so APPEND_SLASH redirects them. /ws/ belongs to the collaboration
+# server (accounts/collab.py); reaching the web workers it gets a 404, not the app.
+urlpatterns += [
+    path(f"{settings.STATIC_URL.lstrip('/')}<path:path>", StaticFileView.as_view()),
+    path('assets/<path:path>', AppAssetView.as_view()),
+    re_path(r'^(?!(?:api|admin|static|media|ws)(?:/|$))(?P<path>.*)$', AppView.as_view()),
+]
@@ -1,3 +1,12 @@
 #!/bin/sh
+# Needs ffmpeg and ffprobe on the PATH: audio analysis and renditions of anything but WAV
+# depend on them (migrate's system checks warn with accounts.W001 when they are missing)
 python manage.py migrate
-gunicorn sonara_backend.wsgi:application --bind 0.0.0.0:${PORT}
+python manage.py collectstatic --noinput
+python manage.py send_outbox_emails --loop &
+python manage.py process_timeline_jobs --loop &
+# Collaboration WebSockets: one ASGI process, so all editors of a project share its room.
+# The proxy routes /ws/ to COLLAB_PORT; unsaved edits are written on shutdown.
+uvicorn sonara_backend.asgi:application --host 0.0.0.0 --port "${COLLAB_PORT:-8001}" --timeout-graceful-shutdown 30 &
+# HTTP: WSGI workers, threads, preload and timeouts are in gunicorn.conf.py
+gunicorn sonara_backend.wsgi:application
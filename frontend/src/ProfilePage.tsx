@@ -1,6 +1,7 @@
 import { useEffect, useState, useMemo, useRef, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { apiFetch } from './utils/api';
+import { syncLibrary } from './workstation/api/projectApi';
 
 interface UserProfile {
   id: number;
@@ -12,6 +13,7 @@ interface UserProfile {
   header_image: string | null;
   profile_picture: string | null;
   bio: string;
+  storage?: { used: number; quota: number }; // bytes
 }
 
 interface Track {
@@ -77,30 +79,18 @@ const ProfilePage = () => {
     setRemovePfp(false);
   };
 
-  const fetchTracks = useCallback(async () => {
+  // One sync fills both lists
+  const fetchLibrary = useCallback(async () => {
     setTracksLoading(true);
-    try {
-      const response = await apiFetch('/api/auth/tracks/');
-      if (!response.ok) throw new Error('Failed to load tracks');
-      const data = await response.json();
-      setTracks(data);
-    } catch {
-      /* silently fail — tracks area will just be empty */
-    } finally {
-      setTracksLoading(false);
-    }
-  }, []);
-
-  const fetchPublications = useCallback(async () => {
     setPubsLoading(true);
     try {
-      const response = await apiFetch('/api/auth/publications/');
-      if (!response.ok) throw new Error('Failed to load publications');
-      const data = await response.json();
-      setPublications(data);
+      const library = await syncLibrary();
+      setTracks(library.tracks);
+      setPublications(library.publications);
     } catch {
-      /* silently fail */
+      /* silently fail — both areas will just be empty */
     } finally {
+      setTracksLoading(false);
       setPubsLoading(false);
     }
   }, []);
@@ -129,11 +119,13 @@ const ProfilePage = () => {
     }
     // Stop any playing track too
     setPlayingTrackId(null);
+    // The compressed stream rendition when it's ready, else the original upload
+    const src = pub.stream_audio || pub.audio_file;
     if (audioRef.current) {
       audioRef.current.pause();
-      audioRef.current = new Audio(pub.audio_file);
+      audioRef.current = new Audio(src);
     } else {
-      audioRef.current = new Audio(pub.audio_file);
+      audioRef.current = new Audio(src);
     }
     audioRef.current.onended = () => setPlayingPubId(null);
     audioRef.current.play();
@@ -163,7 +155,7 @@ const ProfilePage = () => {
       }
       setTrackFile(null);
       setTrackTitle('');
-      fetchTracks();
+      fetchLibrary();
     } catch (err: unknown) {
       setUploadError(err instanceof Error ? err.message : 'Upload failed');
     } finally {
@@ -278,9 +270,8 @@ const ProfilePage = () => {
   }, [user?.username]);
 
   useEffect(() => {
-    fetchTracks();
-    fetchPublications();
-  }, [fetchTracks, fetchPublications]);
+    fetchLibrary();
+  }, [fetchLibrary]);
 
   const headerPreviewUrl = useMemo(
     () => (headerFile ? URL.createObjectURL(headerFile) : null),
@@ -637,6 +628,11 @@ const ProfilePage = () => {
                       </button>
                     </div>
                   )}
+                  {user?.storage && (
+                    <p style={styles.trackDate}>
+                      {(user.storage.used / 1048576).toFixed(1)} of {(user.storage.quota / 1048576).toFixed(0)} MB used
+                    </p>
+                  )}
                   {uploadError && <p style={styles.saveError}>{uploadError}</p>}
                 </div>
               </div>
@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import { apiFetch } from '../utils/api';
+import { syncLibrary } from './api/projectApi';
 import sonaraLogo from '../assets/sonara_logo.svg';
 import waveLeft from '../assets/wave-left.svg';
 import waveRight from '../assets/wave-right.svg';
@@ -23,11 +24,9 @@ const ArtistHome = () => {
     // Fetch user's projects
     const fetchProjects = async () => {
       try {
-        const response = await apiFetch('/api/auth/projects/');
-        if (response.ok) {
-          const data = await response.json();
-          setProjects(data);
-        }
+        // Only what changed since the last visit is downloaded
+        const library = await syncLibrary();
+        setProjects(library.projects);
       } catch (error) {
         console.error('Error fetching projects:', error);
       } finally {
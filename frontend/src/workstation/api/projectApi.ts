@@ -10,6 +10,14 @@ export interface ProjectSummary {
   name: string;
   created_at: string;
   updated_at: string;
+  // Computed server-side from data on every save
+  bpm?: number | null;
+  track_count?: number;
+  clip_count?: number;
+  note_count?: number;
+  duration_beats?: number;
+  byte_size?: number;
+  content_hash?: string;
 }
 
 export interface ProjectFull extends ProjectSummary {
@@ -58,6 +66,37 @@ export async function saveProject(id: number, name: string, data: any): Promise<
   return res.json();
 }
 
+/** Autosave: the server buffers the latest state and writes it within a few seconds */
+export async function autosaveProject(id: number, name: string, data: any): Promise<void> {
+  const res = await apiFetch(`/api/auth/projects/${id}/?autosave=1`, {
+    method: 'PATCH',
+    body: JSON.stringify({ name, data }),
+  });
+  if (!res.ok) throw new Error(`Failed to autosave project: ${res.status}`);
+}
+
+/** Copy a project (yours or a template) server-side; returns the new project's summary */
+export async function duplicateProject(id: number, name?: string): Promise<ProjectSummary> {
+  const res = await apiFetch(`/api/auth/projects/${id}/duplicate/`, {
+    method: 'POST',
+    body: JSON.stringify(name ? { name } : {}),
+  });
+  if (!res.ok) throw new Error(`Failed to duplicate project: ${res.status}`);
+  return res.json();
+}
+
+export interface ProjectTemplate extends ProjectSummary {
+  username: string;
+}
+
+/** Template catalog — no auth required; start from one with duplicateProject */
+export async function listProjectTemplates(): Promise<ProjectTemplate[]> {
+  const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';
+  const res = await fetch(`${API_BASE_URL}/api/auth/projects/templates/`);
+  if (!res.ok) throw new Error('Failed to load project templates');
+  return res.json();
+}
+
 /** Delete a project */
 export async function deleteProject(id: number): Promise<void> {
   const res = await apiFetch(`/api/auth/projects/${id}/`, {
@@ -66,6 +105,88 @@ export async function deleteProject(id: number): Promise<void> {
   if (!res.ok) throw new Error('Failed to delete project');
 }
 
+// ═══════════════════════════════════════════
+// Library sync (local copy of projects, tracks, publications)
+// ═══════════════════════════════════════════
+
+export interface LibraryTrack {
+  id: number;
+  title: string;
+  audio_file: string;
+  uploaded_at: string;
+  [analysis: string]: unknown;
+}
+
+export interface Library {
+  token: string | null;
+  projects: ProjectSummary[];
+  tracks: LibraryTrack[];
+  publications: Publication[];
+}
+
+type LibraryKind = 'projects' | 'tracks' | 'publications';
+
+interface LibraryChanges extends Library {
+  reset: boolean;
+  deleted: Record<LibraryKind, number[]>;
+}
+
+const LIBRARY_CACHE_KEY = 'libraryCache';
+// Same orderings as the list endpoints
+const LIBRARY_ORDER: Record<LibraryKind, string> = {
+  projects: 'updated_at',
+  tracks: 'uploaded_at',
+  publications: 'published_at',
+};
+
+function loadLibrary(): Library {
+  try {
+    const cached = JSON.parse(localStorage.getItem(LIBRARY_CACHE_KEY) || 'null');
+    if (cached) return cached;
+  } catch { /* corrupt cache — start over */ }
+  return { token: null, projects: [], tracks: [], publications: [] };
+}
+
+// Callers that overlap share one request, so they never race on the stored token
+let librarySync: Promise<Library> | null = null;
+
+/**
+ * The current user's projects, tracks and publications, from a copy kept in localStorage
+ * and refreshed with only what changed since the last sync.
+ */
+export function syncLibrary(): Promise<Library> {
+  if (!librarySync) {
+    librarySync = fetchLibraryChanges().finally(() => {
+      librarySync = null;
+    });
+  }
+  return librarySync;
+}
+
+async function fetchLibraryChanges(): Promise<Library> {
+  const library = loadLibrary();
+  const query = library.token ? `?since=${encodeURIComponent(library.token)}` : '';
+  const res = await apiFetch(`/api/auth/sync/${query}`);
+  if (!res.ok) throw new Error('Failed to sync library');
+  const changes: LibraryChanges = await res.json();
+
+  const next: Library = { token: changes.token, projects: [], tracks: [], publications: [] };
+  for (const kind of Object.keys(LIBRARY_ORDER) as LibraryKind[]) {
+    const rows = new Map<number, any>();
+    if (!changes.reset) {
+      for (const row of library[kind]) rows.set(row.id, row);
+      for (const id of changes.deleted[kind]) rows.delete(id);
+    }
+    for (const row of changes[kind]) rows.set(row.id, row);
+    const field = LIBRARY_ORDER[kind];
+    next[kind] = [...rows.values()].sort((a, b) => (b[field] > a[field] ? 1 : b[field] < a[field] ? -1 : 0));
+  }
+  try {
+    localStorage.setItem(LIBRARY_CACHE_KEY, JSON.stringify(next));
+  } catch { /* quota exceeded — keep the old copy, whose token still works */ }
+  return next;
+}
+
 // ═══════════════════════════════════════════
 // Publication endpoints
 // ═══════════════════════════════════════════
@@ -75,6 +196,9 @@ export interface Publication {
   title: string;
   description: string;
   audio_file: string;
+  // Compressed playback copies, filled in shortly after publishing; fall back to audio_file
+  preview_audio: string | null; // 30-second clip for feed cards
+  stream_audio: string | null; // full length at a modest bitrate
   cover_image: string | null;
   is_public: boolean;
   play_count: number;
@@ -143,6 +267,60 @@ export async function getUserPublications(username: string): Promise<Publication
   return res.json();
 }
 
+export interface HomeFeedPage {
+  results: Publication[];
+  next: string | null; // pass back to getHomeFeed for the next page
+}
+
+/** Songs from the people you follow, newest first */
+export async function getHomeFeed(next?: string | null): Promise<HomeFeedPage> {
+  // `next` is absolute; apiFetch wants a path
+  const url = next ? new URL(next) : null;
+  const res = await apiFetch(url ? url.pathname + url.search : '/api/auth/feed/home/');
+  if (!res.ok) throw new Error('Failed to load home feed');
+  return res.json();
+}
+
+export interface FollowState {
+  username: string;
+  following: boolean;
+  follower_count: number;
+}
+
+/** Follow a user; their songs appear in your home feed */
+export async function followUser(username: string): Promise<FollowState> {
+  const res = await apiFetch(`/api/auth/users/${username}/follow/`, { method: 'POST' });
+  if (!res.ok) throw new Error('Failed to follow user');
+  return res.json();
+}
+
+/** Unfollow a user */
+export async function unfollowUser(username: string): Promise<FollowState> {
+  const res = await apiFetch(`/api/auth/users/${username}/follow/`, { method: 'DELETE' });
+  if (!res.ok) throw new Error('Failed to unfollow user');
+  return res.json();
+}
+
+export interface PublicationStats {
+  id: number;
+  play_count: number;
+  // HyperLogLog estimates, accurate to about ±relative_error
+  unique_listeners: {
+    today: number;
+    last_7_days: number;
+    last_30_days: number;
+    all_time: number;
+    relative_error: number;
+  };
+}
+
+/** Plays and unique listeners of a public publication (or one of your own) */
+export async function getPublicationStats(publicationId: number): Promise<PublicationStats> {
+  const res = await apiFetch(`/api/auth/publications/${publicationId}/stats/`);
+  if (!res.ok) throw new Error('Failed to load publication stats');
+  return res.json();
+}
+
 /** Increment play count — no auth required */
 export async function recordPlay(publicationId: number): Promise<void> {
   const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';